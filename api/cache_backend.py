@@ -0,0 +1,354 @@
+# api/cache_backend.py
+"""Cache shared between function instances, for templates and renders.
+
+Each serverless instance otherwise rebuilds its caches from scratch. With
+CACHE_URL set, instances share Drive template bytes and recent render
+results through a cache server:
+
+    CACHE_URL=redis://:password@host:6379/0    RedisCacheBackend
+    CACHE_URL=rediss://:password@host:6380/0   RedisCacheBackend over TLS
+    CACHE_URL=memory://                        MemoryCacheBackend (one process)
+
+With CACHE_URL unset there is no shared tier and nothing changes.
+
+Storage is pluggable: CacheBackend defines the interface. RedisCacheBackend
+speaks the Redis protocol (RESP) over a plain socket, so no client library
+is needed, and MemoryCacheBackend is the in-process stand-in the tests use.
+The shared cache is an optimization only. Backend errors are logged and
+treated as misses, so a cache outage never fails a render.
+
+Entries belong to a key class with its own TTL and largest value
+(KEY_CLASSES). Values over the cap are not stored. For Redis, the total
+size is bounded by the server's maxmemory policy. MemoryCacheBackend
+bounds it with max_bytes.
+"""
+import hashlib
+import os
+import socket
+import ssl
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, namedtuple
+from urllib.parse import urlparse, unquote
+
+KeyClass = namedtuple('KeyClass', 'ttl max_bytes')
+
+KEY_CLASSES = {
+    # Drive template bytes: change rarely, a few hundred KB each
+    'template': KeyClass(int(os.environ.get('CACHE_TEMPLATE_TTL', 24 * 3600)),
+                         int(os.environ.get('CACHE_TEMPLATE_MAX_BYTES', 5 * 1024 * 1024))),
+    # Rendered documents and packages: only useful for the review session
+    'render': KeyClass(int(os.environ.get('CACHE_RENDER_TTL', 15 * 60)),
+                       int(os.environ.get('CACHE_RENDER_MAX_BYTES', 10 * 1024 * 1024))),
+}
+NAMESPACE = os.environ.get('CACHE_NAMESPACE', 'generators')
+
+
+class CacheError(Exception):
+    """Raised by a backend when the cache server fails or misbehaves."""
+
+
+class CacheBackend(ABC):
+    """Interface for shared cache backends. Keys are str, values bytes."""
+
+    @abstractmethod
+    def get(self, key):
+        """Return the value for key, or None if absent or expired."""
+
+    @abstractmethod
+    def set(self, key, value, ttl=None):
+        """Store value under key, expiring after ttl seconds if given."""
+
+    @abstractmethod
+    def delete(self, key):
+        """Remove key if present."""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """In-process backend with TTLs and an LRU bound on total bytes."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (value, expires or None)
+        self._lock = threading.Lock()
+
+    def _drop(self, key):
+        value, _ = self._entries.pop(key)
+        self.size -= len(value)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires <= self._clock():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        if len(value) > self.max_bytes:
+            return
+        expires = self._clock() + ttl if ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (bytes(value), expires)
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+
+
+class _RedisConnection:
+    """One open socket to the cache server, with its buffered reader."""
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.reader = sock.makefile('rb')
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+class RedisCacheBackend(CacheBackend):
+    """Minimal Redis client: GET, SET with EX, DEL.
+
+    Each command borrows an idle connection, or opens one, so concurrent
+    threads do not queue behind one socket; up to pool_size idle
+    connections are kept. A connection is closed after any error. After the
+    server cannot be reached, commands fail at once for retry_delay seconds,
+    doubling per consecutive failure up to max_retry_delay, instead of each
+    one waiting out the connect timeout.
+    """
+
+    def __init__(self, host='localhost', port=6379, db=0, password=None, username=None,
+                 timeout=1.0, tls=False, pool_size=4, retry_delay=1.0, max_retry_delay=30.0,
+                 clock=time.monotonic):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.username = username
+        self.timeout = timeout
+        self.tls = tls
+        self.pool_size = pool_size
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self._clock = clock
+        self._idle = []
+        self._failures = 0
+        self._down_until = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url, timeout=1.0):
+        """Build a client from redis[s]://[[user]:password@]host[:port][/db].
+
+        rediss:// connects over TLS, verifying the server certificate.
+        """
+        parsed = urlparse(url)
+        db = parsed.path.strip('/')
+        return cls(parsed.hostname or 'localhost', parsed.port or 6379, int(db or 0),
+                   unquote(parsed.password) if parsed.password else None,
+                   unquote(parsed.username) if parsed.username else None, timeout,
+                   tls=parsed.scheme == 'rediss')
+
+    # --- RESP ---
+
+    @staticmethod
+    def _encode(args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if isinstance(arg, str):
+                arg = arg.encode('utf-8')
+            elif isinstance(arg, int):
+                arg = str(arg).encode('ascii')
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def _read_reply(self, reader):
+        line = reader.readline()
+        if not line.endswith(b'\r\n'):
+            raise CacheError('connection closed by cache server')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode('utf-8')
+        if kind == b'-':
+            raise CacheError(rest.decode('utf-8', 'replace'))
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            data = reader.read(length + 2)
+            if len(data) != length + 2:
+                raise CacheError('connection closed by cache server')
+            return data[:-2]
+        if kind == b'*':
+            count = int(rest)
+            return None if count < 0 else [self._read_reply(reader) for _ in range(count)]
+        raise CacheError(f'unexpected reply from cache server: {line[:20]!r}')
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self.tls:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=self.host)
+        connection = _RedisConnection(sock)
+        try:
+            if self.password:
+                auth = (['AUTH', self.username, self.password] if self.username
+                        else ['AUTH', self.password])
+                self._call(connection, auth)
+            if self.db:
+                self._call(connection, ['SELECT', self.db])
+        except BaseException:
+            connection.close()
+            raise
+        return connection
+
+    def _call(self, connection, args):
+        connection.sock.sendall(self._encode(args))
+        return self._read_reply(connection.reader)
+
+    def _checkout(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+            if self._clock() < self._down_until:
+                raise CacheError('cache server unavailable, retrying later')
+        try:
+            connection = self._connect()
+        except OSError as e:
+            self._connect_failed()
+            raise CacheError(str(e)) from e
+        with self._lock:
+            self._failures = 0
+        return connection
+
+    def _connect_failed(self):
+        with self._lock:
+            self._failures += 1
+            delay = min(self.retry_delay * 2 ** (self._failures - 1), self.max_retry_delay)
+            self._down_until = self._clock() + delay
+
+    def _checkin(self, connection):
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def execute(self, *args):
+        """Run one command and return its reply; raise CacheError on failure."""
+        connection = self._checkout()
+        try:
+            reply = self._call(connection, list(args))
+        except (OSError, ValueError, CacheError) as e:
+            connection.close()
+            if isinstance(e, CacheError):
+                raise
+            raise CacheError(str(e)) from e
+        self._checkin(connection)
+        return reply
+
+    def get(self, key):
+        return self.execute('GET', key)
+
+    def set(self, key, value, ttl=None):
+        if ttl:
+            self.execute('SET', key, value, 'EX', int(ttl))
+        else:
+            self.execute('SET', key, value)
+
+    def delete(self, key):
+        self.execute('DEL', key)
+
+
+def cache_key(key_class, key):
+    """Return the backend key for a key of a key class."""
+    return f'{NAMESPACE}:{key_class}:{hashlib.sha256(key.encode("utf-8")).hexdigest()}'
+
+
+def _log_error(action, e):
+    print(f"[CACHE] {action} failed: {e}", file=sys.stderr)
+
+
+def cache_get(key_class, key):
+    """Return a shared cached value, or None (also when no backend is set)."""
+    backend = get_cache_backend()
+    if backend is None:
+        return None
+    try:
+        return backend.get(cache_key(key_class, key))
+    except CacheError as e:
+        _log_error('get', e)
+        return None
+
+
+def cache_set(key_class, key, value):
+    """Store a value in the shared cache under its key class's TTL and cap."""
+    backend = get_cache_backend()
+    policy = KEY_CLASSES[key_class]
+    if backend is None or len(value) > policy.max_bytes:
+        return False
+    try:
+        backend.set(cache_key(key_class, key), bytes(value), policy.ttl)
+    except CacheError as e:
+        _log_error('set', e)
+        return False
+    return True
+
+
+def through_cache(key_class, fetch):
+    """Wrap fetch(key) -> bytes so the shared cache is tried first and
+    filled after a fetch."""
+    def fetch_shared(key):
+        value = cache_get(key_class, key)
+        if value is None:
+            value = fetch(key)
+            cache_set(key_class, key, value)
+        return value
+    return fetch_shared
+
+
+_cache_backend = None
+_configured = False
+
+
+def get_cache_backend():
+    """Return the backend configured by CACHE_URL, or None if unset."""
+    global _cache_backend, _configured
+    if not _configured:
+        url = os.environ.get('CACHE_URL', '')
+        if url.startswith(('redis://', 'rediss://')):
+            _cache_backend = RedisCacheBackend.from_url(url)
+        elif url.startswith('memory://'):
+            _cache_backend = MemoryCacheBackend()
+        _configured = True
+    return _cache_backend
+
+
+def set_cache_backend(backend):
+    """Install a different CacheBackend (None disables the shared tier)."""
+    global _cache_backend, _configured
+    _cache_backend, _configured = backend, True
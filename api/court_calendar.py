@@ -0,0 +1,127 @@
+# api/court_calendar.py
+"""Tennessee court closure calendar for filing-deadline adjustment.
+
+When the last day for a filing falls on a Saturday, Sunday or legal holiday,
+the deadline runs to the next day the clerk's office is open (T.C.A.
+§ 1-3-102). Holidays follow T.C.A. § 15-1-101; a holiday that falls on a
+Saturday is observed the Friday before and one on a Sunday the Monday after.
+Ad hoc closures (weather, administrative orders) are passed in as
+extra_closures.
+"""
+import bisect
+from datetime import date, timedelta
+
+DEFAULT_START_YEAR = 2000
+DEFAULT_END_YEAR = 2075
+
+
+def _nth_weekday(year, month, weekday, n):
+    """Return the nth (1-based) weekday of a month; n=-1 for the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        offset = (weekday - first.weekday()) % 7
+        return first + timedelta(days=offset + 7 * (n - 1))
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    last = next_month - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year):
+    """Return Easter Sunday (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _observed(d):
+    """Shift a weekend holiday to its observed weekday."""
+    if d.weekday() == 5:
+        return d - timedelta(days=1)
+    if d.weekday() == 6:
+        return d + timedelta(days=1)
+    return d
+
+
+def tennessee_holidays(year):
+    """Return the observed Tennessee legal holidays for one year."""
+    return [
+        _observed(date(year, 1, 1)),              # New Year's Day
+        _nth_weekday(year, 1, 0, 3),              # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),              # Washington Day
+        _easter(year) - timedelta(days=2),        # Good Friday
+        _nth_weekday(year, 5, 0, -1),             # Memorial Day
+        _observed(date(year, 7, 4)),              # Independence Day
+        _nth_weekday(year, 9, 0, 1),              # Labor Day
+        _nth_weekday(year, 10, 0, 2),             # Columbus Day
+        _observed(date(year, 11, 11)),            # Veterans Day
+        _nth_weekday(year, 11, 3, 4),             # Thanksgiving
+        _observed(date(year, 12, 25)),            # Christmas Day
+    ]
+
+
+class CourtCalendar:
+    """Precomputed, sorted table of court closure dates for a year range.
+
+    Closures are stored as date ordinals so membership is a bisect over a
+    flat list; weekends are checked arithmetically and never stored.
+    """
+
+    def __init__(self, start_year=DEFAULT_START_YEAR, end_year=DEFAULT_END_YEAR,
+                 extra_closures=()):
+        self.start_year = start_year
+        self.end_year = end_year
+        closures = set()
+        for year in range(start_year, end_year + 1):
+            closures.update(d.toordinal() for d in tennessee_holidays(year))
+        closures.update(d.toordinal() for d in extra_closures)
+        self._closures = sorted(closures)
+        self._first = date(start_year, 1, 1).toordinal()
+        self._last = date(end_year, 12, 31).toordinal()
+
+    def _check_range(self, ordinal):
+        if not self._first <= ordinal <= self._last:
+            raise ValueError(
+                f"{date.fromordinal(ordinal).isoformat()} is outside the court "
+                f"calendar range {self.start_year}-{self.end_year}."
+            )
+
+    def _is_closed_ordinal(self, ordinal):
+        # date.fromordinal(1) is a Monday, so (ordinal - 1) % 7 is weekday()
+        if (ordinal - 1) % 7 >= 5:
+            return True
+        i = bisect.bisect_left(self._closures, ordinal)
+        return i < len(self._closures) and self._closures[i] == ordinal
+
+    def is_closed(self, d):
+        """Return True if the court is closed on date d."""
+        ordinal = d.toordinal()
+        self._check_range(ordinal)
+        return self._is_closed_ordinal(ordinal)
+
+    def next_open_day(self, d):
+        """Return d if the court is open that day, else the next open day."""
+        ordinal = d.toordinal()
+        self._check_range(ordinal)
+        while self._is_closed_ordinal(ordinal):
+            ordinal += 1
+            self._check_range(ordinal)
+        return d if ordinal == d.toordinal() else date.fromordinal(ordinal)
+
+
+_default_calendar = None
+
+
+def get_court_calendar():
+    """Return the shared default CourtCalendar, building it on first use."""
+    global _default_calendar
+    if _default_calendar is None:
+        _default_calendar = CourtCalendar()
+    return _default_calendar
@@ -0,0 +1,99 @@
+# api/field_registry.py
+"""Merge field alias registries.
+
+Templates spell the same merge field many ways ({DECEDENT}, {Decedent Name},
+{decedent name}, ...). A FieldRegistry maps every spelling to one canonical
+field and is built once at import time. Each request computes only the
+canonical values and binds them to the registry; spellings are resolved when
+the replacement engine matches them in document text.
+"""
+import re
+from collections.abc import Mapping
+from functools import lru_cache
+
+# Any {...} token on one line. Non-brace spellings (e.g. the legacy firm
+# name) are added to the pattern per registry.
+BRACE_TOKEN = r'\{[^{}\n]*\}'
+
+
+@lru_cache(maxsize=64)
+def compile_matcher(literals):
+    """Compile a matcher for brace tokens plus the given literal spellings."""
+    alternatives = [re.escape(s) for s in sorted(literals, key=len, reverse=True)]
+    alternatives.append(BRACE_TOKEN)
+    return re.compile('|'.join(alternatives))
+
+
+class FieldRegistry:
+    """Maps template spellings to canonical field names.
+
+    Args:
+        spellings: dict of canonical field -> iterable of template spellings
+    """
+
+    def __init__(self, spellings):
+        self.spellings = {field: tuple(names) for field, names in spellings.items()}
+        self.aliases = {}
+        for field, names in self.spellings.items():
+            for name in names:
+                if name in self.aliases and self.aliases[name] != field:
+                    raise ValueError(
+                        f"Spelling {name!r} maps to both "
+                        f"{self.aliases[name]!r} and {field!r}."
+                    )
+                self.aliases[name] = field
+        self.fields = frozenset(self.spellings)
+        self.matcher = compile_matcher(
+            tuple(sorted(n for n in self.aliases if not n.startswith('{'))))
+
+    def bind(self, values):
+        """Return a ReplacementMap resolving this registry against values."""
+        missing = self.fields.difference(values)
+        if missing:
+            raise ValueError(f"Missing values for fields: {sorted(missing)}")
+        return ReplacementMap(self, values)
+
+    @classmethod
+    def literal(cls, replacements):
+        """Bind a plain {placeholder: value} dict (one spelling per field)."""
+        registry = cls({placeholder: (placeholder,) for placeholder in replacements})
+        return registry.bind(replacements)
+
+
+class ReplacementMap(Mapping):
+    """Read-only {placeholder: value} view over canonical values.
+
+    Lookups go through the registry, so no per-spelling dict is allocated.
+    """
+
+    __slots__ = ('registry', 'values')
+
+    def __init__(self, registry, values):
+        self.registry = registry
+        self.values = values
+
+    def __getitem__(self, placeholder):
+        return self.values[self.registry.aliases[placeholder]]
+
+    def __iter__(self):
+        return iter(self.registry.aliases)
+
+    def __len__(self):
+        return len(self.registry.aliases)
+
+    def _resolve(self, match):
+        field = self.registry.aliases.get(match.group())
+        if field is None:
+            return match.group()
+        return str(self.values[field])
+
+    def substitute(self, text):
+        """Replace every known spelling in text; unknown tokens are kept."""
+        return self.registry.matcher.sub(self._resolve, text)
+
+
+def as_replacement_map(replacements):
+    """Accept a ReplacementMap or a plain dict and return a ReplacementMap."""
+    if isinstance(replacements, ReplacementMap):
+        return replacements
+    return FieldRegistry.literal(replacements)
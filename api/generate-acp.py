@@ -1,7 +1,6 @@
 from http.server import BaseHTTPRequestHandler
 import json
 from io import BytesIO
-from docx import Document
 import urllib.request
 import sys
 import os
@@ -36,19 +35,32 @@ except ImportError as e:
     print(f"[ACP] CRITICAL: Failed to import template_config: {e}")
     TEMPLATE_URLS = {'acp': 'ERROR_NO_CONFIG'}
 
-# Module-level cache to avoid re-downloading templates on warm invocations
-_template_cache = {}
+from template_cache import TemplateCache
+from shared_templates import shared_drive_template
+from cache_backend import through_cache
+from template_store import store_uncompressed
+from lazy_parts import open_document
+from zip_policy import normalize_docx
+from render_cache import content_digest, send_generated, serve_cached_get
+
+ENDPOINT = 'generate-acp'
+
+# Drive template cache, tiered as described in template_cache
+_template_cache = TemplateCache(lookup=shared_drive_template)
 
 def download_template(url):
-    """Download template from Google Drive, with in-memory caching.
+    """Download template from Google Drive, with in-memory caching."""
+    if url in _template_cache:
+        print(f"[ACP] Using cached template for: {url}")
+    return BytesIO(_template_cache.get(url, through_cache('template', _fetch_template)))
+
+def _fetch_template(url):
+    """Fetch template bytes from Google Drive.
 
     Uses requests for reliable redirect and cookie handling. Google Drive
     sometimes returns an HTML confirmation page for larger files; this
     function detects that and retries with the embedded confirm token.
     """
-    if url in _template_cache:
-        print(f"[ACP] Using cached template for: {url}")
-        return BytesIO(_template_cache[url])
     try:
         import requests as req_lib
         print(f"[ACP] Downloading template from: {url}")
@@ -72,8 +84,8 @@ def download_template(url):
             raise Exception("Downloaded file is not a valid .docx (failed ZIP header check). "
                             "Ensure the file is shared as 'Anyone with the link can view'.")
         print(f"[ACP] Template downloaded: {len(content)} bytes")
-        _template_cache[url] = content
-        return BytesIO(content)
+        # Cached uncompressed so each render only parses it
+        return store_uncompressed(content)
     except Exception as e:
         print(f"[ACP] Template download failed: {e}")
         raise Exception(f"Failed to download template: {str(e)}")
@@ -126,6 +138,21 @@ def replace_in_document(doc, replacements):
                                 if placeholder in run.text:
                                     run.text = run.text.replace(placeholder, value)
 
+def build_replacements(data):
+    """Build the ACP placeholder replacement dict from form data"""
+    pronoun = data.get('CLIENT_PRONOUN', 'he' if data.get('CLIENT_GENDER') == 'Male' else 'she')
+
+    return {
+        '{CLIENT_NAME}': data['CLIENT_NAME'].upper(),
+        '{CLIENT_PRONOUN}': pronoun,
+        '{PRIMARY_AGENT_NAME}': data['PRIMARY_AGENT_NAME'].upper(),
+        '{PRIMARY_AGENT_RELATION}': data['PRIMARY_AGENT_RELATION'],
+        '{ALTERNATE_AGENT_NAME}': data['ALTERNATE_AGENT_NAME'].upper(),
+        '{ALTERNATE_AGENT_RELATION}': data['ALTERNATE_AGENT_RELATION'],
+        '{EXEC_MONTH}': data.get('EXEC_MONTH', 'October'),
+        '{EXEC_YEAR}': data.get('EXEC_YEAR', '2025'),
+    }
+
 def generate_acp_document(data):
     """Generate ACP from Google Drive template"""
 
@@ -144,24 +171,33 @@ def generate_acp_document(data):
     template_buffer = download_template(template_url)
 
     # Open the template
-    doc = Document(template_buffer)
-    
-    pronoun = data.get('CLIENT_PRONOUN', 'he' if data.get('CLIENT_GENDER') == 'Male' else 'she')
-    
-    replacements = {
-        '{CLIENT_NAME}': data['CLIENT_NAME'].upper(),
-        '{CLIENT_PRONOUN}': pronoun,
-        '{PRIMARY_AGENT_NAME}': data['PRIMARY_AGENT_NAME'].upper(),
-        '{PRIMARY_AGENT_RELATION}': data['PRIMARY_AGENT_RELATION'],
-        '{ALTERNATE_AGENT_NAME}': data['ALTERNATE_AGENT_NAME'].upper(),
-        '{ALTERNATE_AGENT_RELATION}': data['ALTERNATE_AGENT_RELATION'],
-        '{EXEC_MONTH}': data.get('EXEC_MONTH', 'October'),
-        '{EXEC_YEAR}': data.get('EXEC_YEAR', '2025'),
-    }
+    doc = open_document(template_buffer)
     
-    replace_in_document(doc, replacements)
+    replace_in_document(doc, build_replacements(data))
     return doc
 
+def template_version():
+    """Digest of the ACP template for render ETags ('' if it cannot be fetched)."""
+    try:
+        return content_digest(download_template(TEMPLATE_URLS.get('acp', '').rstrip('/')).getvalue())
+    except Exception:
+        return ''
+
+def render_response(data):
+    """Render the ACP as (content, content type, filename, headers) for
+    render_cache.send_generated."""
+    buffer = BytesIO()
+    generate_acp_document(data).save(buffer)
+    content = buffer.getvalue()
+
+    # Format filename as: YYYY-MM-DD ACP lastname firstname.docx
+    today = datetime.now().strftime('%Y-%m-%d')
+    formatted_name = format_name_for_filename(data["CLIENT_NAME"])
+    if data.get('deterministic'):
+        content = normalize_docx(content, today)
+    return (content, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+            f"{today} ACP {formatted_name}.docx", [])
+
 class handler(BaseHTTPRequestHandler):
     def do_POST(self):
         try:
@@ -169,22 +205,9 @@ class handler(BaseHTTPRequestHandler):
             post_data = self.rfile.read(content_length)
             data = json.loads(post_data.decode('utf-8'))
             
-            doc = generate_acp_document(data)
-            
-            buffer = BytesIO()
-            doc.save(buffer)
-            buffer.seek(0)
-
-            # Format filename as: YYYY-MM-DD ACP lastname firstname.docx
-            today = datetime.now().strftime('%Y-%m-%d')
-            formatted_name = format_name_for_filename(data["CLIENT_NAME"])
-            filename = f"{today} ACP {formatted_name}.docx"
-
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
-            self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
-            self.end_headers()
-            self.wfile.write(buffer.getvalue())
+            # The filename carries today's date, so the date is part of the ETag
+            send_generated(self, ENDPOINT, data, render_response,
+                           lambda: (template_version(), datetime.now().strftime('%Y-%m-%d')))
             
         except Exception as e:
             self.send_response(500)
@@ -192,9 +215,13 @@ class handler(BaseHTTPRequestHandler):
             self.end_headers()
             self.wfile.write(json.dumps({'error': str(e)}).encode())
     
+    def do_GET(self):
+        # Result URLs (Content-Location) of earlier renders
+        serve_cached_get(self, ENDPOINT)
+
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, If-None-Match')
         self.end_headers()
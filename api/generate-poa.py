@@ -1,7 +1,6 @@
 from http.server import BaseHTTPRequestHandler
 import json
 from io import BytesIO
-from docx import Document
 import urllib.request
 import sys
 import os
@@ -30,7 +29,7 @@ def format_name_for_filename(full_name):
         return full_name
 
 try:
-    from template_config import TEMPLATE_URLS
+    from template_config import TEMPLATE_URLS, POA_ATTORNEY_NAME
     print("[POA] Successfully imported TEMPLATE_URLS")
     print(f"[POA] POA template URL: {TEMPLATE_URLS.get('poa', 'NOT FOUND')}")
 except ImportError as e:
@@ -38,20 +37,54 @@ except ImportError as e:
     print(f"[POA] Current directory: {os.getcwd()}")
     print(f"[POA] Files in current dir: {os.listdir('.')}")
     TEMPLATE_URLS = {'poa': 'ERROR_NO_CONFIG'}
+    POA_ATTORNEY_NAME = 'Thomas M. Hutto'
 
-# Module-level cache to avoid re-downloading templates on warm invocations
-_template_cache = {}
+from template_cache import TemplateCache
+from shared_templates import shared_drive_template
+from cache_backend import through_cache
+from template_store import store_uncompressed
+from lazy_parts import open_document
+from zip_policy import normalize_docx
+from render_cache import content_digest, send_generated, serve_cached_get
 
-def download_template(url):
+ENDPOINT = 'generate-poa'
+
+# Drive template cache, tiered as described in template_cache
+_template_cache = TemplateCache(lookup=shared_drive_template)
+
+# Placeholders whose default never changes between requests. They are
+# substituted into the cached template once (partial evaluation), so a
+# request that keeps the default only replaces the client fields.
+FIRM_CONSTANT_PLACEHOLDERS = ('{AttorneyName}',)
+
+def download_template(url, constants=None):
     """Download template from Google Drive, with in-memory caching.
 
+    constants, if given, is a {placeholder: value} dict to substitute into
+    the cached copy; the evaluated template is cached separately.
+    """
+    if constants:
+        key = (url, tuple(sorted(constants.items())))
+        return BytesIO(_template_cache.get(key, _evaluate_template))
+    if url in _template_cache:
+        print(f"[POA] Using cached template for: {url}")
+    return BytesIO(_template_cache.get(url, through_cache('template', _fetch_template)))
+
+def _evaluate_template(key):
+    """Return the template at key[0] with the key[1] constants substituted."""
+    url, constants = key
+    doc = replace_placeholders(open_document(download_template(url)), None, dict(constants))
+    buffer = BytesIO()
+    doc.save(buffer)
+    return store_uncompressed(buffer.getvalue())
+
+def _fetch_template(url):
+    """Fetch template bytes from Google Drive.
+
     Uses requests for reliable redirect and cookie handling. Google Drive
     sometimes returns an HTML confirmation page for larger files; this
     function detects that and retries with the embedded confirm token.
     """
-    if url in _template_cache:
-        print(f"[POA] Using cached template for: {url}")
-        return BytesIO(_template_cache[url])
     try:
         import requests as req_lib
         print(f"[POA] Downloading template from: {url}")
@@ -77,17 +110,15 @@ def download_template(url):
             raise Exception("Downloaded file is not a valid .docx (failed ZIP header check). "
                             "Ensure the file is shared as 'Anyone with the link can view'.")
         print(f"[POA] Template downloaded: {len(content)} bytes")
-        _template_cache[url] = content
-        return BytesIO(content)
+        # Cached uncompressed so each render only parses it
+        return store_uncompressed(content)
     except Exception as e:
         print(f"[POA] Template download failed: {e}")
         raise Exception(f"Failed to download template: {str(e)}")
 
-def replace_placeholders(doc, data):
-    """Replace placeholders in the document with actual data"""
-
-    # Create replacement map
-    replacements = {
+def build_replacements(data):
+    """Build the POA placeholder replacement dict from form data"""
+    return {
         '{CLIENT_NAME}': data['CLIENT_NAME'].upper(),
         '{CLIENT_COUNTY}': data.get('COUNTY', data.get('CLIENT_COUNTY', '')),
         '{PRIMARY_AGENT_NAME}': data.get('AIF_NAME', data.get('PRIMARY_AGENT_NAME', '')).upper(),
@@ -98,8 +129,15 @@ def replace_placeholders(doc, data):
         '{ALTERNATE_AGENT_COUNTY}': data.get('COUNTY', data.get('CLIENT_COUNTY', '')),
         '{EXEC_MONTH}': data['EXEC_MONTH'].upper(),
         '{EXEC_YEAR}': data['EXEC_YEAR'],
-        '{AttorneyName}': data.get('ATTORNEY_NAME', 'Thomas M. Hutto')
+        '{AttorneyName}': data.get('ATTORNEY_NAME', POA_ATTORNEY_NAME)
     }
+
+def replace_placeholders(doc, data, replacements=None):
+    """Replace placeholders in the document with actual data"""
+
+    # Create replacement map
+    if replacements is None:
+        replacements = build_replacements(data)
     
     print(f"[POA] Replacing {len(replacements)} placeholders")
     
@@ -158,17 +196,47 @@ def generate_poa_document(data):
     
     print(f"[POA] Using template URL: {template_url}")
     
+    # Firm constants the request keeps are already in the evaluated template
+    replacements = build_replacements(data)
+    constants = {key: POA_ATTORNEY_NAME for key in FIRM_CONSTANT_PLACEHOLDERS
+                 if replacements[key] == POA_ATTORNEY_NAME}
+
     # Download template from Google Drive
-    template_buffer = download_template(template_url)
+    template_buffer = download_template(template_url, constants)
     
     # Open the template
-    doc = Document(template_buffer)
+    doc = open_document(template_buffer)
     
-    # Replace all placeholders with actual data
-    doc = replace_placeholders(doc, data)
+    # Replace the remaining placeholders with actual data
+    doc = replace_placeholders(doc, data, {key: value for key, value in replacements.items()
+                                           if key not in constants})
     
     return doc
 
+def template_version():
+    """Digest of the POA template for render ETags ('' if it cannot be fetched)."""
+    try:
+        return content_digest(download_template(TEMPLATE_URLS.get('poa', '').rstrip('/')).getvalue())
+    except Exception:
+        return ''
+
+def render_response(data):
+    """Render the POA as (content, content type, filename, headers) for
+    render_cache.send_generated."""
+    buffer = BytesIO()
+    generate_poa_document(data).save(buffer)
+    content = buffer.getvalue()
+
+    print(f"[POA] Document generated: {len(content)} bytes")
+
+    # Format filename as: YYYY-MM-DD POA lastname firstname.docx
+    today = datetime.now().strftime('%Y-%m-%d')
+    formatted_name = format_name_for_filename(data["CLIENT_NAME"])
+    if data.get('deterministic'):
+        content = normalize_docx(content, today)
+    return (content, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+            f"{today} POA {formatted_name}.docx", [])
+
 class handler(BaseHTTPRequestHandler):
     def do_POST(self):
         try:
@@ -179,27 +247,9 @@ class handler(BaseHTTPRequestHandler):
             
             print(f"[POA] Received request with keys: {list(data.keys())}")
             
-            # Generate document
-            doc = generate_poa_document(data)
-            
-            # Save to BytesIO buffer
-            buffer = BytesIO()
-            doc.save(buffer)
-            buffer.seek(0)
-            
-            print(f"[POA] Document generated: {len(buffer.getvalue())} bytes")
-
-            # Format filename as: YYYY-MM-DD POA lastname firstname.docx
-            today = datetime.now().strftime('%Y-%m-%d')
-            formatted_name = format_name_for_filename(data["CLIENT_NAME"])
-            filename = f"{today} POA {formatted_name}.docx"
-
-            # Send response
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
-            self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
-            self.end_headers()
-            self.wfile.write(buffer.getvalue())
+            # The filename carries today's date, so the date is part of the ETag
+            send_generated(self, ENDPOINT, data, render_response,
+                           lambda: (template_version(), datetime.now().strftime('%Y-%m-%d')))
             
         except Exception as e:
             import traceback
@@ -215,9 +265,13 @@ class handler(BaseHTTPRequestHandler):
                 'traceback': error_trace
             }).encode())
     
+    def do_GET(self):
+        # Result URLs (Content-Location) of earlier renders
+        serve_cached_get(self, ENDPOINT)
+
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, If-None-Match')
         self.end_headers()
@@ -1,89 +1,200 @@
 """Generate probate closing documents as a ZIP file."""
 from http.server import BaseHTTPRequestHandler
 import json
+from datetime import date
 from io import BytesIO
 from probate_utils import (
-    load_template, replace_in_document, build_common_replacements,
+    render_template, build_common_replacements,
     select_closing_documents, select_receipt_waiver_template,
-    derive_pronouns, derive_pr_title, build_zip
+    derive_pronouns, derive_pr_title, build_zip, zip_options, render_plan,
+    describe_plan, preview_plan, generate_flags, build_signing_packet, package_content_type,
+    rerender_package, decode_previous, InvalidPrevious, package_date, templates_version,
+    Estate
 )
+from field_registry import FieldRegistry
+from template_config import FIRM_CONSTANTS
+from residual_placeholders import (
+    ResidualPlaceholderError, check_residuals, header_value, distinct_tokens, HEADER_NAME
+)
+from job_store import submit_job, job_urls, AsyncJobsUnavailable
+from render_cache import send_generated, serve_cached_get
 
+ENDPOINT = 'generate-probate-closing'
 
-def generate_receipt_waiver(heir, data):
-    """Generate receipt & waiver for one heir.
+
+RECEIPT_WAIVER_FIELDS = FieldRegistry({
+    # Per-heir fields
+    'beneficiary_name': ('{Beneficiary Name}', '{BENEFICIARY NAME}', '{Beneficiary}'),
+    'beneficiary_address': ('{Beneficiary Address}',),
+    'beneficiary_city': ('{Beneficiary City, State Zip}',),
+    'beneficiary_subject': ('{Beneficiary Pronoun}',),
+    'beneficiary_possessive': ('{Beneficiary Pronoun HIS/HER}',),
+    'beneficiary_relationship': ('{Beneficiary Relationship}',),
+
+    # Common fields
+    'decedent_name': ('{Decedent Name}', '{DECEDENT}', '{DECEDENT NAME}', '{Decedent}'),
+    'pr_name': ('{Executor Name}', '{EXECUTOR NAME}', '{Executor}',
+                '{PETITIONER NAME}', '{Petitioner Name}'),
+    'pr_title': ('{Executor/trix}', '{Executor/Executrix}', '{Title}', '{TITLE}',
+                 '{Administrator/trix}'),
+    'attorney_fee_amount': ('{AttorneyFeeAmount}',),
+    'executor_fee_amount': ('{ExecutorFeeTotal}',),
+    'case_number': ('{Docket Number}', '{docket number}'),
+    'decedent_county': ('{COUNTY}', '{County}'),
+    'attorney_name': ('{ATTORNEY}', '{ATTORNEY NAME}'),
+    'attorney_bpr': ('{BPR #}', '{BPR}'),
+    'firm_name': ('Dale, Hutto & Lyle, PLLC',),
+})
+
+
+def plan_receipt_waiver(heir, data):
+    """Return (output_title, template_name, replacements) for one heir.
 
     Builds per-heir replacements (beneficiary name, address, pronoun,
     beneficiary type statement) merged with common replacements
     (decedent name, executor name, county, fees, docket number, firm name).
     """
     template_name, output_title = select_receipt_waiver_template(heir, data)
-    doc = load_template(template_name)
     heir_pronouns = derive_pronouns(heir.get('heir_gender', 'Female'))
     pr_title = derive_pr_title(data.get('estate_type', 'Testate'),
                                 data.get('pr_gender', 'Male'))
 
-    replacements = {
+    return output_title, template_name, RECEIPT_WAIVER_FIELDS.bind({
         # Per-heir fields
-        '{Beneficiary Name}': heir['heir_full_name'],
-        '{BENEFICIARY NAME}': heir['heir_full_name'],
-        '{Beneficiary}': heir['heir_full_name'],
-        '{Beneficiary Address}': heir.get('heir_address', ''),
-        '{Beneficiary City, State Zip}': heir.get('heir_city', ''),
-        '{Beneficiary Pronoun}': heir_pronouns['subject'],
-        '{Beneficiary Pronoun HIS/HER}': heir_pronouns['possessive'],
-        '{Beneficiary Relationship}': heir.get('heir_relationship', ''),
+        'beneficiary_name': heir['heir_full_name'],
+        'beneficiary_address': heir.get('heir_address', ''),
+        'beneficiary_city': heir.get('heir_city', ''),
+        'beneficiary_subject': heir_pronouns['subject'],
+        'beneficiary_possessive': heir_pronouns['possessive'],
+        'beneficiary_relationship': heir.get('heir_relationship', ''),
 
         # Common fields
-        '{Decedent Name}': data.get('decedent_full_name', ''),
-        '{DECEDENT}': data.get('decedent_full_name', ''),
-        '{DECEDENT NAME}': data.get('decedent_full_name', ''),
-        '{Decedent}': data.get('decedent_full_name', ''),
-        '{Executor Name}': data.get('pr_full_name', ''),
-        '{EXECUTOR NAME}': data.get('pr_full_name', ''),
-        '{Executor}': data.get('pr_full_name', ''),
-        '{PETITIONER NAME}': data.get('pr_full_name', ''),
-        '{Petitioner Name}': data.get('pr_full_name', ''),
-        '{Executor/trix}': pr_title,
-        '{Executor/Executrix}': pr_title,
-        '{Title}': pr_title,
-        '{TITLE}': pr_title,
-        '{Administrator/trix}': pr_title,
-        '{AttorneyFeeAmount}': data.get('attorney_fee_amount', ''),
-        '{ExecutorFeeTotal}': data.get('executor_fee_amount', ''),
-        '{Docket Number}': data.get('case_number', ''),
-        '{docket number}': data.get('case_number', ''),
-        '{COUNTY}': data.get('decedent_county', ''),
-        '{County}': data.get('decedent_county', ''),
-        '{ATTORNEY}': data.get('attorney_full_name', ''),
-        '{ATTORNEY NAME}': data.get('attorney_full_name', ''),
-        '{BPR #}': data.get('attorney_bpr', ''),
-        '{BPR}': data.get('attorney_bpr', ''),
-        'Dale, Hutto & Lyle, PLLC': data.get('firm_name', 'Muletown Law, P.C.'),
-    }
-    replace_in_document(doc, replacements)
-    return output_title, doc
+        'decedent_name': data.get('decedent_full_name', ''),
+        'pr_name': data.get('pr_full_name', ''),
+        'pr_title': pr_title,
+        'attorney_fee_amount': data.get('attorney_fee_amount', ''),
+        'executor_fee_amount': data.get('executor_fee_amount', ''),
+        'case_number': data.get('case_number', ''),
+        'decedent_county': data.get('decedent_county', ''),
+        'attorney_name': data.get('attorney_full_name', FIRM_CONSTANTS['attorney_name']),
+        'attorney_bpr': data.get('attorney_bpr', FIRM_CONSTANTS['attorney_bpr']),
+        'firm_name': data.get('firm_name', FIRM_CONSTANTS['firm_name']),
+    })
+
 
+def generate_receipt_waiver(heir, data):
+    """Generate receipt & waiver for one heir."""
+    output_title, template_name, replacements = plan_receipt_waiver(heir, data)
+    return output_title, render_template(template_name, replacements)
 
-def generate_closing_package(data):
-    """Generate all closing documents and return as ZIP BytesIO."""
-    replacements = build_common_replacements(data)
-    documents = []
+
+def plan_closing_package(data):
+    """Return the package plan: [(title, template_name, replacements)]."""
+    estate = Estate(data)
+    replacements = build_common_replacements(data, estate)
 
     # 1. Closing petition and order
-    selected = select_closing_documents(data)
-    for template_name, output_title in selected:
-        doc = load_template(template_name)
-        replace_in_document(doc, replacements)
-        documents.append((output_title, doc))
+    plan = [(output_title, template_name, replacements)
+            for template_name, output_title in select_closing_documents(data)]
 
     # 2. Receipt & waiver per heir
     for heir in data.get('heirs', []):
-        title, doc = generate_receipt_waiver(heir, data)
-        documents.append((title, doc))
+        plan.append(plan_receipt_waiver(heir, data))
+
+    return plan
+
+
+def generate_closing_package(data, residuals=None):
+    """Generate all closing documents and return as ZIP BytesIO.
+
+    residuals, if given, is filled with the placeholders left in each
+    document. data['placeholder_report'] adds them to the ZIP as a JSON
+    sidecar; data['strict_placeholders'] raises ResidualPlaceholderError
+    instead of returning a package with unfilled fields. data['deterministic']
+    makes the ZIP a pure function of the payload (see build_zip).
+    data['signing_packet'] returns the documents merged into one .docx
+    instead (see build_signing_packet).
+    """
+    if residuals is None:
+        residuals = {}
+    documents = render_plan(plan_closing_package(data))
 
-    # 3. Build ZIP
     date_str = data.get('generation_date') or None
-    return build_zip(documents, date_str)
+    if data.get('signing_packet'):
+        buffer = build_signing_packet(documents, date_str, residuals,
+                                      deterministic=bool(data.get('deterministic')))
+    else:
+        buffer = build_zip(documents, date_str, residuals, **zip_options(data))
+    check_residuals(residuals, strict=bool(data.get('strict_placeholders')))
+    return buffer
+
+
+def dry_run_closing_package(data):
+    """Describe the closing package a render would produce.
+
+    Loads no template, so it is cheap enough to call on every form change.
+    Returns the selected documents, each heir's receipt & waiver and the
+    flags, plus each document's resolved placeholder values and unmapped
+    placeholders (see probate_utils.describe_plan).
+    """
+    estate = Estate(data)
+    receipt_waivers = []
+    for heir in data.get('heirs', []):
+        template_name, title = select_receipt_waiver_template(heir, data)
+        receipt_waivers.append({'heir': heir['heir_full_name'], 'template': template_name,
+                                'title': title})
+    return {
+        'dry_run': True,
+        'selected_documents': [{'template': template_name, 'title': title}
+                               for template_name, title in select_closing_documents(data)],
+        'receipt_waivers': receipt_waivers,
+        'flags': generate_flags(data, estate),
+        'documents': describe_plan(plan_closing_package(data)),
+    }
+
+
+def rerender_closing_package(old_data, data, previous_zip, residuals=None, rerendered=None):
+    """Regenerate a closing package after a payload correction.
+
+    Only documents that use a changed field (or that are new to the package)
+    are rendered; the rest are copied from previous_zip. Arguments otherwise
+    match generate_closing_package; see probate_utils.rerender_package.
+    """
+    if residuals is None:
+        residuals = {}
+    # Plan the old payload for the same day, so only real edits count as changes
+    date_str = package_date(data)
+    zip_buffer = rerender_package(plan_closing_package(dict(old_data, generation_date=date_str)),
+                                  plan_closing_package(data),
+                                  previous_zip, date_str, residuals,
+                                  rerendered=rerendered, **zip_options(data))
+    check_residuals(residuals, strict=bool(data.get('strict_placeholders')))
+    return zip_buffer
+
+
+def package_filename(data):
+    """Return the download filename for a package."""
+    decedent_name = data.get('decedent_full_name', 'Unknown').replace(' ', '_')
+    if data.get('signing_packet'):
+        return f"Probate_Closing_{decedent_name}_Signing_Packet.docx"
+    return f"Probate_Closing_{decedent_name}.zip"
+
+
+def render_job(data):
+    """Render a package for the async job worker (see job_store.run_job)."""
+    residuals = {}
+    zip_buffer = generate_closing_package(data, residuals)
+    return (package_filename(data), zip_buffer.getvalue(),
+            {'residual_placeholders': distinct_tokens(residuals)})
+
+
+def render_response(data):
+    """Render a package as (content, content type, filename, headers) for
+    render_cache.send_generated."""
+    residuals = {}
+    zip_buffer = generate_closing_package(data, residuals)
+    return (zip_buffer.getvalue(), package_content_type(data), package_filename(data),
+            [(HEADER_NAME, header_value(residuals))])
 
 
 class handler(BaseHTTPRequestHandler):
@@ -93,17 +204,68 @@ class handler(BaseHTTPRequestHandler):
             post_data = self.rfile.read(content_length)
             data = json.loads(post_data.decode('utf-8'))
 
-            zip_buffer = generate_closing_package(data)
+            if data.get('dry_run'):
+                # Plan only: which documents, with which values; no templates
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(json.dumps(dry_run_closing_package(data)).encode())
+                return
 
-            decedent_name = data.get('decedent_full_name', 'Unknown').replace(' ', '_')
-            filename = f"Probate_Closing_{decedent_name}.zip"
+            if data.get('preview'):
+                # HTML of every planned document, straight from the template
+                # outlines; no .docx is built
+                html = preview_plan(plan_closing_package(data),
+                                    package_filename(data).rsplit('.', 1)[0])
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.end_headers()
+                self.wfile.write(html.encode('utf-8'))
+                return
 
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/zip')
-            self.send_header('Content-Disposition',
-                             f'attachment; filename="{filename}"')
+            if data.get('async'):
+                job_id, _ = submit_job('probate-closing', data, render_job)
+                self.send_response(202)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(json.dumps({'job_id': job_id, 'status': 'queued',
+                                             **job_urls(job_id)}).encode())
+                return
+
+            previous = data.pop('previous', None)
+            if previous is not None and not data.get('signing_packet'):
+                # Correction of an earlier package: {"payload": ..., "zip": base64}.
+                # A signing packet is one document, so it is always rendered whole.
+                residuals = {}
+                old_data, previous_zip = decode_previous(previous)
+                zip_buffer = rerender_closing_package(old_data, data, previous_zip, residuals)
+                filename = package_filename(data)
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/zip')
+                self.send_header('Content-Disposition',
+                                 f'attachment; filename="{filename}"')
+                self.send_header(HEADER_NAME, header_value(residuals))
+                self.end_headers()
+                self.wfile.write(zip_buffer.getvalue())
+                return
+
+            # The documents carry today's date, so the render date is part of the ETag
+            send_generated(self, ENDPOINT, data, render_response,
+                           lambda: (templates_version(), date.today().isoformat()))
+
+        except (AsyncJobsUnavailable, InvalidPrevious) as e:
+            self.send_response(400)
+            self.send_header('Content-Type', 'application/json')
             self.end_headers()
-            self.wfile.write(zip_buffer.getvalue())
+            self.wfile.write(json.dumps({'error': str(e)}).encode())
+
+        except ResidualPlaceholderError as e:
+            self.send_response(422)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps({'error': str(e),
+                                         'residual_placeholders': e.residuals}).encode())
 
         except Exception as e:
             self.send_response(500)
@@ -111,9 +273,13 @@ class handler(BaseHTTPRequestHandler):
             self.end_headers()
             self.wfile.write(json.dumps({'error': str(e)}).encode())
 
+    def do_GET(self):
+        # Result URLs (Content-Location) of earlier renders
+        serve_cached_get(self, ENDPOINT)
+
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, If-None-Match')
         self.end_headers()
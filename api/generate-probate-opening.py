@@ -1,61 +1,166 @@
 """Generate probate opening documents as a ZIP file."""
 from http.server import BaseHTTPRequestHandler
 import json
+from datetime import date
 from io import BytesIO
 from probate_utils import (
-    load_template, replace_in_document, build_common_replacements,
+    render_template, build_common_replacements,
     select_opening_documents, determine_declinations, derive_pronouns,
-    derive_pr_title, build_zip, generate_flags
+    derive_pr_title, build_zip, zip_options, generate_flags, render_plan,
+    describe_plan, preview_plan, build_signing_packet, package_content_type,
+    rerender_package, decode_previous, InvalidPrevious, package_date, templates_version,
+    DECLINATION_TEMPLATE, Estate
 )
+from field_registry import FieldRegistry
+from template_config import FIRM_CONSTANTS
+from residual_placeholders import (
+    ResidualPlaceholderError, check_residuals, header_value, distinct_tokens, HEADER_NAME
+)
+from job_store import submit_job, job_urls, AsyncJobsUnavailable
+from render_cache import send_generated, serve_cached_get
 
+ENDPOINT = 'generate-probate-opening'
 
-def generate_declination_doc(decliner, data):
-    """Generate a single declination document for one person."""
-    doc = load_template('Declination to Serve CURLY.docx')
+
+DECLINATION_FIELDS = FieldRegistry({
+    'decliner_name': ('{DECLINER NAME}',),
+    'decedent_name': ('{DECEDENT}', '{Decedent Name}'),
+    'pr_name': ('{PETITIONER}',),
+    'decliner_relationship': ('{RELATION TO DECEDENT}',),
+    'decliner_possessive': ('{HIS/HER}', '{his/her}'),
+    'pr_title': ('{Administrator/trix CHOOSE ONE}',
+                 '{Title Executor/Executrix CHOOSE ONE}'),
+    'decedent_county': ('{COUNTY}', '{COUNTY NAME}'),
+    'firm_name': ('Dale, Hutto & Lyle, PLLC',),
+})
+
+
+def declination_replacements(decliner, data):
+    """Bind DECLINATION_FIELDS for one person declining to serve."""
     pr_title = derive_pr_title(data.get('estate_type', 'Testate'),
                                 data.get('pr_gender', 'Male'))
     dec_pronouns = derive_pronouns(decliner.get('gender', 'Male'))
 
-    replacements = {
-        '{DECLINER NAME}': decliner['name'],
-        '{DECEDENT}': data.get('decedent_full_name', ''),
-        '{Decedent Name}': data.get('decedent_full_name', ''),
-        '{PETITIONER}': data.get('pr_full_name', ''),
-        '{RELATION TO DECEDENT}': decliner.get('relationship', ''),
-        '{HIS/HER}': dec_pronouns['possessive'],
-        '{his/her}': dec_pronouns['possessive'],
-        '{Administrator/trix CHOOSE ONE}': pr_title,
-        '{Title Executor/Executrix CHOOSE ONE}': pr_title,
-        '{COUNTY}': data.get('decedent_county', ''),
-        '{COUNTY NAME}': data.get('decedent_county', ''),
-        'Dale, Hutto & Lyle, PLLC': data.get('firm_name', 'Muletown Law, P.C.'),
-    }
-    replace_in_document(doc, replacements)
-    return doc
-
-
-def generate_opening_package(data):
-    """Generate all opening documents and return as ZIP BytesIO."""
-    replacements = build_common_replacements(data)
-    documents = []
-
-    # 1. Generate petition, order, oath per selection logic
-    selected = select_opening_documents(data)
-    for template_name, output_title in selected:
-        doc = load_template(template_name)
-        replace_in_document(doc, replacements)
-        documents.append((output_title, doc))
-
-    # 2. Generate declinations
-    declinations = determine_declinations(data)
-    for decliner in declinations:
-        doc = generate_declination_doc(decliner, data)
+    return DECLINATION_FIELDS.bind({
+        'decliner_name': decliner['name'],
+        'decedent_name': data.get('decedent_full_name', ''),
+        'pr_name': data.get('pr_full_name', ''),
+        'decliner_relationship': decliner.get('relationship', ''),
+        'decliner_possessive': dec_pronouns['possessive'],
+        'pr_title': pr_title,
+        'decedent_county': data.get('decedent_county', ''),
+        'firm_name': data.get('firm_name', FIRM_CONSTANTS['firm_name']),
+    })
+
+
+def generate_declination_doc(decliner, data):
+    """Generate a single declination document for one person."""
+    return render_template(DECLINATION_TEMPLATE, declination_replacements(decliner, data))
+
+
+def plan_opening_package(data):
+    """Return the package plan: [(title, template_name, replacements)]."""
+    estate = Estate(data)
+    replacements = build_common_replacements(data, estate)
+
+    # 1. Petition, order, oath per selection logic
+    plan = [(output_title, template_name, replacements)
+            for template_name, output_title in select_opening_documents(data)]
+
+    # 2. Declinations
+    for decliner in determine_declinations(data, estate):
         title = f"Declination to Serve - {decliner['name']}"
-        documents.append((title, doc))
+        plan.append((title, DECLINATION_TEMPLATE, declination_replacements(decliner, data)))
+
+    return plan
+
+
+def generate_opening_package(data, residuals=None):
+    """Generate all opening documents and return as ZIP BytesIO.
+
+    residuals, if given, is filled with the placeholders left in each
+    document. data['placeholder_report'] adds them to the ZIP as a JSON
+    sidecar; data['strict_placeholders'] raises ResidualPlaceholderError
+    instead of returning a package with unfilled fields. data['deterministic']
+    makes the ZIP a pure function of the payload (see build_zip).
+    data['signing_packet'] returns the documents merged into one .docx
+    instead (see build_signing_packet).
+    """
+    if residuals is None:
+        residuals = {}
+    documents = render_plan(plan_opening_package(data))
 
-    # 3. Build ZIP
     date_str = data.get('generation_date') or None
-    return build_zip(documents, date_str)
+    if data.get('signing_packet'):
+        buffer = build_signing_packet(documents, date_str, residuals,
+                                      deterministic=bool(data.get('deterministic')))
+    else:
+        buffer = build_zip(documents, date_str, residuals, **zip_options(data))
+    check_residuals(residuals, strict=bool(data.get('strict_placeholders')))
+    return buffer
+
+
+def dry_run_opening_package(data):
+    """Describe the opening package a render would produce.
+
+    Loads no template, so it is cheap enough to call on every form change.
+    Returns the selected documents, declinations and flags, plus each
+    document's resolved placeholder values and unmapped placeholders (see
+    probate_utils.describe_plan).
+    """
+    estate = Estate(data)
+    return {
+        'dry_run': True,
+        'selected_documents': [{'template': template_name, 'title': title}
+                               for template_name, title in select_opening_documents(data)],
+        'declinations': determine_declinations(data, estate),
+        'flags': generate_flags(data, estate),
+        'documents': describe_plan(plan_opening_package(data)),
+    }
+
+
+def rerender_opening_package(old_data, data, previous_zip, residuals=None, rerendered=None):
+    """Regenerate an opening package after a payload correction.
+
+    Only documents that use a changed field (or that are new to the package)
+    are rendered; the rest are copied from previous_zip. Arguments otherwise
+    match generate_opening_package; see probate_utils.rerender_package.
+    """
+    if residuals is None:
+        residuals = {}
+    # Plan the old payload for the same day, so only real edits count as changes
+    date_str = package_date(data)
+    zip_buffer = rerender_package(plan_opening_package(dict(old_data, generation_date=date_str)),
+                                  plan_opening_package(data),
+                                  previous_zip, date_str, residuals,
+                                  rerendered=rerendered, **zip_options(data))
+    check_residuals(residuals, strict=bool(data.get('strict_placeholders')))
+    return zip_buffer
+
+
+def package_filename(data):
+    """Return the download filename for a package."""
+    decedent_name = data.get('decedent_full_name', 'Unknown').replace(' ', '_')
+    if data.get('signing_packet'):
+        return f"Probate_Opening_{decedent_name}_Signing_Packet.docx"
+    return f"Probate_Opening_{decedent_name}.zip"
+
+
+def render_job(data):
+    """Render a package for the async job worker (see job_store.run_job)."""
+    residuals = {}
+    zip_buffer = generate_opening_package(data, residuals)
+    return (package_filename(data), zip_buffer.getvalue(),
+            {'residual_placeholders': distinct_tokens(residuals)})
+
+
+def render_response(data):
+    """Render a package as (content, content type, filename, headers) for
+    render_cache.send_generated."""
+    residuals = {}
+    zip_buffer = generate_opening_package(data, residuals)
+    return (zip_buffer.getvalue(), package_content_type(data), package_filename(data),
+            [(HEADER_NAME, header_value(residuals))])
 
 
 class handler(BaseHTTPRequestHandler):
@@ -65,17 +170,68 @@ class handler(BaseHTTPRequestHandler):
             post_data = self.rfile.read(content_length)
             data = json.loads(post_data.decode('utf-8'))
 
-            zip_buffer = generate_opening_package(data)
+            if data.get('dry_run'):
+                # Plan only: which documents, with which values; no templates
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(json.dumps(dry_run_opening_package(data)).encode())
+                return
 
-            decedent_name = data.get('decedent_full_name', 'Unknown').replace(' ', '_')
-            filename = f"Probate_Opening_{decedent_name}.zip"
+            if data.get('preview'):
+                # HTML of every planned document, straight from the template
+                # outlines; no .docx is built
+                html = preview_plan(plan_opening_package(data),
+                                    package_filename(data).rsplit('.', 1)[0])
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.end_headers()
+                self.wfile.write(html.encode('utf-8'))
+                return
 
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/zip')
-            self.send_header('Content-Disposition',
-                             f'attachment; filename="{filename}"')
+            if data.get('async'):
+                job_id, _ = submit_job('probate-opening', data, render_job)
+                self.send_response(202)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(json.dumps({'job_id': job_id, 'status': 'queued',
+                                             **job_urls(job_id)}).encode())
+                return
+
+            previous = data.pop('previous', None)
+            if previous is not None and not data.get('signing_packet'):
+                # Correction of an earlier package: {"payload": ..., "zip": base64}.
+                # A signing packet is one document, so it is always rendered whole.
+                residuals = {}
+                old_data, previous_zip = decode_previous(previous)
+                zip_buffer = rerender_opening_package(old_data, data, previous_zip, residuals)
+                filename = package_filename(data)
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/zip')
+                self.send_header('Content-Disposition',
+                                 f'attachment; filename="{filename}"')
+                self.send_header(HEADER_NAME, header_value(residuals))
+                self.end_headers()
+                self.wfile.write(zip_buffer.getvalue())
+                return
+
+            # The documents carry today's date, so the render date is part of the ETag
+            send_generated(self, ENDPOINT, data, render_response,
+                           lambda: (templates_version(), date.today().isoformat()))
+
+        except (AsyncJobsUnavailable, InvalidPrevious) as e:
+            self.send_response(400)
+            self.send_header('Content-Type', 'application/json')
             self.end_headers()
-            self.wfile.write(zip_buffer.getvalue())
+            self.wfile.write(json.dumps({'error': str(e)}).encode())
+
+        except ResidualPlaceholderError as e:
+            self.send_response(422)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps({'error': str(e),
+                                         'residual_placeholders': e.residuals}).encode())
 
         except Exception as e:
             self.send_response(500)
@@ -83,9 +239,13 @@ class handler(BaseHTTPRequestHandler):
             self.end_headers()
             self.wfile.write(json.dumps({'error': str(e)}).encode())
 
+    def do_GET(self):
+        # Result URLs (Content-Location) of earlier renders
+        serve_cached_get(self, ENDPOINT)
+
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, If-None-Match')
         self.end_headers()
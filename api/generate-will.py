@@ -1,7 +1,6 @@
 from http.server import BaseHTTPRequestHandler
 import json
 from io import BytesIO
-from docx import Document
 from docx.shared import Inches, Pt, Emu
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml.ns import qn
@@ -22,19 +21,36 @@ except ImportError as e:
     print(f"[WILL] CRITICAL: Failed to import template_config: {e}")
     TEMPLATE_URLS = {'will': 'ERROR_NO_CONFIG'}
 
-# Module-level cache to avoid re-downloading templates on warm invocations
-_template_cache = {}
+from residual_placeholders import (
+    ResidualPlaceholderError, scan_docx, check_residuals, header_value, HEADER_NAME
+)
+from zip_policy import normalize_docx
+from render_cache import content_digest, send_generated, serve_cached_get
+from template_cache import TemplateCache
+from shared_templates import shared_drive_template
+from cache_backend import through_cache
+from template_store import store_uncompressed
+from lazy_parts import open_document
+from html_preview import element_outline, outline_html, preview_page
+
+ENDPOINT = 'generate-will'
+
+# Drive template cache, tiered as described in template_cache
+_template_cache = TemplateCache(lookup=shared_drive_template)
 
 def download_template(url):
-    """Download template from Google Drive, with in-memory caching.
+    """Download template from Google Drive, with in-memory caching."""
+    if url in _template_cache:
+        print(f"[WILL] Using cached template for: {url}")
+    return BytesIO(_template_cache.get(url, through_cache('template', _fetch_template)))
+
+def _fetch_template(url):
+    """Fetch template bytes from Google Drive.
 
     Uses requests for reliable redirect and cookie handling. Google Drive
     sometimes returns an HTML confirmation page for larger files; this
     function detects that and retries with the embedded confirm token.
     """
-    if url in _template_cache:
-        print(f"[WILL] Using cached template for: {url}")
-        return BytesIO(_template_cache[url])
     try:
         import requests as req_lib
         print(f"[WILL] Downloading template from: {url}")
@@ -58,8 +74,8 @@ def download_template(url):
             raise Exception("Downloaded file is not a valid .docx (failed ZIP header check). "
                             "Ensure the file is shared as 'Anyone with the link can view'.")
         print(f"[WILL] Template downloaded: {len(content)} bytes")
-        _template_cache[url] = content
-        return BytesIO(content)
+        # Cached uncompressed so each render only parses it
+        return store_uncompressed(content)
     except Exception as e:
         print(f"[WILL] Template download failed: {e}")
         raise Exception(f"Failed to download template: {str(e)}")
@@ -201,23 +217,29 @@ def replace_in_runs(para, old_text, new_text):
     if runs:
         runs[0].text = new_full_text
 
-def replace_in_document(doc, replacements):
-    """Replace all placeholders in document while preserving formatting"""
-    for para in doc.paragraphs:
+def replace_in_document(doc, replacements, substituted=None):
+    """Replace all placeholders in document while preserving formatting
+
+    substituted, if given, is filled with {w:p element: [values]} for the
+    paragraphs that received a value (for html_preview).
+    """
+    def replace(para):
         para_text = para.text
         for key, value in replacements.items():
             if key in para_text:
                 replace_in_runs(para, key, str(value))
+                if substituted is not None:
+                    substituted.setdefault(para._element, []).append(str(value))
+
+    for para in doc.paragraphs:
+        replace(para)
     
     # Also replace in tables
     for table in doc.tables:
         for row in table.rows:
             for cell in row.cells:
                 for para in cell.paragraphs:
-                    para_text = para.text
-                    for key, value in replacements.items():
-                        if key in para_text:
-                            replace_in_runs(para, key, str(value))
+                    replace(para)
 
 def handle_conditional_blocks(doc, data, children=None):
     """Handle ##IF_MARRIED## and similar conditional blocks"""
@@ -550,25 +572,8 @@ def format_children_list(children):
 
     return detailed, simple, num_word
 
-def generate_will_document(data):
-    """Generate Last Will and Testament using the template"""
-
-    # Download template from Google Drive
-    template_url = TEMPLATE_URLS.get('will', '')
-    if not template_url or template_url == 'ERROR_NO_CONFIG':
-        return {'error': 'Will template URL not configured'}
-
-    try:
-        template_buffer = download_template(template_url)
-        doc = Document(template_buffer)
-    except Exception as e:
-        return {'error': f'Could not load template: {str(e)}'}
-    
-    # Parse children data
-    children = []
-    if data.get('children'):
-        children = json.loads(data['children']) if isinstance(data['children'], str) else data['children']
-    
+def build_will_replacements(data, children):
+    """Build the will placeholder replacement dict from form data and parsed children"""
     # Format children
     children_detailed, children_simple, num_children_word = format_children_list(children)
     
@@ -617,12 +622,40 @@ def generate_will_document(data):
     else:
         replacements['{CHILDREN_DESCRIPTION}'] = ''
         replacements['{CHILDREN_DETAILED}'] = ''
+
+    return replacements
+
+def build_will_document(data, substituted=None):
+    """Run the will pipeline and return the filled Document.
+
+    Returns an {'error': ...} dict if the template cannot be loaded. For a
+    preview, pass substituted (see replace_in_document); the page number
+    footer is then skipped.
+    """
+
+    # Download template from Google Drive
+    template_url = TEMPLATE_URLS.get('will', '')
+    if not template_url or template_url == 'ERROR_NO_CONFIG':
+        return {'error': 'Will template URL not configured'}
+
+    try:
+        template_buffer = download_template(template_url)
+        doc = open_document(template_buffer)
+    except Exception as e:
+        return {'error': f'Could not load template: {str(e)}'}
     
+    # Parse children data
+    children = []
+    if data.get('children'):
+        children = json.loads(data['children']) if isinstance(data['children'], str) else data['children']
+    
+    replacements = build_will_replacements(data, children)
+
     # Step 1: Handle conditional blocks
     handle_conditional_blocks(doc, data, children)
 
     # Step 2: Replace all variables
-    replace_in_document(doc, replacements)
+    replace_in_document(doc, replacements, substituted)
     
     # Step 2b: Insert Specific Bequests paragraphs before "A. To My Spouse".
     # Placeholders use {braces} format for Curly (https://curly.io), the Word
@@ -738,48 +771,104 @@ def generate_will_document(data):
         if article_pattern.match(para.text.strip()):
             _format_heading_para(para)
 
-    # Step 7: Add page numbers if not already there
-    add_page_numbers(doc)
-    
+    # Step 7: Add page numbers if not already there (footers are not previewed)
+    if substituted is None:
+        add_page_numbers(doc)
+    return doc
+
+
+def generate_will_document(data, residuals=None):
+    """Generate Last Will and Testament using the template
+
+    residuals, if given, is filled with any placeholders left in the output;
+    data['strict_placeholders'] raises ResidualPlaceholderError instead.
+    """
+    doc = build_will_document(data)
+    if isinstance(doc, dict):
+        return doc
+
     # Save to BytesIO
     doc_io = BytesIO()
     doc.save(doc_io)
     doc_io.seek(0)
-    
+
+    # Step 8: Verify no placeholders survived (Curly fields are reported, not stripped)
+    if residuals is None:
+        residuals = {}
+    tokens = scan_docx(doc_io.getvalue())
+    if tokens:
+        residuals['will'] = tokens
+    check_residuals(residuals, strict=bool(data.get('strict_placeholders')))
+
     return doc_io
 
+def preview_will_html(data):
+    """Return an HTML preview of the will, without saving a .docx."""
+    substituted = {}
+    doc = build_will_document(data, substituted)
+    if isinstance(doc, dict):
+        return doc
+    title = f"LWT {format_name_for_filename(data.get('CLIENT_NAME', 'Document'))}"
+    return preview_page([(title, outline_html(element_outline(doc.element.body, substituted)))],
+                        title)
+
+def template_version():
+    """Digest of the will template for render ETags ('' if it cannot be fetched)."""
+    try:
+        return content_digest(download_template(TEMPLATE_URLS.get('will', '')).getvalue())
+    except Exception:
+        return ''
+
+
+def render_response(data):
+    """Render the will as (content, content type, filename, headers) for
+    render_cache.send_generated."""
+    residuals = {}
+    result = generate_will_document(data, residuals)
+    if isinstance(result, dict) and 'error' in result:
+        raise Exception(result['error'])
+
+    # Format filename as: YYYY-MM-DD LWT lastname firstname.docx
+    today = datetime.now().strftime('%Y-%m-%d')
+    formatted_name = format_name_for_filename(data.get("CLIENT_NAME", "Document"))
+    content = result.getvalue()
+    if data.get('deterministic'):
+        content = normalize_docx(content, today)
+    return (content, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+            f"{today} LWT {formatted_name}.docx", [(HEADER_NAME, header_value(residuals))])
+
+
 class handler(BaseHTTPRequestHandler):
     def do_POST(self):
         try:
             content_length = int(self.headers['Content-Length'])
             post_data = self.rfile.read(content_length)
             data = json.loads(post_data.decode('utf-8'))
-            
-            # Generate document
-            result = generate_will_document(data)
-            
-            if isinstance(result, dict) and 'error' in result:
-                self.send_response(500)
-                self.send_header('Content-Type', 'application/json')
+
+            if data.get('preview'):
+                # Live preview: the filled text as HTML, no .docx round trip
+                result = preview_will_html(data)
+                if isinstance(result, dict):
+                    raise Exception(result['error'])
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
                 self.send_header('Access-Control-Allow-Origin', '*')
                 self.end_headers()
-                self.wfile.write(json.dumps(result).encode())
+                self.wfile.write(result.encode('utf-8'))
                 return
-            
-            # Format filename as: YYYY-MM-DD LWT lastname firstname.docx
-            today = datetime.now().strftime('%Y-%m-%d')
-            formatted_name = format_name_for_filename(data.get("CLIENT_NAME", "Document"))
-            filename = f"{today} LWT {formatted_name}.docx"
-
-            # Send response
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
-            self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+
+            # Ages and the filename depend on today, so the date is part of the ETag
+            send_generated(self, ENDPOINT, data, render_response,
+                           lambda: (template_version(), datetime.now().strftime('%Y-%m-%d')))
+
+        except ResidualPlaceholderError as e:
+            self.send_response(422)
+            self.send_header('Content-Type', 'application/json')
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
+            self.wfile.write(json.dumps({'error': str(e),
+                                         'residual_placeholders': e.residuals}).encode())
 
-            self.wfile.write(result.getvalue())
-            
         except Exception as e:
             self.send_response(500)
             self.send_header('Content-Type', 'application/json')
@@ -788,9 +877,13 @@ class handler(BaseHTTPRequestHandler):
             error_response = json.dumps({'error': str(e)})
             self.wfile.write(error_response.encode())
     
+    def do_GET(self):
+        # Result URLs (Content-Location) of earlier renders
+        serve_cached_get(self, ENDPOINT)
+
     def do_OPTIONS(self):
         self.send_response(200)
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type, If-None-Match')
         self.end_headers()
@@ -0,0 +1,196 @@
+# api/html_preview.py
+"""Lightweight HTML previews of filled documents.
+
+A preview shows the text a render would produce, paragraph by paragraph,
+without building a .docx. Substituted values are wrapped in
+<mark class="value"> and placeholders nothing filled in
+<mark class="residual">, so a form can show a live preview.
+
+Values are marked by wrapping them in private-use sentinel characters
+before substitution (marked_values). This works with any replacement engine,
+and the HTML writer turns the sentinels into <mark> elements. A document
+whose pipeline inspects values after substitution is rendered with the plain
+values instead; its outline marks the values each paragraph received
+(element_outline's values argument, see mark_text).
+
+A template is reduced once to an outline of paragraphs and tables
+(docx_outline), which is all a preview needs. Formatting is taken per
+paragraph: its style and alignment, and bold/italic/underline from the first
+run, which is the run a render leaves the merged text in.
+"""
+import html
+import io
+import re
+import zipfile
+from collections import namedtuple
+
+from lxml import etree
+
+from field_registry import ReplacementMap
+from residual_placeholders import RESIDUAL_TOKEN
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+# Private-use characters, which never occur in template or intake text
+VALUE_START, VALUE_END = '\ue000', '\ue001'
+_VALUE = re.compile(f'{VALUE_START}(.*?){VALUE_END}', re.S)
+_ALIGNMENT = {'center': 'center', 'right': 'right', 'end': 'right', 'both': 'justify'}
+
+Paragraph = namedtuple('Paragraph', 'style align bold italic underline text')
+Table = namedtuple('Table', 'rows')
+
+PAGE_STYLE = """
+body { font-family: "Times New Roman", serif; font-size: 12pt; max-width: 7.5in;
+       margin: 1em auto; color: #111; }
+section { border-bottom: 1px solid #ccc; padding-bottom: 1em; margin-bottom: 2em; }
+section > h1 { font: bold 10pt sans-serif; color: #555; }
+p { white-space: pre-wrap; margin: 0 0 .4em; min-height: 1em; }
+p.heading { font-weight: bold; }
+table { border-collapse: collapse; width: 100%; }
+td { vertical-align: top; padding: 0 .3em; }
+mark.value { background: #dff0d8; }
+mark.residual { background: #f8d7da; }
+"""
+
+
+def mark_value(value):
+    """Wrap a non-empty value in the preview sentinels."""
+    value = str(value)
+    return f'{VALUE_START}{value}{VALUE_END}' if value else value
+
+
+def marked_values(replacements):
+    """Return replacements (a ReplacementMap or dict) with every value marked."""
+    if isinstance(replacements, ReplacementMap):
+        return ReplacementMap(replacements.registry,
+                              {field: mark_value(value)
+                               for field, value in replacements.values.items()})
+    return {placeholder: mark_value(value) for placeholder, value in replacements.items()}
+
+
+# --- Outline ---
+
+def _on(element):
+    return element is not None and element.get(W + 'val') not in ('0', 'false', 'none')
+
+
+def _paragraph(p):
+    ppr = p.find(W + 'pPr')
+    style = align = None
+    if ppr is not None:
+        pstyle, jc = ppr.find(W + 'pStyle'), ppr.find(W + 'jc')
+        style = pstyle.get(W + 'val') if pstyle is not None else None
+        align = _ALIGNMENT.get(jc.get(W + 'val')) if jc is not None else None
+    text = []
+    rpr = None
+    for run in p.iter(W + 'r'):
+        for child in run:
+            if child.tag == W + 't':
+                text.append(child.text or '')
+            elif child.tag == W + 'tab':
+                text.append('\t')
+            elif child.tag in (W + 'br', W + 'cr'):
+                text.append('\n')
+            elif child.tag == W + 'rPr' and rpr is None:
+                rpr = child
+    if rpr is None:
+        bold = italic = underline = False
+    else:
+        bold, italic, underline = (_on(rpr.find(W + tag)) for tag in ('b', 'i', 'u'))
+    return Paragraph(style, align, bold, italic, underline, ''.join(text))
+
+
+def mark_text(text, values):
+    """Wrap every whole-word occurrence of the values in text in the sentinels."""
+    values = sorted({str(value) for value in values if str(value)}, key=len, reverse=True)
+    if not values:
+        return text
+    pattern = re.compile(r'(?<!\w)(?:' + '|'.join(map(re.escape, values)) + r')(?!\w)')
+    return pattern.sub(lambda match: mark_value(match.group()), text)
+
+
+def element_outline(container, values=None):
+    """Return the paragraphs and tables directly inside a w:body or w:tc.
+
+    values, if given, maps w:p elements to the values substituted into them;
+    those are marked in the paragraph text (mark_text).
+    """
+    blocks = []
+    for child in container:
+        if child.tag == W + 'p':
+            paragraph = _paragraph(child)
+            if values and child in values:
+                paragraph = paragraph._replace(text=mark_text(paragraph.text, values[child]))
+            blocks.append(paragraph)
+        elif child.tag == W + 'tbl':
+            blocks.append(Table([[element_outline(tc, values) for tc in tr.findall(W + 'tc')]
+                                 for tr in child.findall(W + 'tr')]))
+    return blocks
+
+
+def docx_outline(docx_bytes):
+    """Return the body outline of a .docx, read straight from its XML."""
+    with zipfile.ZipFile(io.BytesIO(docx_bytes)) as package:
+        root = etree.fromstring(package.read('word/document.xml'))
+    return element_outline(root.find(W + 'body'))
+
+
+# --- HTML ---
+
+def text_html(text):
+    """Escape text, marking sentinel-wrapped values and leftover placeholders."""
+    out = []
+    position = 0
+    for match in _VALUE.finditer(text):
+        out.append(_residuals_html(text[position:match.start()]))
+        out.append(f'<mark class="value">{html.escape(match.group(1))}</mark>')
+        position = match.end()
+    out.append(_residuals_html(text[position:]))
+    return ''.join(out)
+
+
+def _residuals_html(text):
+    out = []
+    position = 0
+    for match in RESIDUAL_TOKEN.finditer(text):
+        out.append(html.escape(text[position:match.start()]))
+        out.append(f'<mark class="residual">{html.escape(match.group())}</mark>')
+        position = match.end()
+    out.append(html.escape(text[position:]))
+    return ''.join(out)
+
+
+def paragraph_html(paragraph, text):
+    content = text_html(text)
+    for flag, tag in ((paragraph.underline, 'u'), (paragraph.italic, 'i'), (paragraph.bold, 'b')):
+        if flag:
+            content = f'<{tag}>{content}</{tag}>'
+    attributes = ''
+    if paragraph.style and paragraph.style.lower().startswith(('heading', 'title')):
+        attributes += ' class="heading"'
+    if paragraph.align:
+        attributes += f' style="text-align:{paragraph.align}"'
+    return f'<p{attributes}>{content}</p>'
+
+
+def outline_html(blocks, substitute=None):
+    """Render an outline to HTML, passing each paragraph's text through substitute."""
+    out = []
+    for block in blocks:
+        if isinstance(block, Table):
+            rows = ''.join('<tr>' + ''.join(f'<td>{outline_html(cell, substitute)}</td>'
+                                            for cell in row) + '</tr>'
+                           for row in block.rows)
+            out.append(f'<table>{rows}</table>')
+        else:
+            text = substitute(block.text) if substitute else block.text
+            out.append(paragraph_html(block, text))
+    return '\n'.join(out)
+
+
+def preview_page(sections, title='Document preview'):
+    """Return a standalone HTML page for [(document title, body html)]."""
+    body = '\n'.join(f'<section><h1>{html.escape(name)}</h1>\n{content}\n</section>'
+                     for name, content in sections)
+    return (f'<!DOCTYPE html>\n<html><head><meta charset="utf-8">'
+            f'<title>{html.escape(title)}</title><style>{PAGE_STYLE}</style></head>\n'
+            f'<body>\n{body}\n</body></html>\n')
@@ -0,0 +1,240 @@
+# api/job_store.py
+"""Background job storage for asynchronous probate package generation.
+
+A submit request stores the intake payload as a job and renders it on a
+worker thread; clients poll probate-jobs.py for status and download the
+result when it is done. Storage is pluggable: JobStore defines the interface
+and LocalFileJobStore keeps each job in its own directory, which is what the
+tests use.
+
+Jobs need a long-lived server process: local_server.py or asgi_app.py, whose
+workers share one machine's job directory. A serverless function instance
+may be frozen as soon as its response is sent, taking the worker thread with
+it, and its /tmp is invisible to the instance serving probate-jobs.py. So
+submit_job refuses with AsyncJobsUnavailable unless the process has opted in
+(enable_async_jobs, or PROBATE_ASYNC_JOBS=1 in the environment).
+
+Payloads and results hold client data: job files are readable by their owner
+only, and a job not updated for JOB_TTL_SECONDS (env PROBATE_JOB_TTL) is
+deleted when the next one is created.
+
+Job status is one of 'queued', 'running', 'done' or 'failed'.
+"""
+import json
+import os
+import re
+from abc import ABC, abstractmethod
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+DEFAULT_JOB_DIR = os.path.join(tempfile.gettempdir(), 'probate-jobs')
+JOB_TTL_SECONDS = int(os.environ.get('PROBATE_JOB_TTL', 3600))
+ASYNC_JOBS_ENV = 'PROBATE_ASYNC_JOBS'
+_JOB_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class JobNotFound(KeyError):
+    """Raised when a job id is unknown to the store."""
+
+
+class AsyncJobsUnavailable(RuntimeError):
+    """Raised when a job is submitted in a process that cannot run it."""
+
+
+class JobStore(ABC):
+    """Interface for job storage backends."""
+
+    @abstractmethod
+    def create(self, kind, payload):
+        """Store a new queued job and return its id."""
+
+    @abstractmethod
+    def get(self, job_id):
+        """Return the job's status record (a dict); raise JobNotFound."""
+
+    @abstractmethod
+    def load_payload(self, job_id):
+        """Return the payload the job was submitted with."""
+
+    @abstractmethod
+    def update(self, job_id, **fields):
+        """Merge fields into the job's status record and return it."""
+
+    @abstractmethod
+    def put_result(self, job_id, content):
+        """Store the finished output bytes."""
+
+    @abstractmethod
+    def get_result(self, job_id):
+        """Return the finished output bytes."""
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+class LocalFileJobStore(JobStore):
+    """Job store backed by one directory per job under root.
+
+    Each job directory holds job.json (status record), payload.json and,
+    once rendered, result.bin. Writes go through a temporary file and
+    os.replace so a poller never reads a half-written record.
+    """
+
+    def __init__(self, root=DEFAULT_JOB_DIR, ttl=None):
+        self.root = root
+        self.ttl = JOB_TTL_SECONDS if ttl is None else ttl
+        self._lock = threading.Lock()
+        os.makedirs(root, mode=0o700, exist_ok=True)
+
+    def _path(self, job_id, name):
+        if not _JOB_ID.match(job_id or ''):
+            raise JobNotFound(job_id)
+        return os.path.join(self.root, job_id, name)
+
+    def _write(self, path, content):
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.replace(tmp, path)
+
+    def _write_json(self, path, value):
+        self._write(path, json.dumps(value).encode('utf-8'))
+
+    def _read(self, job_id, name):
+        try:
+            with open(self._path(job_id, name), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            raise JobNotFound(job_id) from None
+
+    def create(self, kind, payload):
+        self.purge_expired()
+        job_id = uuid.uuid4().hex
+        os.makedirs(os.path.join(self.root, job_id), mode=0o700)
+        self._write_json(self._path(job_id, 'payload.json'), payload)
+        self._write_json(self._path(job_id, 'job.json'), {
+            'id': job_id, 'kind': kind, 'status': 'queued',
+            'created': _now(), 'updated': _now(),
+        })
+        return job_id
+
+    def get(self, job_id):
+        return json.loads(self._read(job_id, 'job.json'))
+
+    def load_payload(self, job_id):
+        return json.loads(self._read(job_id, 'payload.json'))
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            record = self.get(job_id)
+            record.update(fields, updated=_now())
+            self._write_json(self._path(job_id, 'job.json'), record)
+        return record
+
+    def put_result(self, job_id, content):
+        self._write(self._path(job_id, 'result.bin'), content)
+
+    def get_result(self, job_id):
+        return self._read(job_id, 'result.bin')
+
+    def purge_expired(self, now=None):
+        """Delete jobs whose record was last updated more than ttl seconds ago.
+
+        Returns the number of jobs deleted.
+        """
+        cutoff = (time.time() if now is None else now) - self.ttl
+        purged = 0
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if not (entry.is_dir() and _JOB_ID.match(entry.name)):
+                    continue
+                try:
+                    updated = os.stat(os.path.join(entry.path, 'job.json')).st_mtime
+                except FileNotFoundError:
+                    # Being created, or already half deleted
+                    continue
+                if updated < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+                    purged += 1
+        return purged
+
+
+def run_job(store, job_id, render):
+    """Render one job and record the outcome.
+
+    render(payload) returns (filename, content_bytes, extra_status_fields).
+    Any exception marks the job failed with its message.
+    """
+    store.update(job_id, status='running')
+    try:
+        filename, content, extra = render(store.load_payload(job_id))
+        store.put_result(job_id, content)
+        store.update(job_id, status='done', filename=filename, **extra)
+    except Exception as e:
+        store.update(job_id, status='failed', error=str(e))
+
+
+def async_jobs_enabled():
+    """Return whether this process may run jobs in the background."""
+    return os.environ.get(ASYNC_JOBS_ENV, '') not in ('', '0', 'false')
+
+
+def enable_async_jobs():
+    """Opt this server process, and the workers it starts, in to async jobs."""
+    os.environ[ASYNC_JOBS_ENV] = '1'
+
+
+def submit_job(kind, payload, render, store=None):
+    """Create a job and start rendering it on a worker thread.
+
+    Returns (job_id, thread) so callers (and tests) can join the worker.
+    Raises AsyncJobsUnavailable unless async_jobs_enabled().
+    """
+    if not async_jobs_enabled():
+        raise AsyncJobsUnavailable(
+            'Asynchronous jobs need a long-running server and are not available '
+            'on serverless deployments such as Vercel. Send the request without '
+            '"async", or, for packages that take longer than the function time '
+            'limit, run the generators with local_server.py or asgi_app.py (see '
+            'README, "Large probate packages")')
+    store = store or get_job_store()
+    job_id = store.create(kind, payload)
+    thread = threading.Thread(target=run_job, args=(store, job_id, render),
+                              name=f'job-{job_id}')
+    thread.start()
+    return job_id, thread
+
+
+def job_urls(job_id):
+    """Return the polling and download URLs for a job."""
+    return {
+        'status_url': f'/api/probate-jobs?id={job_id}',
+        'download_url': f'/api/probate-jobs?id={job_id}&download=1',
+    }
+
+
+_job_store = None
+
+
+def get_job_store():
+    """Return the configured store (a LocalFileJobStore by default).
+
+    The default directory can be moved with the PROBATE_JOB_DIR environment
+    variable.
+    """
+    global _job_store
+    if _job_store is None:
+        _job_store = LocalFileJobStore(os.environ.get('PROBATE_JOB_DIR', DEFAULT_JOB_DIR))
+    return _job_store
+
+
+def set_job_store(store):
+    """Install a different JobStore implementation."""
+    global _job_store
+    _job_store = store
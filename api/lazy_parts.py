@@ -0,0 +1,119 @@
+# api/lazy_parts.py
+"""Lazy parsing of .docx package parts.
+
+When python-docx opens a document it parses the styles, numbering, settings,
+header, footer and core-properties parts as well as the main document, and
+re-serializes all of them on save. Renders only modify the main document
+and occasionally a footer (add_page_numbers).
+
+open_document() opens a .docx like docx.Document, but loads those parts
+as lazy subclasses of their part classes. A lazy part keeps its raw bytes
+until something reads its XML, which parses it transparently. A part that
+was never read is saved as the original bytes. The main document part stays
+eager, since every render uses it.
+
+Only documents opened through open_document() are affected: python-docx's
+process-wide PartFactory registry is left alone, so importing a module that
+renders lazily does not change how any other code parses documents.
+"""
+from docx.opc.constants import CONTENT_TYPE as CT
+from docx.opc.oxml import serialize_part_xml
+from docx.opc.package import Unmarshaller
+from docx.opc.part import PartFactory
+from docx.opc.pkgreader import PackageReader
+from docx.package import Package
+from docx.opc.parts.coreprops import CorePropertiesPart
+from docx.oxml.parser import parse_xml
+from docx.parts.hdrftr import FooterPart, HeaderPart
+from docx.parts.numbering import NumberingPart
+from docx.parts.settings import SettingsPart
+from docx.parts.styles import StylesPart
+
+
+class LazyXmlPart:
+    """Mixin for python-docx XmlPart subclasses: parse on first access."""
+
+    _parsed = None
+    _raw = None
+
+    @classmethod
+    def load(cls, partname, content_type, blob, package):
+        part = cls(partname, content_type, None, package)
+        part._raw = blob
+        return part
+
+    @property
+    def _element(self):
+        if self._parsed is None and self._raw is not None:
+            self._parsed = parse_xml(self._raw)
+            self._raw = None
+        return self._parsed
+
+    @_element.setter
+    def _element(self, element):
+        self._parsed = element
+        self._raw = None
+
+    @property
+    def is_parsed(self):
+        return self._raw is None
+
+    @property
+    def blob(self):
+        if self._raw is not None:
+            return self._raw
+        return serialize_part_xml(self._parsed)
+
+
+class LazyStylesPart(LazyXmlPart, StylesPart):
+    pass
+
+
+class LazySettingsPart(LazyXmlPart, SettingsPart):
+    pass
+
+
+class LazyNumberingPart(LazyXmlPart, NumberingPart):
+    pass
+
+
+class LazyHeaderPart(LazyXmlPart, HeaderPart):
+    pass
+
+
+class LazyFooterPart(LazyXmlPart, FooterPart):
+    pass
+
+
+class LazyCorePropertiesPart(LazyXmlPart, CorePropertiesPart):
+    pass
+
+
+LAZY_PART_TYPES = {
+    CT.WML_STYLES: LazyStylesPart,
+    CT.WML_SETTINGS: LazySettingsPart,
+    CT.WML_NUMBERING: LazyNumberingPart,
+    CT.WML_HEADER: LazyHeaderPart,
+    CT.WML_FOOTER: LazyFooterPart,
+    CT.OPC_CORE_PROPERTIES: LazyCorePropertiesPart,
+}
+
+
+def _load_part(partname, content_type, reltype, blob, package):
+    """Part factory for one package: LAZY_PART_TYPES, else python-docx's."""
+    part_type = LAZY_PART_TYPES.get(content_type)
+    if part_type is None:
+        return PartFactory(partname, content_type, reltype, blob, package)
+    return part_type.load(partname, content_type, blob, package)
+
+
+def open_document(docx):
+    """Return the Document in docx (a path or file-like object), with the
+    LAZY_PART_TYPES parts loaded lazily."""
+    package = Package()
+    Unmarshaller.unmarshal(PackageReader.from_file(docx), package, _load_part)
+    document_part = package.main_document_part
+    if document_part.content_type != CT.WML_DOCUMENT_MAIN:
+        raise ValueError(f"file '{docx}' is not a Word file, "
+                         f"content type is '{document_part.content_type}'")
+    return document_part.document
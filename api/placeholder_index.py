@@ -0,0 +1,239 @@
+# api/placeholder_index.py
+"""Placeholder coverage report across every document template.
+
+Scans each template once, builds an inverted index from placeholder to the
+templates and paragraphs that use it, and cross-checks the index against the
+replacement maps that fill each template family. Two lists come out of it:
+
+- unmapped: placeholders in a template that its family never fills, which
+  would survive into the generated document
+- dead aliases: spellings in a replacement map that no template uses
+
+Usage:
+    python api/placeholder_index.py            # local template copies
+    python api/placeholder_index.py --drive    # live Google Drive templates
+    python api/placeholder_index.py --json
+    python api/placeholder_index.py --manifest # rewrite the dry-run manifest
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import re
+import sys
+import zipfile
+from lxml import etree
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from field_registry import compile_matcher
+from probate_utils import (
+    COMMON_FIELDS, TEMPLATE_DIR, DECLINATION_TEMPLATE, OPENING_DOCUMENT_TABLE,
+    CLOSING_DOCUMENT_TABLE, RECEIPT_WAIVER_TABLE, PLACEHOLDER_MANIFEST
+)
+
+API_DIR = os.path.dirname(__file__)
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_SCANNED_PART = re.compile(r'^word/(document|header\d*|footer\d*)\.xml$')
+
+# Local copies of the Drive-hosted templates, by TEMPLATE_URLS key
+LOCAL_DRIVE_TEMPLATES = {
+    'will': os.path.join(API_DIR, 'templates', 'will_template.docx'),
+    'poa': os.path.join(API_DIR, 'POA.docx'),
+    'hcpoa': os.path.join(API_DIR, 'HCPOA.docx'),
+    'acp': os.path.join(API_DIR, 'Advance_Care_Plan.docx'),
+}
+
+GENERATOR_MODULES = {
+    'will': 'generate-will.py',
+    'poa': 'generate-poa.py',
+    'hcpoa': 'generate-hcpoa.py',
+    'acp': 'generate-acp.py',
+    'probate-opening': 'generate-probate-opening.py',
+    'probate-closing': 'generate-probate-closing.py',
+}
+
+
+class _KeyProbe(dict):
+    """Form data stand-in: every missing key reads as an empty string."""
+
+    def __missing__(self, key):
+        return ''
+
+
+def _load_generator(key):
+    """Import a hyphenated generator module, silencing its startup logging."""
+    filename = GENERATOR_MODULES[key]
+    spec = importlib.util.spec_from_file_location(
+        filename[:-3].replace('-', '_'), os.path.join(API_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    with contextlib.redirect_stdout(io.StringIO()):
+        spec.loader.exec_module(module)
+    return module
+
+
+def scan_template(docx_bytes, scanner=None):
+    """Return {placeholder: [location, ...]} for one .docx.
+
+    Text is read per paragraph across all runs, so placeholders that Word
+    split over several runs are found whole. Locations look like
+    'document.xml:p12' (paragraph ordinal within the part).
+    """
+    scanner = scanner or compile_matcher(())
+    found = {}
+    with zipfile.ZipFile(io.BytesIO(docx_bytes)) as zf:
+        for part in zf.namelist():
+            if not _SCANNED_PART.match(part):
+                continue
+            root = etree.fromstring(zf.read(part))
+            for n, paragraph in enumerate(root.iter(W_NS + 'p')):
+                text = ''.join(t.text or '' for t in paragraph.iter(W_NS + 't'))
+                for token in scanner.findall(text):
+                    found.setdefault(token, []).append(f'{part[5:]}:p{n}')
+    return found
+
+
+def template_families(drive=False):
+    """Return a list of (family, mapped_spellings, {label: docx_bytes}).
+
+    mapped_spellings is None for templates no generator can select.
+    """
+    opening = _load_generator('probate-opening')
+    closing = _load_generator('probate-closing')
+
+    def read(path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def probate(names):
+        return {name: read(os.path.join(TEMPLATE_DIR, name)) for name in sorted(names)}
+
+    common = {t for table in (OPENING_DOCUMENT_TABLE, CLOSING_DOCUMENT_TABLE)
+              for documents in table.values() for t, _ in documents}
+    receipts = set(RECEIPT_WAIVER_TABLE.values())
+    selected = common | receipts | {DECLINATION_TEMPLATE}
+    unreachable = set(os.listdir(TEMPLATE_DIR)) - selected
+
+    families = [
+        ('probate-common', set(COMMON_FIELDS.aliases), probate(common)),
+        ('probate-declination', set(opening.DECLINATION_FIELDS.aliases),
+         probate([DECLINATION_TEMPLATE])),
+        ('probate-receipt-waiver', set(closing.RECEIPT_WAIVER_FIELDS.aliases),
+         probate(receipts)),
+        ('probate-unreachable', None,
+         probate(n for n in unreachable if n.endswith('.docx'))),
+    ]
+
+    for key in ('will', 'poa', 'hcpoa', 'acp'):
+        module = _load_generator(key)
+        if key == 'will':
+            mapped = module.build_will_replacements(_KeyProbe(), [])
+        else:
+            mapped = module.build_replacements(_KeyProbe())
+        if drive:
+            with contextlib.redirect_stdout(io.StringIO()):
+                content = module.download_template(module.TEMPLATE_URLS[key]).getvalue()
+            label = f'{key} (Drive)'
+        else:
+            content = read(LOCAL_DRIVE_TEMPLATES[key])
+            label = os.path.relpath(LOCAL_DRIVE_TEMPLATES[key], API_DIR)
+        families.append((key, set(mapped), {label: content}))
+
+    return families
+
+
+def build_report(families):
+    """Scan every template once and cross-check against the replacement maps.
+
+    Returns a dict with:
+        index: {placeholder: [{'template', 'location'}, ...]}
+        templates: {label: {'family', 'placeholders', 'unmapped'}}
+        dead_aliases: {family: [spellings no template in the family uses]}
+    """
+    literals = set()
+    for _, mapped, _ in families:
+        literals.update(s for s in (mapped or ()) if not s.startswith('{'))
+    scanner = compile_matcher(tuple(sorted(literals)))
+
+    index = {}
+    templates = {}
+    dead_aliases = {}
+    for family, mapped, sources in families:
+        used = set()
+        for label, content in sources.items():
+            found = scan_template(content, scanner)
+            used.update(found)
+            for placeholder, locations in found.items():
+                index.setdefault(placeholder, []).extend(
+                    {'template': label, 'location': loc} for loc in locations)
+            templates[label] = {
+                'family': family,
+                'placeholders': sorted(found),
+                'unmapped': sorted(p for p in found
+                                   if mapped is not None and p not in mapped),
+            }
+        if mapped is not None:
+            dead_aliases[family] = sorted(mapped - used)
+
+    return {
+        'index': {p: index[p] for p in sorted(index)},
+        'templates': templates,
+        'dead_aliases': dead_aliases,
+    }
+
+
+def build_manifest(report):
+    """Return {probate template: [placeholders]} for dry-run requests."""
+    return {label: info['placeholders'] for label, info in sorted(report['templates'].items())
+            if info['family'].startswith('probate')}
+
+
+def write_manifest(report, path=PLACEHOLDER_MANIFEST):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(build_manifest(report), f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+
+def format_report(report):
+    """Render the report as plain text for the terminal."""
+    lines = []
+    for label, info in report['templates'].items():
+        if info['unmapped']:
+            lines.append(f"{label} [{info['family']}]")
+            for placeholder in info['unmapped']:
+                where = ', '.join(entry['location'] for entry in report['index'][placeholder]
+                                  if entry['template'] == label)
+                lines.append(f"    unmapped {placeholder}  ({where})")
+    for family, spellings in report['dead_aliases'].items():
+        if spellings:
+            lines.append(f"{family}: {len(spellings)} dead aliases")
+            lines.extend(f"    {s}" for s in spellings)
+    unmapped_total = sum(len(i['unmapped']) for i in report['templates'].values())
+    lines.append(f"{len(report['templates'])} templates, {len(report['index'])} "
+                 f"distinct placeholders, {unmapped_total} unmapped")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--drive', action='store_true',
+                        help='scan the live Google Drive templates instead of local copies')
+    parser.add_argument('--json', action='store_true', help='print the full report as JSON')
+    parser.add_argument('--manifest', action='store_true',
+                        help=f'also write {os.path.relpath(PLACEHOLDER_MANIFEST, API_DIR)}')
+    args = parser.parse_args(argv)
+
+    report = build_report(template_families(drive=args.drive))
+    if args.manifest:
+        write_manifest(report)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
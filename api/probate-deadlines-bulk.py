@@ -0,0 +1,86 @@
+"""Bulk statutory deadline calculation for a docket of open estates.
+
+POST a CSV (Content-Type: text/csv) or JSON (a list of rows, or
+{"rows": [...]}) where each row has matter, dod and an optional
+publication_date. Results stream back one row at a time, as CSV by default
+or as newline-delimited JSON with ?format=ndjson. Each deadline is reported
+raw and adjusted forward past weekends and court holidays.
+"""
+from http.server import BaseHTTPRequestHandler
+import csv
+import io
+import json
+from urllib.parse import urlparse, parse_qs
+from probate_utils import (
+    calculate_deadlines_bulk, DEADLINE_FIELDS, ADJUSTED_DEADLINE_FIELDS
+)
+from court_calendar import get_court_calendar
+
+OUTPUT_FIELDS = ('matter',) + DEADLINE_FIELDS + ADJUSTED_DEADLINE_FIELDS + ('error',)
+
+
+def parse_rows(body, content_type):
+    """Return an iterable of row dicts from a CSV or JSON request body."""
+    text = body.decode('utf-8-sig')
+    if 'csv' in (content_type or ''):
+        return csv.DictReader(io.StringIO(text))
+    payload = json.loads(text)
+    if isinstance(payload, dict):
+        payload = payload.get('rows', [])
+    return payload
+
+
+def format_csv(results):
+    """Yield CSV text chunks: a header line, then one line per result."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=OUTPUT_FIELDS, extrasaction='ignore')
+    writer.writeheader()
+    for result in results:
+        writer.writerow(result)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.getvalue():
+        yield buffer.getvalue()
+
+
+def format_ndjson(results):
+    """Yield one JSON line per result."""
+    for result in results:
+        yield json.dumps(result) + '\n'
+
+
+class handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        try:
+            content_length = int(self.headers['Content-Length'])
+            post_data = self.rfile.read(content_length)
+            rows = parse_rows(post_data, self.headers.get('Content-Type'))
+            query = parse_qs(urlparse(self.path).query)
+            output_format = query.get('format', ['csv'])[0]
+        except Exception as e:
+            self.send_response(400)
+            self.send_header('Content-Type', 'application/json')
+            self.end_headers()
+            self.wfile.write(json.dumps({'error': str(e)}).encode())
+            return
+
+        results = calculate_deadlines_bulk(rows, get_court_calendar())
+        if output_format == 'ndjson':
+            content_type, chunks = 'application/x-ndjson', format_ndjson(results)
+        else:
+            content_type, chunks = 'text/csv', format_csv(results)
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        for chunk in chunks:
+            self.wfile.write(chunk.encode())
+
+    def do_OPTIONS(self):
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.end_headers()
@@ -0,0 +1,56 @@
+"""Status and download for asynchronous probate package jobs.
+
+Submit a job by POSTing to generate-probate-opening or
+generate-probate-closing with "async": true in the payload; the 202 response
+carries the job id. Then:
+
+    GET /api/probate-jobs?id=<job_id>             -> status JSON
+    GET /api/probate-jobs?id=<job_id>&download=1  -> the ZIP (or signing packet) once done
+"""
+from http.server import BaseHTTPRequestHandler
+import json
+from urllib.parse import urlparse, parse_qs
+from job_store import get_job_store, job_urls, JobNotFound
+from signing_packet import DOCX_CONTENT_TYPE
+
+
+class handler(BaseHTTPRequestHandler):
+    def _send_json(self, status, body):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        job_id = query.get('id', [''])[0]
+        store = get_job_store()
+        try:
+            job = store.get(job_id)
+            if not query.get('download'):
+                self._send_json(200, dict(job, **job_urls(job_id)))
+                return
+            if job['status'] != 'done':
+                self._send_json(409, {'error': f"Job is {job['status']}", 'status': job['status']})
+                return
+            content = store.get_result(job_id)
+        except JobNotFound:
+            self._send_json(404, {'error': f'Unknown job id: {job_id}'})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', DOCX_CONTENT_TYPE if job['filename'].endswith('.docx')
+                         else 'application/zip')
+        self.send_header('Content-Disposition',
+                         f'attachment; filename="{job["filename"]}"')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_OPTIONS(self):
+        self.send_response(200)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.end_headers()
@@ -1,10 +1,28 @@
 # api/probate_utils.py
 """Shared utilities for probate document generation."""
+import base64
+import binascii
+import calendar
+import hashlib
+import json
 import os
+import re
 import zipfile
+from functools import lru_cache
 from io import BytesIO
-from datetime import datetime, timedelta
-from docx import Document
+from datetime import date, datetime, timedelta
+from court_calendar import get_court_calendar
+from field_registry import FieldRegistry, as_replacement_map
+from residual_placeholders import scan_docx, REPORT_FILENAME
+from template_store import open_template_store, open_compiled_store, store_uncompressed
+from template_cache import TemplateCache
+from template_config import FIRM_CONSTANTS
+from lazy_parts import open_document
+from zip_policy import (ZIP_COMPRESSION, ZIP_COMPRESSLEVEL, entry_compression, zip_date_time,
+                        fixed_zipinfo, normalize_docx)
+from shared_templates import shared_probate_store
+from html_preview import docx_outline, marked_values, outline_html, preview_page
+from signing_packet import DefinitionTable, merge_documents, DOCX_CONTENT_TYPE
 
 
 # --- Pronoun & Title Derivation ---
@@ -67,133 +85,682 @@ def merge_runs_in_paragraph(paragraph):
         paragraph.runs[0].text = full_text
 
 
-def replace_in_document(doc, replacements):
-    """Replace all placeholders in a document. Merges runs first."""
-    for paragraph in doc.paragraphs:
-        merge_runs_in_paragraph(paragraph)
+def iter_document_paragraphs(doc):
+    """Yield body paragraphs, then paragraphs inside table cells."""
+    yield from doc.paragraphs
     for table in doc.tables:
         for row in table.rows:
             for cell in row.cells:
-                for paragraph in cell.paragraphs:
-                    merge_runs_in_paragraph(paragraph)
-
-    for paragraph in doc.paragraphs:
-        for placeholder, value in replacements.items():
-            if placeholder in paragraph.text:
-                for run in paragraph.runs:
-                    if placeholder in run.text:
-                        run.text = run.text.replace(placeholder, value)
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                for paragraph in cell.paragraphs:
-                    for placeholder, value in replacements.items():
-                        if placeholder in paragraph.text:
-                            for run in paragraph.runs:
-                                if placeholder in run.text:
-                                    run.text = run.text.replace(placeholder, value)
+                yield from cell.paragraphs
+
+
+def replace_in_document(doc, replacements, healed=False):
+    """Replace all placeholders in a document. Merges runs first.
+
+    replacements may be a ReplacementMap bound to a FieldRegistry or a plain
+    {placeholder: value} dict. Each paragraph is scanned once and every
+    matched token is resolved through the registry. Pass healed=True for a
+    document whose runs are already merged (a compiled artifact or an
+    evaluated template); merging again would not change it.
+    """
+    replacements = as_replacement_map(replacements)
+    for paragraph in iter_document_paragraphs(doc):
+        if not healed:
+            merge_runs_in_paragraph(paragraph)
+        runs = paragraph.runs
+        if not runs:
+            continue
+        text = runs[0].text
+        new_text = replacements.substitute(text)
+        if new_text != text:
+            runs[0].text = new_text
+
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), 'probate-templates')
+# {template: [placeholders]}, written by placeholder_index.py --manifest
+PLACEHOLDER_MANIFEST = os.path.join(os.path.dirname(__file__),
+                                    'probate-templates.placeholders.json')
+
+# Documents are mutated during a render, so the store only holds template
+# bytes and every load_template() call parses a fresh copy. The store is the
+# shared-memory segment when a warm-up process published one (see
+# shared_templates; it holds the compiled artifacts whenever they could be
+# built), else the precompiled artifacts (see compiled_templates) or the
+# memory-mapped pack when built on the host (see template_store).
+_template_store = None
+
+
+def get_template_store():
+    """Return the shared template store, opening it on first use."""
+    global _template_store
+    if _template_store is None:
+        _template_store = (shared_probate_store(TEMPLATE_DIR)
+                           or open_compiled_store(TEMPLATE_DIR)
+                           or open_template_store(TEMPLATE_DIR))
+    return _template_store
 
 
 def load_template(template_name):
-    """Load a .docx template from api/probate-templates/."""
-    template_dir = os.path.join(os.path.dirname(__file__), 'probate-templates')
-    path = os.path.join(template_dir, template_name)
-    return Document(path)
+    """Load a .docx template from api/probate-templates/.
+
+    Renders only touch the main document part, so the others are parsed on
+    demand (see lazy_parts).
+    """
+    return open_document(get_template_store().open(template_name))
+
+
+def warm_template_pool():
+    """Preload every template the decision tables can select.
+
+    Returns the number of templates held by the store.
+    """
+    store = get_template_store()
+    for template_name in reachable_templates():
+        store.read(template_name)
+    return len(store)
+
+
+_templates_version = (None, None)
+
+
+def templates_version():
+    """Return a digest over every source template of the store.
+
+    Computed once per store; render ETags and package comments include it so
+    a template edit invalidates every cached package. Every kind of store
+    built from the same templates has the same version.
+    """
+    global _templates_version
+    store = get_template_store()
+    if _templates_version[0] is not store:
+        digest = hashlib.sha256()
+        digest.update(json.dumps(store.sources(), sort_keys=True).encode('utf-8'))
+        # Firm constants are rendered into templates (see below) and into
+        # request defaults, so a deployment that changes them is a new version
+        digest.update(json.dumps(FIRM_CONSTANTS, sort_keys=True).encode('utf-8'))
+        _templates_version = (store, digest.hexdigest()[:16])
+    return _templates_version[1]
+
+
+# --- Partial Evaluation ---
+#
+# Firm constants (template_config.FIRM_CONSTANTS) have the same value on
+# every request, so they are substituted into a template once and the
+# evaluated copy is cached. A request that agrees with the constants is
+# rendered from that copy, and only the remaining fields are matched. The
+# matcher drops the legacy firm-name literal, for example. A request that
+# overrides a constant is rendered from the original template.
+
+_evaluated_templates = TemplateCache()
+
+
+def baked_constants(replacements):
+    """Return the ((field, value), ...) firm constants replacements agrees with."""
+    registry, values = replacements.registry, replacements.values
+    return tuple(sorted((field, value) for field, value in FIRM_CONSTANTS.items()
+                        if value and field in registry.fields and str(values[field]) == value))
+
+
+@lru_cache(maxsize=64)
+def residual_registry(registry, fields):
+    """Return registry without fields (a frozenset of canonical names)."""
+    return FieldRegistry({field: spellings for field, spellings in registry.spellings.items()
+                          if field not in fields})
+
+
+def _evaluate_template(key):
+    store, template_name, registry, constants = key
+    doc = load_template(template_name)
+    constant_fields = FieldRegistry({field: registry.spellings[field] for field, _ in constants})
+    replace_in_document(doc, constant_fields.bind(dict(constants)), healed=store.healed)
+    buffer = BytesIO()
+    doc.save(buffer)
+    return store_uncompressed(buffer.getvalue())
+
+
+def load_evaluated_template(template_name, replacements):
+    """Load a template with the firm constants replacements agrees with
+    already substituted.
+
+    Returns (Document, ReplacementMap of the fields left to replace).
+    """
+    doc, remaining, _ = _load_evaluated(template_name, replacements)
+    return doc, remaining
+
+
+def _load_evaluated(template_name, replacements):
+    """load_evaluated_template, plus whether the Document's runs are merged."""
+    replacements = as_replacement_map(replacements)
+    store = get_template_store()
+    constants = baked_constants(replacements)
+    if not constants:
+        return load_template(template_name), replacements, store.healed
+    registry = replacements.registry
+    key = (store, template_name, registry, constants)
+    content = _evaluated_templates.get(key, _evaluate_template)
+    remaining = residual_registry(registry, frozenset(field for field, _ in constants))
+    # Evaluation merged every paragraph's runs
+    return open_document(BytesIO(content)), remaining.bind(replacements.values), True
+
+
+def render_template(template_name, replacements):
+    """Render one template with replacements; return the Document."""
+    doc, replacements, healed = _load_evaluated(template_name, replacements)
+    replace_in_document(doc, replacements, healed)
+    return doc
 
 
 # --- ZIP Assembly ---
+#
+# Compression policy and deterministic mode live in zip_policy.
+
+def zip_options(data):
+    """Return the build_zip keyword options requested in intake data."""
+    return {
+        'include_report': bool(data.get('placeholder_report')),
+        'deterministic': bool(data.get('deterministic')),
+    }
+
 
-def build_zip(documents, date_str=None):
+def build_zip(documents, date_str=None, residuals=None, include_report=False,
+              compression=None, compresslevel=None, deterministic=False):
     """Build a ZIP file from a list of (filename, Document) tuples.
 
     Args:
-        documents: list of (filename_without_date, docx.Document) tuples
+        documents: list of (filename_without_date, docx.Document) tuples;
+            already-rendered .docx bytes are accepted in place of a Document
         date_str: YYYY-MM-DD string for filename prefix. Defaults to today.
+        residuals: optional dict filled with {zip entry name: [placeholder
+            tokens still present]} for each document that has any
+        include_report: also write the residuals as a JSON sidecar entry
+        compression: 'stored', 'deflate' or 'auto'. Defaults to
+            ZIP_COMPRESSION (env PROBATE_ZIP_COMPRESSION, else 'auto').
+        compresslevel: deflate level 1-9. Defaults to ZIP_COMPRESSLEVEL.
+        deterministic: normalize each .docx and stamp every entry with
+            midnight of date_str, so identical inputs give identical bytes
 
     Returns:
         BytesIO buffer containing the ZIP file.
     """
     if date_str is None:
         date_str = datetime.now().strftime('%Y-%m-%d')
+    if residuals is None:
+        residuals = {}
+    policy = compression or ZIP_COMPRESSION
+    level = compresslevel or ZIP_COMPRESSLEVEL
+
+    date_time = zip_date_time(date_str) if deterministic else None
 
     zip_buffer = BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+    with zipfile.ZipFile(zip_buffer, 'w') as zf:
+        def write(name, content):
+            compress_type, entry_level = entry_compression(content, policy, level)
+            if deterministic:
+                name = fixed_zipinfo(name, date_time)
+            zf.writestr(name, content, compress_type, entry_level)
+
         for filename, doc in documents:
-            doc_buffer = BytesIO()
-            doc.save(doc_buffer)
-            doc_buffer.seek(0)
+            if isinstance(doc, bytes):
+                docx_bytes = doc
+            else:
+                doc_buffer = BytesIO()
+                doc.save(doc_buffer)
+                docx_bytes = doc_buffer.getvalue()
+            if deterministic:
+                docx_bytes = normalize_docx(docx_bytes, date_str)
             full_name = f"{date_str} {filename}.docx"
-            zf.writestr(full_name, doc_buffer.getvalue())
+            tokens = scan_docx(docx_bytes)
+            if tokens:
+                residuals[full_name] = tokens
+            write(full_name, docx_bytes)
+        if include_report:
+            write(REPORT_FILENAME,
+                  json.dumps(residuals, indent=2, ensure_ascii=False).encode('utf-8'))
+        zf.comment = package_comment()
     zip_buffer.seek(0)
     return zip_buffer
 
 
-# --- Document Selection Logic (spec § 2.1) ---
+# --- Signing Packet ---
+#
+# The whole package as one .docx, one section per document (see
+# signing_packet). The style and list definitions of every template are merged
+# once per store; a packet only maps its documents through them.
+
+_definition_tables = TemplateCache()
+
+SIGNING_PACKET_TITLE = 'Signing Packet'
+
+
+def packet_definitions():
+    """Return the signing_packet.DefinitionTable of the template store."""
+    return _definition_tables.get(get_template_store(), DefinitionTable.from_store)
+
+
+def build_signing_packet(documents, date_str=None, residuals=None, deterministic=False,
+                         title=SIGNING_PACKET_TITLE):
+    """Merge [(title, Document)] into one .docx and return it as BytesIO.
+
+    Arguments are as for build_zip; residuals names the packet
+    "<date_str> <title>.docx".
+    """
+    if date_str is None:
+        date_str = datetime.now().strftime('%Y-%m-%d')
+    if residuals is None:
+        residuals = {}
+    buffer = BytesIO()
+    merge_documents(documents, packet_definitions()).save(buffer)
+    docx_bytes = buffer.getvalue()
+    if deterministic:
+        docx_bytes = normalize_docx(docx_bytes, date_str)
+    tokens = scan_docx(docx_bytes)
+    if tokens:
+        residuals[f'{date_str} {title}.docx'] = tokens
+    return BytesIO(docx_bytes)
+
+
+def package_content_type(data):
+    """Return the media type of the package a payload asks for."""
+    return DOCX_CONTENT_TYPE if data.get('signing_packet') else 'application/zip'
+
+
+# --- Incremental Re-render ---
+#
+# A package plan is a list of (title, template_name, ReplacementMap). Since
+# rendering a template is pure field substitution, a document only changes
+# when a field its template actually uses changes value, so a corrected
+# payload can reuse every other document from the previous ZIP.
+
+_ZIP_ENTRY = re.compile(r'^(?P<date>\d{4}-\d{2}-\d{2}) (?P<title>.+)\.docx$')
+
+
+class InvalidPrevious(ValueError):
+    """The "previous" package of a correction request is malformed."""
+
+
+def package_comment():
+    """Return the ZIP archive comment recording the templates version.
+
+    build_zip stamps every package with it; rerender_package only reuses
+    documents from a package with the current comment.
+    """
+    return f'templates {templates_version()}'.encode('ascii')
+
+
+def decode_previous(previous):
+    """Return (payload, zip bytes) from a correction's "previous" field.
+
+    previous must be {"payload": {...}, "zip": "<base64 ZIP>"}; anything
+    else raises InvalidPrevious.
+    """
+    if (not isinstance(previous, dict) or not isinstance(previous.get('payload'), dict)
+            or not isinstance(previous.get('zip'), str)):
+        raise InvalidPrevious('"previous" must be {"payload": {...}, "zip": "<base64 ZIP>"}')
+    try:
+        previous_zip = base64.b64decode(previous['zip'], validate=True)
+        zipfile.ZipFile(BytesIO(previous_zip)).close()
+    except (binascii.Error, zipfile.BadZipFile) as e:
+        raise InvalidPrevious(f'"previous.zip" is not a base64-encoded ZIP: {e}') from e
+    return previous['payload'], previous_zip
+
+
+@lru_cache(maxsize=256)
+def field_dependencies(template_name, registry):
+    """Return {canonical field: (paragraph index, ...)} for one template.
+
+    Paragraphs are numbered in iter_document_paragraphs() order, the same
+    paragraphs replace_in_document() rewrites. Precompiled templates supply
+    the paragraph texts from their plan, without a parse.
+    """
+    store = get_template_store()
+    if hasattr(store, 'plan'):
+        texts = store.plan(template_name)['paragraphs']
+    else:
+        texts = (p.text for p in iter_document_paragraphs(load_template(template_name)))
+    dependencies = {}
+    for n, text in enumerate(texts):
+        for token in registry.matcher.findall(text):
+            field = registry.aliases.get(token)
+            if field is not None:
+                dependencies.setdefault(field, []).append(n)
+    return {field: tuple(paragraphs) for field, paragraphs in dependencies.items()}
+
+
+def changed_fields(template_name, old, new):
+    """Return the sorted fields a template uses whose value differs between
+    two ReplacementMaps built on the same registry."""
+    return sorted(field for field in field_dependencies(template_name, new.registry)
+                  if str(old.values[field]) != str(new.values[field]))
+
+
+@lru_cache(maxsize=1)
+def placeholder_manifest():
+    """Return the checked-in {template: [placeholders]} manifest."""
+    with open(PLACEHOLDER_MANIFEST, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def describe_plan(plan):
+    """Describe what render_plan(plan) would produce, without loading templates.
+
+    Returns one dict per document: title, template, the resolved value of
+    each placeholder the template uses ({placeholder: value}) and the
+    placeholders the plan does not fill (unmapped), which would remain in
+    the output. Placeholders come from the checked-in manifest.
+    """
+    manifest = placeholder_manifest()
+    documents = []
+    for title, template_name, replacements in plan:
+        replacements = as_replacement_map(replacements)
+        aliases = replacements.registry.aliases
+        placeholders = manifest[template_name]
+        documents.append({
+            'title': title,
+            'template': template_name,
+            'values': {p: str(replacements[p]) for p in placeholders if p in aliases},
+            'unmapped': [p for p in placeholders if p not in aliases],
+        })
+    return documents
+
+
+# Template outlines for previews, built once per store and template
+_template_outlines = TemplateCache()
+
+
+def template_outline(template_name):
+    """Return the html_preview outline of a template's body."""
+    store = get_template_store()
+    return _template_outlines.get((store, template_name),
+                                  lambda key: docx_outline(store.read(template_name)))
+
+
+def preview_plan(plan, title='Document preview'):
+    """Render a package plan to one HTML page, without building any .docx.
+
+    Each document is its template outline with the replacements applied;
+    substituted values and leftover placeholders are marked (see
+    html_preview).
+    """
+    sections = []
+    for document_title, template_name, replacements in plan:
+        marked = marked_values(as_replacement_map(replacements))
+        sections.append((document_title,
+                         outline_html(template_outline(template_name), marked.substitute)))
+    return preview_page(sections, title)
+
+
+def render_plan(plan):
+    """Render a package plan into [(title, Document)] for build_zip."""
+    documents = []
+    for title, template_name, replacements in plan:
+        documents.append((title, render_template(template_name, replacements)))
+    return documents
+
+
+def package_date(data):
+    """Return the YYYY-MM-DD a package is dated: generation_date, else today.
+
+    The same date prefixes the filenames and fills the time-derived fields
+    (see build_common_values).
+    """
+    return data.get('generation_date') or datetime.now().strftime('%Y-%m-%d')
+
+
+def rerender_package(old_plan, new_plan, previous_zip, date_str=None,
+                     residuals=None, rerendered=None, **zip_kwargs):
+    """Build a package from new_plan, reusing unchanged documents.
+
+    A document is copied byte-for-byte from previous_zip (bytes or a
+    file-like object) when the old plan had the same title and template and
+    none of the fields that template uses changed value; everything else is
+    rendered. Titles of rendered documents are appended to rerendered if
+    given. Both plans must be built for date_str (see package_date): the
+    previous documents carry the date of their own entry names, so when
+    that is not date_str every document is rendered again rather than
+    mixing signing dates. Likewise a package built from other templates or
+    firm constants (see package_comment) is rendered again in full.
+    Remaining keyword arguments go to build_zip.
+    """
+    if date_str is None:
+        date_str = datetime.now().strftime('%Y-%m-%d')
+    if isinstance(previous_zip, bytes):
+        previous_zip = BytesIO(previous_zip)
+    old_by_title = {title: (template_name, replacements)
+                    for title, template_name, replacements in old_plan}
+
+    documents = []
+    with zipfile.ZipFile(previous_zip) as zf:
+        previous = {}
+        current = zf.comment == package_comment()
+        for name in zf.namelist() if current else ():
+            match = _ZIP_ENTRY.match(name)
+            if match and match.group('date') == date_str:
+                previous[match.group('title')] = name
+        for title, template_name, replacements in new_plan:
+            old = old_by_title.get(title)
+            if (old is not None and old[0] == template_name and title in previous
+                    and old[1].registry is replacements.registry
+                    and not changed_fields(template_name, old[1], replacements)):
+                documents.append((title, zf.read(previous[title])))
+                continue
+            documents.extend(render_plan([(title, template_name, replacements)]))
+            if rerendered is not None:
+                rerendered.append(title)
+    return build_zip(documents, date_str, residuals, **zip_kwargs)
+
+
+# --- Document Decision Tables (spec § 2.1, § 2.4, § 2.5) ---
+#
+# Every selectable template is listed here exactly once. The select_*
+# functions below only normalize the intake fields into a table key, so the
+# tables are also the complete inventory used for template warmup and for
+# exhaustive combination tests.
+
+_SMALL_ESTATE_AFFIDAVIT = ('Small Estate - Affidavit as to Small Estate CURLY.docx',
+                           'Affidavit as to Small Estate')
+_SMALL_ESTATE_ORDER = ('Small Estate - Order Approving Small Estate CURLY.docx',
+                       'Order Approving Small Estate')
+_PR_OATH = ('Personal Representative Oath CURLY.docx',
+            'Personal Representative Oath')
+
+DECLINATION_TEMPLATE = 'Declination to Serve CURLY.docx'
+
+# (estate_type, will_type, muniment_only, small_estate_election) -> documents.
+# Inputs that do not affect the outcome are normalized to None/False.
+OPENING_DOCUMENT_TABLE = {
+    (None, None, False, True): (
+        _SMALL_ESTATE_AFFIDAVIT,
+        _SMALL_ESTATE_ORDER,
+    ),
+    ('Testate', None, True, False): (
+        ('Petition for Muniment of Title.docx',
+         'Petition for Muniment of Title'),
+        ('Order for Muniment of Title.docx',
+         'Order for Muniment of Title'),
+        _PR_OATH,
+    ),
+    ('Testate', 'Standard Witnessed', False, False): (
+        ('Petition to Probate Will Ltrs Testamentary CURLY (1).docx',
+         'Petition to Probate Will and Letters Testamentary'),
+        ('Order to Probate LWT CURLY.docx',
+         'Order to Probate Last Will and Testament'),
+        _PR_OATH,
+    ),
+    ('Testate', 'Holographic', False, False): (
+        ('Petition to Probate Holographic Will.docx',
+         'Petition to Probate Holographic Will'),
+        ('Order Admitting Holographic LWT.docx',
+         'Order Admitting Holographic Last Will and Testament'),
+        _PR_OATH,
+    ),
+    ('Testate', 'Will + Codicil', False, False): (
+        ('Petition to Probate Will and Codicil.docx',
+         'Petition to Probate Will and Codicil'),
+        ('Order Admitting Codicil and LWT.docx',
+         'Order Admitting Codicil and Last Will and Testament'),
+        _PR_OATH,
+    ),
+    ('Intestate', None, False, False): (
+        ('Petition for Appointment of Administrator CURLY.docx',
+         'Petition for Appointment of Administrator'),
+        ('Order for Intestate Administration.docx',
+         'Order for Intestate Administration'),
+        _PR_OATH,
+    ),
+}
+
+# (estate_type, all_heirs_sui_juris) -> documents.
+CLOSING_DOCUMENT_TABLE = {
+    ('Testate', True): (
+        ('Petition to Close Estate CURLY.docx', 'Petition to Close Estate'),
+        ('Order to Close Estate CURLY.docx', 'Order to Close Estate'),
+    ),
+    ('Testate', False): (
+        ('Petition to Close Estate-No sui juris.docx', 'Petition to Close Estate'),
+        ('Order to Close Estate CURLY.docx', 'Order to Close Estate'),
+    ),
+    ('Intestate', None): (
+        ('Petition to Close Intestate Estate CURLY.docx',
+         'Petition to Close Intestate Estate'),
+        ('Order Closing Intestate Estate CURLY.docx',
+         'Order Closing Intestate Estate'),
+    ),
+}
+
+# (estate_type, beneficiary_type, heir_is_pr) -> receipt & waiver template.
+RECEIPT_WAIVER_TABLE = {
+    ('Intestate', None, False): 'Receipt and Waiver for Intestate Estate.docx',
+    ('Testate', 'Residuary', True): 'Receipt and Waiver  - Residuary and Executor.docx',
+    ('Testate', 'Residuary', False): 'Receipt and Waiver  - Residuary CURLY.docx',
+    ('Testate', 'Specific', False): 'Receipt & Waiver - Testate CURLY.docx',
+    ('Testate', 'General', False): 'Receipt and Waiver  - General CURLY.docx',
+}
+
+
+def reachable_templates():
+    """Return a sorted tuple of every template the decision tables can select."""
+    names = {DECLINATION_TEMPLATE}
+    for table in (OPENING_DOCUMENT_TABLE, CLOSING_DOCUMENT_TABLE):
+        for documents in table.values():
+            names.update(template for template, _ in documents)
+    names.update(RECEIPT_WAIVER_TABLE.values())
+    return tuple(sorted(names))
+
+
+def _opening_key(data):
+    """Normalize intake fields into an OPENING_DOCUMENT_TABLE key."""
+    estate_type = data['estate_type']
+    if data.get('small_estate_election'):
+        return (None, None, False, True)
+    if estate_type != 'Testate':
+        return ('Intestate', None, False, False)
+    if data.get('muniment_only'):
+        return ('Testate', None, True, False)
+    return ('Testate', data.get('will_type'), False, False)
+
 
 def select_opening_documents(data):
     """Return list of (template_filename, output_title) for opening docs.
 
     Implements spec § 2.1 document selection logic.
     """
-    estate_type = data['estate_type']
-    docs = []
+    try:
+        return list(OPENING_DOCUMENT_TABLE[_opening_key(data)])
+    except KeyError:
+        raise ValueError(
+            f"Unknown will_type {data.get('will_type')!r} for Testate estate. "
+            f"Expected 'Standard Witnessed', 'Holographic', or 'Will + Codicil'."
+        )
 
-    if data.get('small_estate_election'):
-        docs.append(('Small Estate - Affidavit as to Small Estate CURLY.docx',
-                      'Affidavit as to Small Estate'))
-        docs.append(('Small Estate - Order Approving Small Estate CURLY.docx',
-                      'Order Approving Small Estate'))
-        return docs
 
-    if estate_type == 'Testate':
-        if data.get('muniment_only'):
-            docs.append(('Petition for Muniment of Title.docx',
-                          'Petition for Muniment of Title'))
-            docs.append(('Order for Muniment of Title.docx',
-                          'Order for Muniment of Title'))
-        elif data.get('will_type') == 'Standard Witnessed':
-            docs.append(('Petition to Probate Will Ltrs Testamentary CURLY (1).docx',
-                          'Petition to Probate Will and Letters Testamentary'))
-            docs.append(('Order to Probate LWT CURLY.docx',
-                          'Order to Probate Last Will and Testament'))
-        elif data.get('will_type') == 'Holographic':
-            docs.append(('Petition to Probate Holographic Will.docx',
-                          'Petition to Probate Holographic Will'))
-            docs.append(('Order Admitting Holographic LWT.docx',
-                          'Order Admitting Holographic Last Will and Testament'))
-        elif data.get('will_type') == 'Will + Codicil':
-            docs.append(('Petition to Probate Will and Codicil.docx',
-                          'Petition to Probate Will and Codicil'))
-            docs.append(('Order Admitting Codicil and LWT.docx',
-                          'Order Admitting Codicil and Last Will and Testament'))
-        else:
-            raise ValueError(
-                f"Unknown will_type {data.get('will_type')!r} for Testate estate. "
-                f"Expected 'Standard Witnessed', 'Holographic', or 'Will + Codicil'."
-            )
-    else:  # Intestate
-        docs.append(('Petition for Appointment of Administrator CURLY.docx',
-                      'Petition for Appointment of Administrator'))
-        docs.append(('Order for Intestate Administration.docx',
-                      'Order for Intestate Administration'))
+# --- Estate Model ---
+
+CHILD_RELATIONSHIPS = ('Son', 'Daughter', 'Child')
+
+
+def normalize_name(name):
+    """Collapse whitespace and casefold a name for identity comparisons."""
+    return ' '.join((name or '').split()).casefold()
 
-    # Always add oath (for non-small-estate)
-    docs.append(('Personal Representative Oath CURLY.docx',
-                  'Personal Representative Oath'))
 
-    return docs
+class Heir:
+    """One heir from the intake payload, with the fields the rules consult."""
+
+    __slots__ = ('full_name', 'name_key', 'relationship', 'gender',
+                 'age', 'address', 'city', 'is_minor', 'has_disability',
+                 'is_beneficiary', 'is_pr')
+
+    def __init__(self, source, pr_name_key):
+        self.full_name = source.get('heir_full_name', '')
+        self.name_key = normalize_name(self.full_name)
+        self.relationship = source.get('heir_relationship', '')
+        self.gender = source.get('heir_gender', 'Male')
+        self.age = source.get('heir_age')
+        self.address = source.get('heir_address', '')
+        self.city = source.get('heir_city', '')
+        self.is_minor = bool(source.get('heir_is_minor'))
+        self.has_disability = bool(source.get('heir_has_disability'))
+        self.is_beneficiary = bool(source.get('heir_is_beneficiary'))
+        self.is_pr = bool(pr_name_key) and self.name_key == pr_name_key
+
+
+class Estate:
+    """Heirs of one intake payload, indexed once per request.
+
+    Every heir-dependent rule (declinations, flags, the heirs list block)
+    reads these indexes instead of re-scanning data['heirs'].
+    """
+
+    __slots__ = ('heirs', 'pr_name_key', 'minors', 'disabled', 'adult_children',
+                 'adult_beneficiaries')
+
+    def __init__(self, data):
+        self.pr_name_key = normalize_name(data.get('pr_full_name'))
+        self.heirs = []
+        self.minors = []
+        self.disabled = []
+        # Adults other than the PR, in intake order — the declination pools
+        self.adult_children = []
+        self.adult_beneficiaries = []
+
+        for source in data.get('heirs', []):
+            heir = Heir(source, self.pr_name_key)
+            self.heirs.append(heir)
+            if heir.is_minor:
+                self.minors.append(heir)
+            if heir.has_disability:
+                self.disabled.append(heir)
+            if heir.is_minor or heir.is_pr:
+                continue
+            if heir.relationship in CHILD_RELATIONSHIPS:
+                self.adult_children.append(heir)
+            if heir.is_beneficiary:
+                self.adult_beneficiaries.append(heir)
+
+    @property
+    def all_sui_juris(self):
+        return not self.minors and not self.disabled
 
 
 # --- Declination Logic (spec § 2.2) ---
 
-def determine_declinations(data):
+def _declination(heir):
+    return {
+        'name': heir.full_name,
+        'relationship': heir.relationship,
+        'gender': heir.gender,
+    }
+
+
+def determine_declinations(data, estate=None):
     """Return list of dicts for people who need to sign declinations.
 
-    Each dict: {name, relationship, gender, relation_to_pr}
-    Implements spec § 2.2.
+    Each dict: {name, relationship, gender}
+    Implements spec § 2.2. Pass a prebuilt Estate to share its heir indexes.
     """
     estate_type = data['estate_type']
-    heirs = data.get('heirs', [])
+    if estate is None:
+        estate = Estate(data)
     declinations = []
 
     if estate_type == 'Testate':
@@ -213,14 +780,7 @@ def determine_declinations(data):
             return declinations
 
         # No one in will can serve — need consent from each adult devisee/legatee
-        for heir in heirs:
-            if heir.get('heir_is_beneficiary') and not heir.get('heir_is_minor'):
-                if heir['heir_full_name'] != data.get('pr_full_name'):
-                    declinations.append({
-                        'name': heir['heir_full_name'],
-                        'relationship': heir['heir_relationship'],
-                        'gender': heir.get('heir_gender', 'Male'),
-                    })
+        declinations.extend(_declination(h) for h in estate.adult_beneficiaries)
 
     else:  # Intestate
         pr_relationship = data.get('pr_relationship', '')
@@ -232,35 +792,17 @@ def determine_declinations(data):
             'decedent_marital_status') == 'Married' else None
 
         # For any non-spouse PR, the surviving spouse must decline
-        if surviving_spouse and pr_relationship != 'Spouse':
+        if surviving_spouse:
             declinations.append({
                 'name': surviving_spouse,
                 'relationship': 'Surviving Spouse',
                 'gender': 'Female' if data.get('decedent_gender') == 'Male' else 'Male',
             })
 
-        if pr_relationship == 'Child':
-            # Siblings (other children) must decline
-            for heir in heirs:
-                if (heir['heir_relationship'] in ['Son', 'Daughter', 'Child']
-                        and heir['heir_full_name'] != data.get('pr_full_name')
-                        and not heir.get('heir_is_minor')):
-                    declinations.append({
-                        'name': heir['heir_full_name'],
-                        'relationship': heir['heir_relationship'],
-                        'gender': heir.get('heir_gender', 'Male'),
-                    })
-        elif pr_relationship in ['Grandchild', 'Sibling', 'Other Kin', 'Unrelated']:
-            # All children of decedent must decline
-            for heir in heirs:
-                if (heir['heir_relationship'] in ['Son', 'Daughter', 'Child']
-                        and heir['heir_full_name'] != data.get('pr_full_name')
-                        and not heir.get('heir_is_minor')):
-                    declinations.append({
-                        'name': heir['heir_full_name'],
-                        'relationship': heir['heir_relationship'],
-                        'gender': heir.get('heir_gender', 'Male'),
-                    })
+        # A child PR needs siblings to decline; a more remote PR needs all
+        # children to decline. Either way: every adult child except the PR.
+        if pr_relationship in ['Child', 'Grandchild', 'Sibling', 'Other Kin', 'Unrelated']:
+            declinations.extend(_declination(h) for h in estate.adult_children)
 
     return declinations
 
@@ -269,62 +811,39 @@ def determine_declinations(data):
 
 def select_closing_documents(data):
     """Return list of (template_filename, output_title) for closing docs."""
-    estate_type = data['estate_type']
-    docs = []
-
-    if estate_type == 'Testate':
-        if data.get('all_heirs_sui_juris', True):
-            docs.append(('Petition to Close Estate CURLY.docx',
-                          'Petition to Close Estate'))
-        else:
-            docs.append(('Petition to Close Estate-No sui juris.docx',
-                          'Petition to Close Estate'))
-        docs.append(('Order to Close Estate CURLY.docx',
-                      'Order to Close Estate'))
+    if data['estate_type'] == 'Testate':
+        key = ('Testate', bool(data.get('all_heirs_sui_juris', True)))
     else:
-        docs.append(('Petition to Close Intestate Estate CURLY.docx',
-                      'Petition to Close Intestate Estate'))
-        docs.append(('Order Closing Intestate Estate CURLY.docx',
-                      'Order Closing Intestate Estate'))
-
-    return docs
+        key = ('Intestate', None)
+    return list(CLOSING_DOCUMENT_TABLE[key])
 
 
 # --- Receipt & Waiver Selection (spec § 2.5) ---
 
 def select_receipt_waiver_template(heir, data):
     """Return (template_filename, output_title) for one heir's receipt & waiver."""
-    estate_type = data['estate_type']
-    pr_name = data.get('pr_full_name', '')
-
-    if estate_type == 'Intestate':
-        return ('Receipt and Waiver for Intestate Estate.docx',
-                f'Receipt and Waiver - {heir["heir_full_name"]}')
-
-    # Testate paths
-    is_pr = heir['heir_full_name'] == pr_name
-    btype = heir.get('heir_beneficiary_type', 'General')
-
-    if is_pr and btype == 'Residuary':
-        return ('Receipt and Waiver  - Residuary and Executor.docx',
-                f'Receipt and Waiver - {heir["heir_full_name"]}')
-    elif btype == 'Residuary':
-        return ('Receipt and Waiver  - Residuary CURLY.docx',
-                f'Receipt and Waiver - {heir["heir_full_name"]}')
-    elif btype == 'Specific':
-        return ('Receipt & Waiver - Testate CURLY.docx',
-                f'Receipt and Waiver - {heir["heir_full_name"]}')
+    if data['estate_type'] == 'Intestate':
+        key = ('Intestate', None, False)
     else:
-        return ('Receipt and Waiver  - General CURLY.docx',
-                f'Receipt and Waiver - {heir["heir_full_name"]}')
+        btype = heir.get('heir_beneficiary_type', 'General')
+        if btype not in ('Residuary', 'Specific'):
+            btype = 'General'
+        # Only a residuary PR gets the combined residuary-and-executor waiver
+        is_pr = (btype == 'Residuary'
+                 and normalize_name(heir['heir_full_name'])
+                 == normalize_name(data.get('pr_full_name')))
+        key = ('Testate', btype, is_pr)
+    return (RECEIPT_WAIVER_TABLE[key],
+            f'Receipt and Waiver - {heir["heir_full_name"]}')
 
 
 # --- Flags & Warnings (spec § 2.6) ---
 
-def generate_flags(data):
+def generate_flags(data, estate=None):
     """Return list of {level: 'warning'|'info', message: str}."""
+    if estate is None:
+        estate = Estate(data)
     flags = []
-    heirs = data.get('heirs', [])
 
     if data.get('pr_state', 'Tennessee') != 'Tennessee':
         flags.append({'level': 'warning',
@@ -346,9 +865,7 @@ def generate_flags(data):
         flags.append({'level': 'warning',
                        'message': f'Real property in {", ".join(out_of_county)} — ancillary probate may be needed'})
 
-    has_minor = any(h.get('heir_is_minor') for h in heirs)
-    has_disability = any(h.get('heir_has_disability') for h in heirs)
-    if has_minor or has_disability:
+    if not estate.all_sui_juris:
         flags.append({'level': 'warning',
                        'message': 'Not all heirs are sui juris — affects closing documents and may require guardian appointment'})
 
@@ -366,6 +883,57 @@ def generate_flags(data):
 
 # --- Deadline Calculations (spec § 3.2) ---
 
+# Docket-wide runs see the same few thousand dates over and over, so both
+# parsing and month arithmetic are memoized on the input value.
+
+_ISO_DATE = re.compile(r'^\d{4}-\d{1,2}-\d{1,2}$')
+
+
+@lru_cache(maxsize=8192)
+def _parse_iso_date(date_str):
+    """Parse YYYY-MM-DD into a date.
+
+    Unpadded months and days ('2024-3-5') are accepted too, as strptime
+    always did; only canonical dates take the fromisoformat fast path.
+    The shape is checked first because fromisoformat also accepts basic
+    ('20240305') and week ('2024-W10-2') forms, which must stay rejected.
+    """
+    date_str = date_str.strip()
+    if not _ISO_DATE.match(date_str):
+        raise ValueError(f"time data {date_str!r} does not match format '%Y-%m-%d'")
+    if len(date_str) == 10:
+        return date.fromisoformat(date_str)
+    return datetime.strptime(date_str, '%Y-%m-%d').date()
+
+
+@lru_cache(maxsize=8192)
+def _add_months(d, months):
+    """Add calendar months, clamping to the last day of a shorter month."""
+    month_index = d.month - 1 + months
+    year = d.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(d.day, calendar.monthrange(year, month)[1])
+    return date(year, month, day)
+
+
+def _deadline_dates(dod, publication_date=None):
+    """Return deadline name -> date for parsed dates."""
+    deadlines = {}
+
+    # Absolute bar date: DOD + 12 months (Feb 29 -> Feb 28)
+    deadlines['absolute_bar_date'] = _add_months(dod, 12)
+
+    if publication_date:
+        # Claims deadline: publication + 4 months
+        claims = _add_months(publication_date, 4)
+        deadlines['claims_deadline'] = claims
+
+        # Exception deadline: claims + 30 days
+        deadlines['exception_deadline'] = date.fromordinal(claims.toordinal() + 30)
+
+    return deadlines
+
+
 def calculate_deadlines(dod_str, publication_date_str=None):
     """Calculate statutory deadlines.
 
@@ -376,56 +944,190 @@ def calculate_deadlines(dod_str, publication_date_str=None):
     Returns:
         dict of deadline names -> YYYY-MM-DD strings
     """
-    dod = datetime.strptime(dod_str, '%Y-%m-%d')
-    deadlines = {}
+    pub = _parse_iso_date(publication_date_str) if publication_date_str else None
+    deadlines = _deadline_dates(_parse_iso_date(dod_str), pub)
+    return {name: d.isoformat() for name, d in deadlines.items()}
 
-    # Absolute bar date: DOD + 12 months
-    try:
-        bar_date = dod.replace(year=dod.year + 1)
-    except ValueError:
-        # Handle leap year edge case (Feb 29 -> Feb 28)
-        bar_date = dod.replace(year=dod.year + 1, day=28)
-    deadlines['absolute_bar_date'] = bar_date.strftime('%Y-%m-%d')
 
-    if publication_date_str:
-        pub = datetime.strptime(publication_date_str, '%Y-%m-%d')
+def calculate_court_deadlines(dod_str, publication_date_str=None, court_calendar=None):
+    """Calculate statutory deadlines with court-closure adjustment.
 
-        # Claims deadline: publication + 4 months
-        month = pub.month + 4
-        year = pub.year
-        if month > 12:
-            month -= 12
-            year += 1
-        try:
-            claims = pub.replace(year=year, month=month)
-        except ValueError:
-            import calendar
-            last_day = calendar.monthrange(year, month)[1]
-            claims = pub.replace(year=year, month=month, day=min(pub.day, last_day))
-        deadlines['claims_deadline'] = claims.strftime('%Y-%m-%d')
+    A deadline that falls on a weekend or court holiday rolls forward to the
+    next day the court is open.
 
-        # Exception deadline: claims + 30 days
-        exception = claims + timedelta(days=30)
-        deadlines['exception_deadline'] = exception.strftime('%Y-%m-%d')
+    Returns:
+        dict of deadline names -> {'raw': YYYY-MM-DD, 'adjusted': YYYY-MM-DD}
+    """
+    if court_calendar is None:
+        court_calendar = get_court_calendar()
+    pub = _parse_iso_date(publication_date_str) if publication_date_str else None
+    deadlines = _deadline_dates(_parse_iso_date(dod_str), pub)
+    return {
+        name: {'raw': d.isoformat(),
+               'adjusted': court_calendar.next_open_day(d).isoformat()}
+        for name, d in deadlines.items()
+    }
 
-    return deadlines
 
+DEADLINE_FIELDS = ('absolute_bar_date', 'claims_deadline', 'exception_deadline')
+ADJUSTED_DEADLINE_FIELDS = tuple(f'{name}_adjusted' for name in DEADLINE_FIELDS)
 
-# --- Build Common Replacements ---
 
-def build_common_replacements(data):
-    """Build the merge field replacement dict from intake data.
+def calculate_deadlines_bulk(rows, court_calendar=None):
+    """Calculate deadlines for many matters, yielding one result per row.
 
-    Maps standardized spec field names AND legacy template field names
-    to data values. This handles the inconsistent naming across templates.
+    Args:
+        rows: iterable of dicts with 'matter', 'dod' and optional
+            'publication_date' (YYYY-MM-DD strings)
+        court_calendar: optional CourtCalendar; when given, each result
+            also carries ADJUSTED_DEADLINE_FIELDS
+
+    Yields:
+        dict with 'matter', each of DEADLINE_FIELDS ('' when not
+        applicable) and 'error' ('' on success). A bad row is reported
+        in its own result and does not stop the batch.
+    """
+    fields = DEADLINE_FIELDS
+    if court_calendar is not None:
+        fields += ADJUSTED_DEADLINE_FIELDS
+    for row in rows:
+        result = dict.fromkeys(('matter',) + fields + ('error',), '')
+        try:
+            result['matter'] = row.get('matter', '')
+            pub_str = row.get('publication_date') or None
+            pub = _parse_iso_date(pub_str) if pub_str else None
+            deadlines = _deadline_dates(_parse_iso_date(row.get('dod') or ''), pub)
+            for name, d in deadlines.items():
+                result[name] = d.isoformat()
+                if court_calendar is not None:
+                    result[f'{name}_adjusted'] = court_calendar.next_open_day(d).isoformat()
+        except (ValueError, TypeError, AttributeError) as e:
+            result['error'] = str(e) or type(e).__name__
+        yield result
+
+
+# --- Build Common Replacements ---
+
+# Every template spelling of each common merge field, keyed by canonical
+# field. A new spelling found in a template is one more entry here.
+COMMON_FIELDS = FieldRegistry({
+    # --- Decedent ---
+    'decedent_name': (
+        '{DECEDENT NAME}', '{DECEDENT}', '{Decedent name}', '{Decedent Name}',
+        '{Decedent}', '{decedent name}'),
+    'decedent_address': (
+        '{DECEDENT ADDRESS}', '{ADDRESS}', '{address}', '{Address}',
+        "{Decedent's Address}", "{Decedent's Street Address}"),
+    'decedent_city': (
+        '{CITY}', '{City}', '{Decedent City}', '{DECEDENT CITY}'),
+    'decedent_county': (
+        '{COUNTY}', '{COUNTY NAME}', '{County}', '{DECEDENT COUNTY}',
+        '{County of Residence}', '{County of Residence for Decedent}',
+        "{Decedent's County of Residence}", '{County of Probate}'),
+    'decedent_state': ('{STATE}',),
+    'date_of_death': (
+        '{DATE OF DEATH}', '{Date of Death}', "{Decedent's Date of Death}"),
+    'decedent_age': (
+        '{AGE OF DECEDENT}', '{AGE}', '{AGE AT DEATH}', '{Age at Death}',
+        '{Age of Death}', "{Decedent's Age}"),
+    'place_of_death': ('{PLACE OF DEATH}', '{Place of Death}', '{At}'),
+    'decedent_possessive': (
+        '{HIS/HER}', '{his/her}', '{DECEDENT PRONOUN \u2013 HIS/HER}',
+        '{Decedent Possessive Pronoun}'),
+    'decedent_subject': ('{HE/SHE}', '{he/she}'),
+    'decedent_object': ('{him/her}',),
+    'decedent_had_business_was': ('{was/was not CHOOSE ONE}',),
+    'decedent_spouse_name': ('{Decedent Spouse}',),
+    'decedent_spouse_dod': ("{Decedent's Spouse Date of Death}",),
+
+    # --- Personal Representative / Petitioner ---
+    'pr_name': (
+        '{PETITIONER NAME}', '{PETITIONER}', '{Petitioner name}',
+        '{Petitioner Name}', '{Petitioner}', '{petitioner}',
+        "{petitioner's name}", '{EXECUTOR NAME}', '{Executor Name}',
+        '{Executor}', '{Administrator Name}', '{Administrator}'),
+    'pr_address': (
+        '{PETITIONER ADDRESS}', '{ADDRESS OF PETITIONER}',
+        '{STREET OF PETITIONER}', '{Street Address of Petitioner}',
+        '{Petitioner Street Address}', '{Petitioner Address}'),
+    'pr_city': (
+        '{PETITIONER CITY}', '{CITY OF PETITIONER}', '{City of Petitioner}',
+        '{Petitioner City}'),
+    'pr_city_state_zip': (
+        '{Petitioner City, State Zip}', '{Petitioner City, State, Zip}'),
+    'pr_zip': ('{Petitioner Zip}',),
+    'pr_phone': ('{Petitioner Phone #}',),
+    'pr_age': (
+        '{PETITIONER AGE}', '{AGE OF PETITIONER}', '{Age of Petitioner}',
+        '{Petitioner Age}'),
+    'pr_relationship': (
+        '{RELATIONSHIP OF PETITIONER TO DECEDENT}',
+        '{Relationship of Petitioner to Decedent}',
+        '{Petitioner Relationship to Decedent}',
+        '{Relation of Petition to Decedent}',
+        "{Decedent's Relationship to Petitioner}",
+        "{PETITIONER'S RELATIONSHIP TO THE DE}", '{RELATION TO DECEDENT}',
+        '{RELATION OF INHERITORS \u2013 sister, brother, children, etc}'),
+    'pr_title': (
+        '{Executor/Executrix/PR Title CHOOSE ONE}', '{Executor/Executrix/PR Title}',
+        '{Executor/Executrix/Personal Representative}', '{Executor/Executrix}',
+        '{Executor/trix}', '{Administrator/trix CHOOSE ONE}',
+        '{Administrator/trix}', '{Administrator or Administratrix CHOOSE ONE}',
+        '{Administrator or Administratrix}', '{Administrator/Executor/PR}',
+        '{Title Executor/Executrix CHOOSE ONE}', '{TITLE}', '{Title}'),
+    'pr_title_lower': ('{administrator or administratrix}',),
+    'pr_subject': (
+        '{PETITIONER PRONOUNT \u2013 HE/SHE}', '{PETITIONER PRONOUN \u2013 HE/SHE}',
+        '{Petitioner Pronoun HE/SHE}'),
+    'pr_possessive': ('{Petitioner Pronoun HIS/HER}',),
+
+    # --- Will details ---
+    'will_date': ('{Date of LWT}', '{Will Execution Date}', '{WILL DATE}'),
+    'codicil_date': ('{Codicil Date}',),
+    'will_witness_1': ('{WITNESS 1}',),
+    'will_witness_2': ('{WITNESS 2}',),
+    'will_appointment_paragraph': (
+        '{PARAGRAPH # APPOINTING PETITIONER}', '{Paragraph/Article/etc}'),
+
+    # --- Heirs ---
+    'heirs_list': ('{HEIRS_LIST}',),
+
+    # --- Case / Court ---
+    'case_number': ('{Docket Number}', '{docket number}'),
+    'current_month': ('{MONTH}', '{Month}'),
+    'current_year': ('{CURRENT YEAR}', '{YEAR}', '{Current Year}'),
+    'current_day_ordinal': ('{current_date_day}',),
+
+    # --- Computed statements ---
+    'criminal_statement': ('{CRIMINAL_STATEMENT}',),
+    'business_statement': ('{BUSINESS_STATEMENT}',),
+    'waiver_statement': ('{WAIVER_STATEMENT}',),
+    'sui_juris_statement': ('{SUI_JURIS_STATEMENT}',),
+    'were_or_no': ('{were/were no}',),
+
+    # --- Attorney / Firm ---
+    'attorney_name': ('{ATTORNEY}', '{ATTORNEY NAME}'),
+    'attorney_first_name': ('{Attorney first name}',),
+    'attorney_bpr': ('{BPR #}', '{BPR}'),
+    # Legacy firm name printed in the templates' signature blocks
+    'firm_name': ('Dale, Hutto & Lyle, PLLC',),
+})
+
+
+def build_common_values(data, estate=None):
+    """Compute the canonical COMMON_FIELDS values from intake data.
+
+    Pass a prebuilt Estate to share its heir indexes.
     """
+    if estate is None:
+        estate = Estate(data)
     dec_pronouns = derive_pronouns(data.get('decedent_gender', 'Male'))
     pr_pronouns = derive_pronouns(data.get('pr_gender', 'Male'))
     pr_title = derive_pr_title(data.get('estate_type', 'Testate'),
                                 data.get('pr_gender', 'Male'))
 
-    today = datetime.now()
-    today_str = today.strftime('%Y-%m-%d')
+    today_str = package_date(data)
+    today = _parse_iso_date(today_str)
 
     # Criminal history statement
     if data.get('pr_criminal_history') or data.get('pr_penitentiary_sentence'):
@@ -447,21 +1149,16 @@ def build_common_replacements(data):
                          'may be part of the estate to be administered')
 
     # Build heirs list block
-    heirs = data.get('heirs', [])
     heirs_lines = []
-    for h in heirs:
-        age_str = f", Age {h.get('heir_age', 'unknown')}" if h.get('heir_age') else ''
+    for h in estate.heirs:
+        age_str = f", Age {h.age}" if h.age else ''
         heirs_lines.append(
-            f"{h['heir_full_name']}{age_str} — {h.get('heir_relationship', '')}\n"
-            f"{h.get('heir_address', '')}, {h.get('heir_city', '')}"
+            f"{h.full_name}{age_str} — {h.relationship}\n"
+            f"{h.address}, {h.city}"
         )
     heirs_list = '\n\n'.join(heirs_lines)
 
-    # All heirs sui juris?
-    all_sui_juris = all(
-        not h.get('heir_is_minor') and not h.get('heir_has_disability')
-        for h in heirs
-    ) if heirs else True
+    all_sui_juris = estate.all_sui_juris
 
     # Will waiver statement
     waivers = []
@@ -485,7 +1182,7 @@ def build_common_replacements(data):
     were_or_no = data.get('were_or_no_objections', 'were no')
 
     # Attorney first name
-    attorney_full = data.get('attorney_full_name', '')
+    attorney_full = data.get('attorney_full_name', FIRM_CONSTANTS['attorney_name'])
     attorney_first = attorney_full.split()[0] if attorney_full else ''
 
     # PR city + state + zip combined
@@ -503,163 +1200,74 @@ def build_common_replacements(data):
     codicil_date_formatted = (format_date_legal(data['codicil_execution_date'])
                               if data.get('codicil_execution_date') else '')
 
-    replacements = {
-        # --- Decedent (all template variants) ---
-        '{DECEDENT NAME}': data.get('decedent_full_name', ''),
-        '{DECEDENT}': data.get('decedent_full_name', ''),
-        '{Decedent name}': data.get('decedent_full_name', ''),
-        '{Decedent Name}': data.get('decedent_full_name', ''),
-        '{Decedent}': data.get('decedent_full_name', ''),
-        '{decedent name}': data.get('decedent_full_name', ''),
-        '{DECEDENT ADDRESS}': data.get('decedent_address', ''),
-        '{ADDRESS}': data.get('decedent_address', ''),
-        '{address}': data.get('decedent_address', ''),
-        '{Address}': data.get('decedent_address', ''),
-        "{Decedent's Address}": data.get('decedent_address', ''),
-        "{Decedent's Street Address}": data.get('decedent_address', ''),
-        '{CITY}': data.get('decedent_city', ''),
-        '{City}': data.get('decedent_city', ''),
-        '{Decedent City}': data.get('decedent_city', ''),
-        '{DECEDENT CITY}': data.get('decedent_city', ''),
-        '{COUNTY}': data.get('decedent_county', ''),
-        '{COUNTY NAME}': data.get('decedent_county', ''),
-        '{County}': data.get('decedent_county', ''),
-        '{DECEDENT COUNTY}': data.get('decedent_county', ''),
-        '{County of Residence}': data.get('decedent_county', ''),
-        '{County of Residence for Decedent}': data.get('decedent_county', ''),
-        "{Decedent's County of Residence}": data.get('decedent_county', ''),
-        '{County of Probate}': data.get('decedent_county', ''),
-        '{DATE OF DEATH}': dod_formatted,
-        '{Date of Death}': dod_formatted,
-        "{Decedent's Date of Death}": dod_formatted,
-        '{AGE OF DECEDENT}': str(data.get('decedent_age', '')),
-        '{AGE}': str(data.get('decedent_age', '')),
-        '{AGE AT DEATH}': str(data.get('decedent_age', '')),
-        '{Age at Death}': str(data.get('decedent_age', '')),
-        '{Age of Death}': str(data.get('decedent_age', '')),
-        "{Decedent's Age}": str(data.get('decedent_age', '')),
-        '{PLACE OF DEATH}': data.get('decedent_place_of_death', ''),
-        '{Place of Death}': data.get('decedent_place_of_death', ''),
-        '{At}': data.get('decedent_place_of_death', ''),
-        '{HIS/HER}': dec_pronouns['possessive'],
-        '{his/her}': dec_pronouns['possessive'],
-        '{DECEDENT PRONOUN \u2013 HIS/HER}': dec_pronouns['possessive'],
-        '{Decedent Possessive Pronoun}': dec_pronouns['possessive'],
-        '{HE/SHE}': dec_pronouns['subject'],
-        '{he/she}': dec_pronouns['subject'],
-        '{him/her}': dec_pronouns['object'],
-        '{was/was not CHOOSE ONE}': 'was' if data.get('decedent_had_business') else 'was not',
-        '{Decedent Spouse}': data.get('decedent_spouse_name', ''),
-        "{Decedent's Spouse Date of Death}": data.get('decedent_spouse_dod', ''),
-
-        # --- Personal Representative / Petitioner (all template variants) ---
-        '{PETITIONER NAME}': data.get('pr_full_name', ''),
-        '{PETITIONER}': data.get('pr_full_name', ''),
-        '{Petitioner name}': data.get('pr_full_name', ''),
-        '{Petitioner Name}': data.get('pr_full_name', ''),
-        '{Petitioner}': data.get('pr_full_name', ''),
-        '{petitioner}': data.get('pr_full_name', ''),
-        "{petitioner's name}": data.get('pr_full_name', ''),
-        '{EXECUTOR NAME}': data.get('pr_full_name', ''),
-        '{Executor Name}': data.get('pr_full_name', ''),
-        '{Executor}': data.get('pr_full_name', ''),
-        '{Administrator Name}': data.get('pr_full_name', ''),
-        '{Administrator}': data.get('pr_full_name', ''),
-        '{PETITIONER ADDRESS}': data.get('pr_address', ''),
-        '{ADDRESS OF PETITIONER}': data.get('pr_address', ''),
-        '{STREET OF PETITIONER}': data.get('pr_address', ''),
-        '{Street Address of Petitioner}': data.get('pr_address', ''),
-        '{Petitioner Street Address}': data.get('pr_address', ''),
-        '{Petitioner Address}': data.get('pr_address', ''),
-        '{PETITIONER CITY}': data.get('pr_city', ''),
-        '{CITY OF PETITIONER}': data.get('pr_city', ''),
-        '{City of Petitioner}': data.get('pr_city', ''),
-        '{Petitioner City}': data.get('pr_city', ''),
-        '{Petitioner City, State Zip}': pr_city_state_zip,
-        '{Petitioner City, State, Zip}': pr_city_state_zip,
-        '{Petitioner Zip}': data.get('pr_zip', ''),
-        '{Petitioner Phone #}': data.get('pr_phone', ''),
-        '{PETITIONER AGE}': str(data.get('pr_age', '')),
-        '{AGE OF PETITIONER}': str(data.get('pr_age', '')),
-        '{Age of Petitioner}': str(data.get('pr_age', '')),
-        '{Petitioner Age}': str(data.get('pr_age', '')),
-        '{RELATIONSHIP OF PETITIONER TO DECEDENT}': data.get('pr_relationship', ''),
-        '{Relationship of Petitioner to Decedent}': data.get('pr_relationship', ''),
-        '{Petitioner Relationship to Decedent}': data.get('pr_relationship', ''),
-        '{Relation of Petition to Decedent}': data.get('pr_relationship', ''),
-        "{Decedent's Relationship to Petitioner}": data.get('pr_relationship', ''),
-        "{PETITIONER'S RELATIONSHIP TO THE DE}": data.get('pr_relationship', ''),
-        '{RELATION TO DECEDENT}': data.get('pr_relationship', ''),
-
-        # --- PR Title variants ---
-        '{Executor/Executrix/PR Title CHOOSE ONE}': pr_title,
-        '{Executor/Executrix/PR Title}': pr_title,
-        '{Executor/Executrix/Personal Representative}': pr_title,
-        '{Executor/Executrix}': pr_title,
-        '{Executor/trix}': pr_title,
-        '{Administrator/trix CHOOSE ONE}': pr_title,
-        '{Administrator/trix}': pr_title,
-        '{Administrator or Administratrix CHOOSE ONE}': pr_title,
-        '{Administrator or Administratrix}': pr_title,
-        '{administrator or administratrix}': pr_title.lower(),
-        '{Administrator/Executor/PR}': pr_title,
-        '{Title Executor/Executrix CHOOSE ONE}': pr_title,
-        '{TITLE}': pr_title,
-        '{Title}': pr_title,
-        '{PETITIONER PRONOUNT \u2013 HE/SHE}': pr_pronouns['subject'],
-        '{PETITIONER PRONOUN \u2013 HE/SHE}': pr_pronouns['subject'],
+    return {
+        # --- Decedent ---
+        'decedent_name': data.get('decedent_full_name', ''),
+        'decedent_address': data.get('decedent_address', ''),
+        'decedent_city': data.get('decedent_city', ''),
+        'decedent_county': data.get('decedent_county', ''),
+        'decedent_state': data.get('decedent_state', 'Tennessee'),
+        'date_of_death': dod_formatted,
+        'decedent_age': str(data.get('decedent_age', '')),
+        'place_of_death': data.get('decedent_place_of_death', ''),
+        'decedent_possessive': dec_pronouns['possessive'],
+        'decedent_subject': dec_pronouns['subject'],
+        'decedent_object': dec_pronouns['object'],
+        'decedent_had_business_was': 'was' if data.get('decedent_had_business') else 'was not',
+        'decedent_spouse_name': data.get('decedent_spouse_name', ''),
+        'decedent_spouse_dod': data.get('decedent_spouse_dod', ''),
+
+        # --- Personal Representative / Petitioner ---
+        'pr_name': data.get('pr_full_name', ''),
+        'pr_address': data.get('pr_address', ''),
+        'pr_city': data.get('pr_city', ''),
+        'pr_city_state_zip': pr_city_state_zip,
+        'pr_zip': data.get('pr_zip', ''),
+        'pr_phone': data.get('pr_phone', ''),
+        'pr_age': str(data.get('pr_age', '')),
+        'pr_relationship': data.get('pr_relationship', ''),
+        'pr_title': pr_title,
+        'pr_title_lower': pr_title.lower(),
+        'pr_subject': pr_pronouns['subject'],
+        'pr_possessive': pr_pronouns['possessive'],
 
         # --- Will details ---
-        '{Date of LWT}': format_date_legal(data['will_execution_date']) if data.get('will_execution_date') else '',
-        '{WITNESS 1}': data.get('will_witness_1', ''),
-        '{WITNESS 2}': data.get('will_witness_2', ''),
-        '{PARAGRAPH # APPOINTING PETITIONER}': data.get('will_appointment_paragraph', ''),
-        '{Paragraph/Article/etc}': data.get('will_appointment_paragraph', ''),
+        'will_date': will_date_formatted,
+        'codicil_date': codicil_date_formatted,
+        'will_witness_1': data.get('will_witness_1', ''),
+        'will_witness_2': data.get('will_witness_2', ''),
+        'will_appointment_paragraph': data.get('will_appointment_paragraph', ''),
 
         # --- Heirs ---
-        '{HEIRS_LIST}': heirs_list,
+        'heirs_list': heirs_list,
 
         # --- Case / Court ---
-        '{STATE}': data.get('decedent_state', 'Tennessee'),
-        '{Docket Number}': data.get('case_number', ''),
-        '{MONTH}': today.strftime('%B'),
-        '{CURRENT YEAR}': str(today.year),
-        '{current_date_day}': ordinal_day(today_str),
+        'case_number': data.get('case_number', ''),
+        'current_month': today.strftime('%B'),
+        'current_year': str(today.year),
+        'current_day_ordinal': ordinal_day(today_str),
 
         # --- Computed statements ---
-        '{CRIMINAL_STATEMENT}': criminal_stmt,
-        '{BUSINESS_STATEMENT}': business_stmt,
-        '{WAIVER_STATEMENT}': will_waiver_stmt,
-        '{SUI_JURIS_STATEMENT}': sui_juris_stmt,
-        '{were/were no}': were_or_no,
-
-        # --- Additional case/date variants ---
-        '{docket number}': data.get('case_number', ''),
-        '{YEAR}': str(today.year),
-        '{Current Year}': str(today.year),
-        '{Month}': today.strftime('%B'),
-
-        # --- Additional attorney variants ---
-        '{ATTORNEY}': data.get('attorney_full_name', ''),
-        '{Attorney first name}': attorney_first,
-        '{BPR #}': data.get('attorney_bpr', ''),
-
-        # --- Additional PR / petitioner pronoun variants ---
-        '{Petitioner Pronoun HIS/HER}': pr_pronouns['possessive'],
-        '{Petitioner Pronoun HE/SHE}': pr_pronouns['subject'],
-
-        # --- Additional relationship variants ---
-        '{RELATION OF INHERITORS \u2013 sister, brother, children, etc}': data.get('pr_relationship', ''),
-
-        # --- Will date variants ---
-        '{Will Execution Date}': will_date_formatted,
-        '{WILL DATE}': will_date_formatted,
-        '{Codicil Date}': codicil_date_formatted,
-
-        # --- Firm ---
-        '{ATTORNEY NAME}': data.get('attorney_full_name', ''),
-        '{BPR}': data.get('attorney_bpr', ''),
-        'Dale, Hutto & Lyle, PLLC': data.get('firm_name', 'Muletown Law, P.C.'),
+        'criminal_statement': criminal_stmt,
+        'business_statement': business_stmt,
+        'waiver_statement': will_waiver_stmt,
+        'sui_juris_statement': sui_juris_stmt,
+        'were_or_no': were_or_no,
+
+        # --- Attorney / Firm ---
+        'attorney_name': attorney_full,
+        'attorney_first_name': attorney_first,
+        'attorney_bpr': data.get('attorney_bpr', FIRM_CONSTANTS['attorney_bpr']),
+        'firm_name': data.get('firm_name', FIRM_CONSTANTS['firm_name']),
     }
 
-    return replacements
+
+def build_common_replacements(data, estate=None):
+    """Build the merge field replacement map from intake data.
+
+    Maps standardized spec field names AND legacy template field names
+    to data values. This handles the inconsistent naming across templates.
+    Returns a read-only {placeholder: value} mapping over COMMON_FIELDS.
+    Pass a prebuilt Estate to share its heir indexes.
+    """
+    return COMMON_FIELDS.bind(build_common_values(data, estate))
@@ -0,0 +1,255 @@
+# api/render_cache.py
+"""Render cache and conditional GET support for the generator endpoints.
+
+A client opts in by sending If-None-Match or "result_url": true with its
+POST; other requests are rendered and returned as before, with no ETag and
+nothing cached. An opted-in render is made deterministic and gets a strong
+ETag: an HMAC of the canonical payload, the endpoint, the template versions
+and (for documents whose text depends on it) the render date. Rendering is
+deterministic for those inputs, so the ETag identifies the exact bytes:
+
+- A POST whose If-None-Match already lists the ETag gets 412 without
+  rendering (RFC 9110 13.1.2: a POST is never answered with 304). The 412
+  carries the ETag and Content-Location, which the client can GET
+  conditionally. Only concrete tags count: "*" never matches a POST.
+- Otherwise the result is rendered once, kept in the render cache and
+  returned with ETag and a Content-Location the client can GET later
+  (GET /api/<endpoint>?etag=<tag>, honouring If-None-Match with 304).
+
+Exposure: a result URL returns the whole document, client PII included, to
+anyone who presents its ETag; there is no other authentication, for as long
+as the render stays cached (the LRU here, or the shared cache TTL). The
+ETag is keyed with RENDER_CACHE_SECRET so it cannot be computed from a
+guessed payload; set the same secret on every instance sharing a cache,
+otherwise each process uses a random key and result URLs only work on the
+instance that rendered them. GET responses carry no CORS headers, so other
+origins cannot read them from a browser. Treat result URLs like the
+documents themselves: do not log or share them.
+
+The cache is in memory per instance, bounded by total bytes with LRU
+eviction. With a shared cache configured (see cache_backend), renders are
+also published there, so a result URL works on any instance; without one,
+a GET that lands on another instance gets 404 and the client re-POSTs.
+"""
+import hashlib
+import hmac
+import json
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from urllib.parse import urlparse, parse_qs
+
+from cache_backend import cache_get, cache_set
+
+DEFAULT_MAX_BYTES = int(os.environ.get('RENDER_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+SECRET_ENV = 'RENDER_CACHE_SECRET'
+_PROCESS_SECRET = os.urandom(32)
+
+CachedRender = namedtuple('CachedRender', 'content content_type filename headers')
+
+
+def content_digest(content):
+    """Return a short hex digest identifying a template or document version."""
+    return hashlib.sha256(content).hexdigest()[:16]
+
+
+def _secret():
+    secret = os.environ.get(SECRET_ENV)
+    return secret.encode('utf-8') if secret else _PROCESS_SECRET
+
+
+def payload_etag(payload, *versions):
+    """Return a strong ETag for a payload rendered against the given versions.
+
+    The tag is an HMAC under the render cache secret, so knowing a payload
+    is not enough to name its cached render.
+    """
+    canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    digest = hmac.new(_secret(), canonical.encode('utf-8'), hashlib.sha256)
+    for version in versions:
+        digest.update(b'\0' + str(version).encode('utf-8'))
+    return f'"{digest.hexdigest()[:40]}"'
+
+
+def etag_matches(if_none_match, etag, exists=False):
+    """True if an If-None-Match header value matches etag (weak comparison).
+
+    "*" matches only when exists says a representation is currently stored.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return exists
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def result_url(endpoint, etag):
+    """Return the GET-able URL of a cached render."""
+    return f'/api/{endpoint}?etag={etag.strip(chr(34))}'
+
+
+class RenderCache:
+    """Thread-safe LRU of rendered outputs keyed by ETag, bounded by bytes."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, etag):
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is not None:
+                self._entries.move_to_end(etag)
+                return entry
+        shared = cache_get('render', etag)
+        if shared is None:
+            return None
+        entry = _decode(shared)
+        self._store(etag, entry)
+        return entry
+
+    def put(self, etag, content, content_type, filename, headers=()):
+        """Store a render (here and in the shared cache); return it as a CachedRender."""
+        entry = CachedRender(content, content_type, filename, tuple(headers))
+        cache_set('render', etag, _encode(entry))
+        self._store(etag, entry)
+        return entry
+
+    def _store(self, etag, entry):
+        content = entry.content
+        if len(content) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(etag, None)
+            if previous is not None:
+                self.size -= len(previous.content)
+            self._entries[etag] = entry
+            self.size += len(content)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted.content)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _encode(entry):
+    """Serialize a CachedRender for the shared cache: JSON line, then content."""
+    meta = {'content_type': entry.content_type, 'filename': entry.filename,
+            'headers': entry.headers}
+    return json.dumps(meta).encode('utf-8') + b'\n' + entry.content
+
+
+def _decode(raw):
+    meta, _, content = bytes(raw).partition(b'\n')
+    meta = json.loads(meta)
+    return CachedRender(content, meta['content_type'], meta['filename'],
+                        tuple(tuple(header) for header in meta['headers']))
+
+
+_render_cache = None
+
+
+def get_render_cache():
+    """Return the shared RenderCache, creating it on first use."""
+    global _render_cache
+    if _render_cache is None:
+        _render_cache = RenderCache()
+    return _render_cache
+
+
+def send_not_modified(handler, etag):
+    """Send 304 for a GET whose If-None-Match matched."""
+    handler.send_response(304)
+    handler.send_header('ETag', etag)
+    handler.end_headers()
+
+
+def send_precondition_failed(handler, endpoint, etag):
+    """Send 412 for a POST whose If-None-Match matched; the client already
+    has this render and can revalidate it at its result URL."""
+    handler.send_response(412)
+    handler.send_header('Content-Type', 'application/json')
+    handler.send_header('ETag', etag)
+    handler.send_header('Content-Location', result_url(endpoint, etag))
+    handler.send_header('Access-Control-Allow-Origin', '*')
+    handler.send_header('Access-Control-Expose-Headers', 'ETag, Content-Location')
+    handler.end_headers()
+    handler.wfile.write(json.dumps({'error': 'Render unchanged; GET the Content-Location '
+                                             'with If-None-Match'}).encode())
+
+
+def send_render(handler, endpoint, etag, entry, cors=True):
+    """Send a render, with its validators if it has an etag.
+
+    cors=False leaves out the CORS headers (result URL GETs).
+    """
+    handler.send_response(200)
+    handler.send_header('Content-Type', entry.content_type)
+    handler.send_header('Content-Disposition', f'attachment; filename="{entry.filename}"')
+    exposed = [name for name, _ in entry.headers]
+    if etag is not None:
+        handler.send_header('ETag', etag)
+        handler.send_header('Cache-Control', 'private, no-cache')
+        handler.send_header('Content-Location', result_url(endpoint, etag))
+        exposed = ['ETag', 'Content-Location'] + exposed
+    for name, value in entry.headers:
+        handler.send_header(name, value)
+    if cors:
+        handler.send_header('Access-Control-Allow-Origin', '*')
+        if exposed:
+            handler.send_header('Access-Control-Expose-Headers', ', '.join(exposed))
+    handler.end_headers()
+    handler.wfile.write(entry.content)
+
+
+def send_generated(handler, endpoint, data, render, versions):
+    """Answer a generator POST, through the render cache if the client opted in.
+
+    render(data) returns (content, content_type, filename, headers);
+    versions() returns the template versions and date the ETag covers. It is
+    only called for opted-in requests, which are rendered with
+    data['deterministic'] set. data's "result_url" flag is removed.
+    """
+    opted_in = data.pop('result_url', False) or handler.headers.get('If-None-Match')
+    if not opted_in:
+        send_render(handler, endpoint, None, CachedRender(*render(data)))
+        return
+    data['deterministic'] = True
+    etag = payload_etag(data, endpoint, *versions())
+    if etag_matches(handler.headers.get('If-None-Match'), etag):
+        send_precondition_failed(handler, endpoint, etag)
+        return
+    cache = get_render_cache()
+    entry = cache.get(etag)
+    if entry is None:
+        entry = cache.put(etag, *render(data))
+    send_render(handler, endpoint, etag, entry)
+
+
+def serve_cached_get(handler, endpoint):
+    """Handle GET /api/<endpoint>?etag=<tag> from the render cache.
+
+    Same-origin only: no CORS headers are sent (see the module docstring).
+    """
+    query = parse_qs(urlparse(handler.path).query)
+    etag = f'"{query.get("etag", [""])[0]}"'
+    entry = get_render_cache().get(etag)
+    if entry is None:
+        handler.send_response(404)
+        handler.send_header('Content-Type', 'application/json')
+        handler.end_headers()
+        handler.wfile.write(json.dumps({'error': 'Render not cached; POST the payload again'}).encode())
+        return
+    if etag_matches(handler.headers.get('If-None-Match'), etag, exists=True):
+        send_not_modified(handler, etag)
+        return
+    send_render(handler, endpoint, etag, entry, cors=False)
@@ -0,0 +1,70 @@
+# api/residual_placeholders.py
+"""Post-render check for placeholders that survived into a generated document.
+
+Scans the serialized WordprocessingML parts of a finished .docx with
+precompiled regexes (no XML parse), so it is cheap enough to run on every
+request. Tags are stripped with paragraph ends kept as line breaks, which
+finds tokens Word split across runs without letting one match span two
+paragraphs. Matched tokens are reported unescaped ('{A & B}', not
+'{A &amp; B}').
+
+Some {...} fields are deliberately left for Curly to fill, so residuals are
+reported by default and only fail a request in strict mode.
+"""
+import html
+import io
+import json
+import re
+import zipfile
+
+_SCANNED_PART = re.compile(r'^word/(document|header\d*|footer\d*|footnotes|endnotes)\.xml$')
+_PARAGRAPH_END = re.compile(r'</w:p>')
+_TAG = re.compile(r'<[^>]*>')
+RESIDUAL_TOKEN = re.compile(r'\{[^{}\n]*\}|##[^#\n]+##')
+
+HEADER_NAME = 'X-Residual-Placeholders'
+REPORT_FILENAME = 'residual-placeholders.json'
+
+
+class ResidualPlaceholderError(ValueError):
+    """Raised in strict mode when a generated document still has placeholders."""
+
+    def __init__(self, residuals):
+        self.residuals = residuals
+        count = sum(len(tokens) for tokens in residuals.values())
+        super().__init__(f"{count} unfilled placeholder(s) in "
+                         f"{len(residuals)} document(s): {distinct_tokens(residuals)}")
+
+
+def scan_docx(docx_bytes):
+    """Return the sorted distinct placeholder tokens left in a .docx."""
+    found = set()
+    with zipfile.ZipFile(io.BytesIO(docx_bytes)) as zf:
+        for part in zf.namelist():
+            if not _SCANNED_PART.match(part):
+                continue
+            xml = zf.read(part).decode('utf-8')
+            text = _TAG.sub('', _PARAGRAPH_END.sub('\n', xml))
+            found.update(html.unescape(token) for token in RESIDUAL_TOKEN.findall(text))
+    return sorted(found)
+
+
+def distinct_tokens(residuals):
+    """Flatten {document: [tokens]} into one sorted list of distinct tokens."""
+    return sorted({token for tokens in residuals.values() for token in tokens})
+
+
+def header_value(residuals):
+    """Return the response header value: a JSON array of distinct tokens.
+
+    Non-ASCII characters (e.g. curly apostrophes) are escaped so the value
+    stays a valid latin-1 header.
+    """
+    return json.dumps(distinct_tokens(residuals), separators=(',', ':'))
+
+
+def check_residuals(residuals, strict=False):
+    """Raise ResidualPlaceholderError if strict and any document has residuals."""
+    if strict and any(residuals.values()):
+        raise ResidualPlaceholderError(
+            {name: tokens for name, tokens in residuals.items() if tokens})
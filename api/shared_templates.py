@@ -0,0 +1,194 @@
+# api/shared_templates.py
+"""Shared-memory template tier for several worker processes on one host.
+
+A warm-up process publishes every template into POSIX shared memory once,
+in the template pack layout (see template_store):
+
+    python api/shared_templates.py publish      # probate + Drive templates
+    python api/shared_templates.py unlink       # remove the segments
+
+Two segments are written: <prefix>-probate, a copy of the compiled
+template artifacts and their plans (see compiled_templates), and
+<prefix>-drive, keyed by template URL. Raw templates are published to the
+probate segment only when no artifacts can be built, so attaching to the
+segment never gives up the compiled fast path. The prefix comes from
+TEMPLATE_SHM_PREFIX (default 'probate-templates'). Workers started
+afterwards attach read-only on first use. probate_utils serves the
+probate templates straight from the mapping. The Drive generators' caches
+return the Drive templates without keeping a private copy or downloading.
+A probate segment that no longer matches api/probate-templates is ignored,
+like a stale pack.
+
+Only template bytes are shared. Parsed python-docx trees are lxml objects
+that cannot live in shared memory; each render still parses its own copy.
+"""
+import os
+import sys
+from multiprocessing import resource_tracker, shared_memory
+
+from template_store import (PackView, CompiledView, encode_pack, DEFAULT_TEMPLATE_DIR,
+                            DEFAULT_COMPILED_PATH, SOURCES)
+
+SEGMENT_PREFIX = os.environ.get('TEMPLATE_SHM_PREFIX', 'probate-templates')
+DRIVE_GENERATORS = ('will', 'poa', 'hcpoa', 'acp')
+
+
+def segment_names(prefix=SEGMENT_PREFIX):
+    """Return (probate segment name, Drive segment name)."""
+    return f'{prefix}-probate', f'{prefix}-drive'
+
+
+def _untrack(segment):
+    # The resource tracker unlinks every segment a process touched when it
+    # exits; published segments must outlive the publisher and attached
+    # workers must never remove them.
+    resource_tracker.unregister(segment._name, 'shared_memory')
+
+
+class _Attachment(shared_memory.SharedMemory):
+    """A segment mapped for the life of the process.
+
+    Views into it are handed out freely, so it is never closed explicitly
+    (SharedMemory.__del__ would fail while they exist); the mapping goes
+    away with the process.
+    """
+
+    def __del__(self):
+        pass
+
+
+class SharedTemplateStore(PackView):
+    """Templates served read-only from a published shared-memory segment."""
+
+    def __init__(self, name, segment=None):
+        if segment is None:
+            segment = _Attachment(name=name)
+            _untrack(segment)
+        self._segment = segment
+        super().__init__(self._segment.buf, f'shared memory {name}')
+
+
+class SharedCompiledTemplateStore(CompiledView, SharedTemplateStore):
+    """Compiled artifacts served read-only from a published segment."""
+
+
+def publish(name, templates):
+    """Write {key: bytes} into a new segment called name.
+
+    A segment already published under that name is unlinked first; workers
+    still attached to it keep their mapping until they restart.
+    """
+    unlink(name)
+    head, blobs = encode_pack(sorted(templates.items()))
+    size = len(head) + sum(len(blob) for blob in blobs)
+    segment = shared_memory.SharedMemory(name=name, create=True, size=size)
+    _untrack(segment)
+    segment.buf[:len(head)] = head
+    offset = len(head)
+    for blob in blobs:
+        segment.buf[offset:offset + len(blob)] = blob
+        offset += len(blob)
+    segment.close()
+    return len(templates)
+
+
+def unlink(name):
+    """Remove a published segment; returns False if there was none."""
+    try:
+        segment = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return False
+    segment.close()
+    segment.unlink()  # also drops the tracker registration
+    return True
+
+
+_attached = {}
+
+
+def attach(name):
+    """Return the SharedTemplateStore for name, or None if not published.
+
+    The result (including None) is remembered for the life of the process.
+    """
+    if name not in _attached:
+        try:
+            store = SharedTemplateStore(name)
+        except (FileNotFoundError, ValueError):
+            store = None
+        if store is not None and SOURCES in store:
+            store = SharedCompiledTemplateStore(name, store._segment)
+        _attached[name] = store
+    return _attached[name]
+
+
+def shared_probate_store(directory=DEFAULT_TEMPLATE_DIR, prefix=SEGMENT_PREFIX):
+    """Return the shared probate store if published and current, else None."""
+    store = attach(segment_names(prefix)[0])
+    if store is None:
+        return None
+    return store if store.is_current(directory) else None
+
+
+def shared_drive_template(url, prefix=SEGMENT_PREFIX):
+    """Return a memoryview of a published Drive template, or None."""
+    store = attach(segment_names(prefix)[1])
+    if store is None or url not in store:
+        return None
+    return store.view(url)
+
+
+def publish_templates(prefix=SEGMENT_PREFIX, directory=DEFAULT_TEMPLATE_DIR, drive=True,
+                      compiled_path=DEFAULT_COMPILED_PATH):
+    """Publish the probate templates and (with drive=True) the Drive templates.
+
+    The probate segment gets the compiled artifacts at compiled_path, built
+    first if missing or stale, and the raw templates only if that fails.
+    Returns (probate count, Drive count, [warnings for Drive templates that
+    could not be fetched]).
+    """
+    from compiled_templates import ensure_artifacts
+    from placeholder_index import _load_generator
+    from template_store import DirectoryTemplateStore, open_compiled_store
+
+    probate_name, drive_name = segment_names(prefix)
+    compiled = (open_compiled_store(directory, compiled_path)
+                if ensure_artifacts(directory, compiled_path) else None)
+    if compiled is not None:
+        # Artifacts, their plans and the source digests, as in the pack
+        publish(probate_name, {name: compiled.read(name) for name in compiled.index})
+        probate_count = len(compiled)
+    else:
+        store = DirectoryTemplateStore(directory)
+        probate_count = publish(probate_name,
+                                {name: store.read(name) for name in store.names()})
+
+    drive_templates, warnings = {}, []
+    if drive:
+        for key in DRIVE_GENERATORS:
+            module = _load_generator(key)
+            url = module.TEMPLATE_URLS.get(key, '')
+            try:
+                drive_templates[url] = module._fetch_template(url)
+            except Exception as e:
+                warnings.append(f'{key}: {e}')
+    if drive_templates:
+        drive_count = publish(drive_name, drive_templates)
+    else:
+        unlink(drive_name)
+        drive_count = 0
+    return probate_count, drive_count, warnings
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'publish'
+    if command == 'publish':
+        probate_count, drive_count, warnings = publish_templates()
+        for warning in warnings:
+            print(f"Skipped {warning}")
+        print(f"Published {probate_count} probate and {drive_count} Drive templates")
+    elif command == 'unlink':
+        for name in segment_names():
+            print(f"{name}: {'removed' if unlink(name) else 'not published'}")
+    else:
+        sys.exit(f"usage: {sys.argv[0]} [publish|unlink]")
@@ -0,0 +1,724 @@
+# api/signing_packet.py
+"""Merge rendered documents into one signing-packet .docx.
+
+A signing packet is the whole package as a single document, one section per
+document, so it prints as one job. Each document starts on a new page with
+its own headers, footers and page numbers (a lone "Page X of Y" counts the
+pages of its own document).
+
+Templates differ in their style sheets: two of them may both define
+"Normal", with different fonts and spacing. The style definitions of every
+template are merged once into a DefinitionTable, which maps each template's
+style ids to packet style ids:
+
+- each template's document defaults and theme fonts are folded into its root
+  paragraph styles, so a style means the same thing in any packet
+- identical definitions share one packet id; a different definition under a
+  taken id is renamed with a numeric suffix ("Normal_2")
+- sources are added in a fixed order, so ids are stable across processes
+
+Merging a document is then one pass over its XML, rewriting style references
+through the precomputed mapping. The packet's style sheet holds only the
+styles its documents use. List definitions are copied per document with fresh
+ids, so numbered lists restart in each document. The cost of a merge is linear
+in the size of the documents.
+
+The fonts table, settings and theme of the packet are those of the first
+document. Footnotes, endnotes and comments are not merged; the probate
+templates use none.
+"""
+import hashlib
+import io
+import re
+import threading
+import zipfile
+from collections import namedtuple
+from copy import deepcopy
+from functools import lru_cache
+
+from docx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+from docx.opc.packuri import PackURI
+from docx.oxml.ns import nsdecls
+from docx.oxml.parser import parse_xml
+from docx.parts.hdrftr import FooterPart, HeaderPart
+from docx.parts.numbering import NumberingPart
+from lxml import etree
+
+W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+W = '{%s}' % W_NS
+R_ID = '{%s}id' % R_NS
+A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+W14 = '{http://schemas.microsoft.com/office/word/2010/wordml}'
+MC_IGNORABLE = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Ignorable'
+VAL = W + 'val'
+
+DOCX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+# Schema order of the children we insert (CT_Style, CT_PPr, CT_RPr, CT_SectPr)
+STYLE_ORDER = ('name', 'aliases', 'basedOn', 'next', 'link', 'autoRedefine', 'hidden',
+               'uiPriority', 'semiHidden', 'unhideWhenUsed', 'qFormat', 'locked', 'personal',
+               'personalCompose', 'personalReply', 'rsid', 'pPr', 'rPr', 'tblPr', 'trPr',
+               'tcPr', 'tblStylePr')
+PPR_ORDER = ('pStyle', 'keepNext', 'keepLines', 'pageBreakBefore', 'framePr', 'widowControl',
+             'numPr', 'suppressLineNumbers', 'pBdr', 'shd', 'tabs', 'suppressAutoHyphens',
+             'kinsoku', 'wordWrap', 'overflowPunct', 'topLinePunct', 'autoSpaceDE',
+             'autoSpaceDN', 'bidi', 'adjustRightInd', 'snapToGrid', 'spacing', 'ind',
+             'contextualSpacing', 'mirrorIndents', 'suppressOverlap', 'jc', 'textDirection',
+             'textAlignment', 'textboxTightWrap', 'outlineLvl', 'divId', 'cnfStyle', 'rPr',
+             'sectPr', 'pPrChange')
+RPR_ORDER = ('rStyle', 'rFonts', 'b', 'bCs', 'i', 'iCs', 'caps', 'smallCaps', 'strike',
+             'dstrike', 'outline', 'shadow', 'emboss', 'imprint', 'noProof', 'snapToGrid',
+             'vanish', 'webHidden', 'color', 'spacing', 'w', 'kern', 'position', 'sz', 'szCs',
+             'highlight', 'u', 'effect', 'bdr', 'shd', 'fitText', 'vertAlign', 'rtl', 'cs', 'em',
+             'lang', 'eastAsianLayout', 'specVanish', 'oMath')
+SECT_ORDER = ('headerReference', 'footerReference', 'footnotePr', 'endnotePr', 'type', 'pgSz',
+              'pgMar', 'paperSrc', 'pgBorders', 'lnNumType', 'pgNumType', 'cols', 'formProt',
+              'vAlign', 'noEndnote', 'titlePg', 'textDirection', 'bidi', 'rtlGutter', 'docGrid',
+              'printerSettings', 'sectPrChange')
+
+# Theme font attribute -> the explicit attribute for the same slot
+THEME_SLOTS = ((W + 'asciiTheme', W + 'ascii'), (W + 'hAnsiTheme', W + 'hAnsi'),
+               (W + 'eastAsiaTheme', W + 'eastAsia'), (W + 'cstheme', W + 'cs'))
+# Indentation attributes of which a style may set only one
+FIRST_LINE = {W + 'firstLine', W + 'hanging', W + 'firstLineChars', W + 'hangingChars'}
+
+# Style reference element -> type of the style it names
+STYLE_REFS = {W + 'pStyle': 'paragraph', W + 'rStyle': 'character', W + 'tblStyle': 'table',
+              W + 'numStyleLink': 'numbering', W + 'styleLink': 'numbering'}
+STORY_PARTS = {RT.HEADER: (HeaderPart, '/word/header%d.xml', 'hdr'),
+               RT.FOOTER: (FooterPart, '/word/footer%d.xml', 'ftr')}
+# Every element adopt() rewrites, so the walk skips the rest in C
+ADOPTED_TAGS = (W + 'p', W + 'tblPr', *STYLE_REFS, W + 'numId', W + 'rFonts', W + 'bookmarkStart',
+                W + 'bookmarkEnd', W + 'sectPr', W + 'instrText', W + 'fldSimple')
+_NUMPAGES = re.compile(r'\bNUMPAGES\b')
+_REL_ATTRIBUTES = etree.XPath('descendant-or-self::*/@r:*', namespaces={'r': R_NS})
+
+
+def _digest(blob):
+    return hashlib.sha1(blob).hexdigest() if blob else None
+
+
+def _local(tag):
+    return tag.rpartition('}')[2] if isinstance(tag, str) else ''
+
+
+def insert_ordered(parent, child, order):
+    """Insert child among parent's children at its schema position."""
+    rank = order.index(_local(child.tag)) if _local(child.tag) in order else len(order)
+    for position, sibling in enumerate(parent):
+        name = _local(sibling.tag)
+        if name in order and order.index(name) > rank:
+            parent.insert(position, child)
+            return child
+    parent.append(child)
+    return child
+
+
+def _child(parent, local, order):
+    """Return parent's w:<local> child, inserting an empty one if missing."""
+    child = parent.find(W + local)
+    if child is None:
+        child = insert_ordered(parent, parent.makeelement(W + local, {}), order)
+    return child
+
+
+# --- Fonts ---
+
+@lru_cache(maxsize=64)
+def theme_fonts(theme_xml):
+    """Return {theme font name: typeface} from a theme part, e.g. {'minorHAnsi': 'Calibri'}."""
+    fonts = {}
+    if not theme_xml:
+        return fonts
+    scheme = etree.fromstring(theme_xml).find(f'{A}themeElements/{A}fontScheme')
+    if scheme is None:
+        return fonts
+    for kind in ('major', 'minor'):
+        font = scheme.find(f'{A}{kind}Font')
+        if font is None:
+            continue
+        for script, names in (('latin', ('HAnsi', 'Ascii')), ('ea', ('EastAsia',)),
+                              ('cs', ('Bidi',))):
+            element = font.find(A + script)
+            typeface = element.get('typeface') if element is not None else None
+            for name in names:
+                if typeface:
+                    fonts[kind + name] = typeface
+    return fonts
+
+
+def resolve_theme_fonts(rfonts, fonts):
+    """Replace theme font references in a w:rFonts with the typefaces they name."""
+    for theme_attribute, attribute in THEME_SLOTS:
+        typeface = fonts.get(rfonts.get(theme_attribute))
+        if typeface:
+            rfonts.set(attribute, typeface)
+            del rfonts.attrib[theme_attribute]
+
+
+# --- Styles ---
+
+def _merge_property(container, default, order):
+    """Add a default property to a pPr/rPr, keeping what the style already sets."""
+    own = container.find(default.tag)
+    if own is None:
+        insert_ordered(container, deepcopy(default), order)
+    elif default.tag == W + 'rFonts':
+        for slot in THEME_SLOTS:
+            if not any(own.get(name) is not None for name in slot):
+                for name in slot:
+                    if default.get(name) is not None:
+                        own.set(name, default.get(name))
+    else:
+        taken = set(own.attrib)
+        if taken & FIRST_LINE:
+            taken |= FIRST_LINE
+        for name, value in default.attrib.items():
+            if name not in taken:
+                own.set(name, value)
+
+
+def fold_defaults(style, defaults):
+    """Fold a styles part's w:docDefaults into one of its root paragraph styles."""
+    for tag, order in (('pPr', PPR_ORDER), ('rPr', RPR_ORDER)):
+        default = defaults.find(f'{W}{tag}Default/{W}{tag}')
+        if default is None or not len(default):
+            continue
+        own = _child(style, tag, STYLE_ORDER)
+        for prop in default:
+            _merge_property(own, prop, order)
+
+
+SourceStyles = namedtuple('SourceStyles', 'key ids defaults')
+
+
+class DefinitionTable:
+    """Style and list definitions of many templates, merged once.
+
+    source(styles_xml, theme_xml) returns the SourceStyles of a styles part:
+    ids maps its style ids to packet style ids, and defaults the packet ids
+    of its default style of each type. Sources are keyed by content, so a
+    rendered document whose styles part is untouched maps at the cost of a
+    hash. numbering(numbering_xml) returns the parsed list definitions of a
+    numbering part, by id.
+    """
+
+    def __init__(self):
+        self.styles = {}      # packet id -> w:style, in packet ids
+        self.defaults = {}    # style type -> packet id of the first default
+        self.numbered = {}    # packet id -> (source key, numId) of a numbered style
+        self.nsmap = {}
+        self.ignorable = []
+        self.latent = None
+        self._canonical = {}
+        self._sources = {}
+        self._numbering = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_store(cls, store):
+        """Build the table of every template in a template store."""
+        table = cls()
+        for name in sorted(store.names()):
+            with zipfile.ZipFile(io.BytesIO(store.read(name))) as package:
+                entries = set(package.namelist())
+                styles, theme, numbering = (
+                    package.read(entry) if entry in entries else None
+                    for entry in ('word/styles.xml', 'word/theme/theme1.xml',
+                                  'word/numbering.xml'))
+            table.source(styles, theme)
+            table.numbering(numbering)
+        return table
+
+    def source(self, styles_xml, theme_xml=None):
+        key = _digest(styles_xml)
+        source = self._sources.get(key)
+        if source is None:
+            with self._lock:
+                source = self._sources.get(key)
+                if source is None:
+                    source = self._add(key, styles_xml, theme_fonts(theme_xml))
+                    self._sources[key] = source
+        return source
+
+    def numbering(self, numbering_xml):
+        key = _digest(numbering_xml)
+        definitions = self._numbering.get(key)
+        if definitions is None:
+            root = etree.fromstring(numbering_xml) if numbering_xml else None
+            definitions = NumberingDefinitions(
+                {} if root is None else {a.get(W + 'abstractNumId'): a
+                                         for a in root.findall(W + 'abstractNum')},
+                {} if root is None else {n.get(W + 'numId'): n for n in root.findall(W + 'num')},
+                root)
+            self._numbering[key] = definitions
+        return definitions
+
+    def _add(self, key, styles_xml, fonts):
+        if styles_xml is None:
+            return SourceStyles(key, {}, dict(self.defaults))
+        root = etree.fromstring(styles_xml)
+        self._add_namespaces(root)
+        if self.latent is None:
+            self.latent = root.find(W + 'latentStyles')
+        defaults = root.find(W + 'docDefaults')
+        if defaults is not None:
+            defaults = deepcopy(defaults)
+            for rfonts in defaults.iter(W + 'rFonts'):
+                resolve_theme_fonts(rfonts, fonts)
+        by_id = {style.get(W + 'styleId'): style for style in root.findall(W + 'style')}
+        ids = {}
+        added = []
+
+        def add(source_id):
+            if source_id in ids:
+                return ids[source_id]
+            ids[source_id] = None
+            style = deepcopy(by_id[source_id])
+            for rsid in style.findall(W + 'rsid'):
+                style.remove(rsid)
+            for rfonts in style.iter(W + 'rFonts'):
+                resolve_theme_fonts(rfonts, fonts)
+            based_on = style.find(W + 'basedOn')
+            parent = by_id.get(based_on.get(VAL)) if based_on is not None else None
+            if parent is not None and add(based_on.get(VAL)) is not None:
+                based_on.set(VAL, ids[based_on.get(VAL)])
+            else:
+                if based_on is not None:
+                    # Dangling or circular; the style stands on its own
+                    style.remove(based_on)
+                if (style.get(W + 'type') == 'paragraph' and defaults is not None):
+                    fold_defaults(style, defaults)
+            ids[source_id] = self._intern(key, source_id, style, added)
+            return ids[source_id]
+
+        for source_id in by_id:
+            add(source_id)
+        for style in added:
+            for tag in ('next', 'link'):
+                reference = style.find(W + tag)
+                if reference is not None:
+                    if reference.get(VAL) in ids:
+                        reference.set(VAL, ids[reference.get(VAL)])
+                    else:
+                        style.remove(reference)
+        source_defaults = dict(self.defaults)
+        for source_id, style in by_id.items():
+            if style.get(W + 'default') in ('1', 'true', 'on'):
+                source_defaults[style.get(W + 'type')] = ids[source_id]
+        return SourceStyles(key, ids, source_defaults)
+
+    def _intern(self, key, source_id, style, added):
+        """Return the packet id of a style definition, adding it if new."""
+        canonical = deepcopy(style)
+        canonical.attrib.pop(W + 'default', None)
+        for tag in ('next', 'link'):
+            for reference in canonical.findall(W + tag):
+                canonical.remove(reference)
+        canonical = etree.tostring(canonical)
+        packet_id = self._canonical.get(canonical)
+        if packet_id is not None:
+            return packet_id
+        packet_id, suffix = source_id, 1
+        while packet_id in self.styles:
+            suffix += 1
+            packet_id = f'{source_id}_{suffix}'
+        if suffix > 1:
+            style.set(W + 'styleId', packet_id)
+            name = style.find(W + 'name')
+            if name is not None:
+                name.set(VAL, f'{name.get(VAL)} ({suffix})')
+        kind = style.get(W + 'type')
+        if style.get(W + 'default') in ('1', 'true', 'on'):
+            if kind in self.defaults:
+                del style.attrib[W + 'default']
+            else:
+                self.defaults[kind] = packet_id
+        num_id = style.find(f'{W}pPr/{W}numPr/{W}numId')
+        if num_id is not None:
+            self.numbered[packet_id] = (key, num_id.get(VAL))
+        self.styles[packet_id] = style
+        self._canonical[canonical] = packet_id
+        added.append(style)
+        return packet_id
+
+    def _add_namespaces(self, root):
+        for prefix, uri in root.nsmap.items():
+            if prefix not in self.nsmap and uri not in self.nsmap.values():
+                self.nsmap[prefix] = uri
+        for prefix in (root.get(MC_IGNORABLE) or '').split():
+            if prefix in self.nsmap and self.nsmap[prefix] == root.nsmap.get(prefix) \
+                    and prefix not in self.ignorable:
+                self.ignorable.append(prefix)
+
+    def closure(self, style_ids):
+        """Return style_ids with the styles they are based on, link to or are followed by."""
+        pending = [style_id for style_id in style_ids if style_id in self.styles]
+        pending += self.defaults.values()
+        closure = set()
+        while pending:
+            style_id = pending.pop()
+            if style_id in closure or style_id not in self.styles:
+                continue
+            closure.add(style_id)
+            for tag in ('basedOn', 'next', 'link'):
+                reference = self.styles[style_id].find(W + tag)
+                if reference is not None:
+                    pending.append(reference.get(VAL))
+        return closure
+
+    def styles_element(self, style_ids):
+        """Return a w:styles element holding the given packet styles, in table order."""
+        root = etree.Element(W + 'styles', nsmap=self.nsmap)
+        if self.ignorable:
+            root.set(MC_IGNORABLE, ' '.join(self.ignorable))
+        # The defaults live in each source's root styles; the packet has none
+        etree.SubElement(root, W + 'docDefaults')
+        if self.latent is not None:
+            root.append(deepcopy(self.latent))
+        for style_id, style in self.styles.items():
+            if style_id in style_ids:
+                root.append(deepcopy(style))
+        return root
+
+
+NumberingDefinitions = namedtuple('NumberingDefinitions', 'abstracts nums root')
+
+
+# --- Merge ---
+
+class _Source:
+    """One document being merged: its mappings into the packet."""
+
+    def __init__(self, packet, document, index):
+        self.packet = packet
+        self.part = document.part
+        self.index = index
+        self.styles = packet.table.source(_related_blob(self.part, RT.STYLES),
+                                          _related_blob(self.part, RT.THEME))
+        self.numbering = packet.table.numbering(_related_blob(self.part, RT.NUMBERING))
+        self.fonts = theme_fonts(_related_blob(self.part, RT.THEME))
+        self.num_ids = {}
+        self.abstract_ids = {}
+        self.rel_ids = {}
+        self.copies = {}
+        self.sections = []
+        self.single_section = True
+        self.bookmark_offset = packet.bookmarks
+        # Paragraphs and tables without a style take their document's default,
+        # which must be named if it is not the packet's default
+        self.paragraph_style, self.table_style = (
+            self.styles.defaults.get(kind)
+            if self.styles.defaults.get(kind) != packet.table.defaults.get(kind) else None
+            for kind in ('paragraph', 'table'))
+        packet.used.update(style for style in (self.paragraph_style, self.table_style) if style)
+
+    def style(self, source_id, kind):
+        packet_id = self.styles.ids.get(source_id)
+        if (packet_id is None
+                or self.packet.table.styles[packet_id].get(W + 'type', 'paragraph') != kind):
+            packet_id = self.packet.table.defaults.get(kind)
+        if packet_id is not None:
+            self.packet.used.add(packet_id)
+        return packet_id
+
+    def num(self, num_id):
+        """Return the packet numId of one of this document's numIds."""
+        if num_id in self.num_ids:
+            return self.num_ids[num_id]
+        num = self.numbering.nums.get(num_id)
+        abstract_ref = num.find(W + 'abstractNumId') if num is not None else None
+        if abstract_ref is None or abstract_ref.get(VAL) not in self.numbering.abstracts:
+            # numId 0 (and anything undefined) means "not numbered"
+            self.num_ids[num_id] = '0'
+            return '0'
+        packet = self.packet
+        abstract_id = abstract_ref.get(VAL)
+        if abstract_id not in self.abstract_ids:
+            abstract = deepcopy(self.numbering.abstracts[abstract_id])
+            self.abstract_ids[abstract_id] = str(len(packet.abstracts))
+            abstract.set(W + 'abstractNumId', self.abstract_ids[abstract_id])
+            nsid = abstract.find(W + 'nsid')
+            if nsid is not None:
+                # Word continues lists that share an nsid
+                nsid.set(VAL, '%08X' % (0x5000000 + len(packet.abstracts)))
+            for picture in abstract.iter(W + 'lvlPicBulletId'):
+                picture.getparent().remove(picture)
+            packet.abstracts.append(abstract)
+            self.adopt(abstract)
+        num = deepcopy(num)
+        self.num_ids[num_id] = str(len(packet.nums) + 1)
+        num.set(W + 'numId', self.num_ids[num_id])
+        num.find(W + 'abstractNumId').set(VAL, self.abstract_ids[abstract_id])
+        packet.nums.append(num)
+        self.adopt(num)
+        return self.num_ids[num_id]
+
+    def adopt(self, element, story=None):
+        """Rewrite one tree of this document into packet terms, in place.
+
+        story is the part the tree belongs to, whose relationships r:id
+        attributes refer to (None for trees without any).
+        """
+        later = self.index > 0
+        unstyled = []
+        for node in element.iter(*ADOPTED_TAGS):
+            tag = node.tag
+            if tag == W + 'p':
+                if later:
+                    # Documents from one template repeat the same paragraph ids
+                    node.attrib.pop(W14 + 'paraId', None)
+                    node.attrib.pop(W14 + 'textId', None)
+                if self.paragraph_style is not None and node.find(f'{W}pPr/{W}pStyle') is None:
+                    unstyled.append(node)
+            elif tag == W + 'tblPr':
+                if self.table_style is not None and node.find(W + 'tblStyle') is None:
+                    unstyled.append(node)
+            elif tag in STYLE_REFS:
+                packet_id = self.style(node.get(VAL), STYLE_REFS[tag])
+                if packet_id is not None:
+                    node.set(VAL, packet_id)
+            elif tag == W + 'numId':
+                node.set(VAL, self.num(node.get(VAL)))
+            elif tag == W + 'rFonts':
+                if self.fonts:
+                    resolve_theme_fonts(node, self.fonts)
+            elif tag in (W + 'bookmarkStart', W + 'bookmarkEnd'):
+                bookmark = int(node.get(W + 'id', 0)) + self.bookmark_offset
+                node.set(W + 'id', str(bookmark))
+                self.packet.bookmarks = max(self.packet.bookmarks, bookmark + 1)
+            elif tag == W + 'sectPr':
+                if story is self.part:
+                    self.sections.append(node)
+            elif tag == W + 'instrText':
+                if self.single_section and node.text:
+                    node.text = _NUMPAGES.sub('SECTIONPAGES', node.text)
+            elif tag == W + 'fldSimple':
+                if self.single_section:
+                    node.set(W + 'instr', _NUMPAGES.sub('SECTIONPAGES', node.get(W + 'instr', '')))
+        # Styled after the walk, which has already chosen the node after each one
+        for node in unstyled:
+            if node.tag == W + 'tblPr':
+                node.insert(0, node.makeelement(W + 'tblStyle', {VAL: self.table_style}))
+                continue
+            ppr = node.find(W + 'pPr')
+            if ppr is None:
+                ppr = node.makeelement(W + 'pPr', {})
+                node.insert(0, ppr)
+            ppr.insert(0, ppr.makeelement(W + 'pStyle', {VAL: self.paragraph_style}))
+        if story is not None:
+            for attribute in _REL_ATTRIBUTES(element):
+                parent = attribute.getparent()
+                parent.set(attribute.attrname, self.relationship(story, str(attribute)))
+
+    def relationship(self, story, rel_id):
+        """Return the packet rId of a relationship of one of this document's parts."""
+        key = (story.partname, rel_id)
+        if key in self.rel_ids:
+            return self.rel_ids[key]
+        rel = story.rels[rel_id]
+        if self.index == 0:
+            # Already in the packet; a header or footer only needs its content mapped
+            new_id = rel_id
+            if rel.reltype in STORY_PARTS:
+                self.rel_ids[key] = new_id
+                self.adopt(rel.target_part.element, rel.target_part)
+        else:
+            new_id = self._copy_relationship(story, rel)
+        self.rel_ids[key] = new_id
+        return new_id
+
+    def _copy_relationship(self, story, rel):
+        packet = self.packet
+        target = packet.part if story is self.part else self.copies[story.partname]
+        if rel.reltype in STORY_PARTS:
+            source = rel.target_part
+            cls, template, _ = STORY_PARTS[rel.reltype]
+            part = cls(packet.partname(template), source.content_type,
+                       deepcopy(source.element), packet.package)
+            self.copies[source.partname] = part
+            self.adopt(part.element, source)
+            return packet.relate(target, rel.reltype, part)
+        if rel.is_external:
+            return target.relate_to(rel.target_ref, rel.reltype, is_external=True)
+        if rel.reltype == RT.IMAGE:
+            return target.get_or_add_image(io.BytesIO(rel.target_part.blob))[0]
+        raise ValueError(f'Cannot merge a {rel.reltype.rsplit("/", 1)[-1]} relationship '
+                         f'of {story.partname}')
+
+
+def _related_blob(part, reltype):
+    try:
+        return part.part_related_by(reltype).blob
+    except KeyError:
+        return None
+
+
+class _Packet:
+    """State of one merge: the packet document and what it has taken in."""
+
+    def __init__(self, document, table):
+        self.document = document
+        self.part = document.part
+        self.package = self.part.package
+        self.table = table
+        self.used = set()
+        self.abstracts = []
+        self.nums = []
+        self.bookmarks = 0
+        self.blanks = {}
+        self.numbered_styles = {}
+        self._partnames = {str(part.partname) for part in self.package.iter_parts()}
+        self._rel_ids = {}
+
+    def partname(self, template):
+        """Return a free partname like template; linear, unlike package.next_partname."""
+        n = 1
+        while template % n in self._partnames:
+            n += 1
+        self._partnames.add(template % n)
+        return PackURI(template % n)
+
+    def relate(self, source, reltype, target):
+        """Relate source to a new target part under a fresh rId."""
+        rels = source.rels
+        n = self._rel_ids.get(source.partname, len(rels))
+        while f'rId{n}' in rels:
+            n += 1
+        self._rel_ids[source.partname] = n + 1
+        rels.add_relationship(reltype, target, f'rId{n}')
+        return f'rId{n}'
+
+    def blank(self, reltype):
+        """rId of an empty header or footer, for sections that have none of a kind."""
+        if reltype not in self.blanks:
+            cls, template, tag = STORY_PARTS[reltype]
+            element = parse_xml(f'<w:{tag} {nsdecls("w")}><w:p/></w:{tag}>')
+            content_type = CT.WML_HEADER if reltype == RT.HEADER else CT.WML_FOOTER
+            part = cls(self.partname(template), content_type, element, self.package)
+            self.blanks[reltype] = self.relate(self.part, reltype, part)
+        return self.blanks[reltype]
+
+
+def _start_section(packet, section, even_headers):
+    """Make a document's first section start a page with its own page numbers."""
+    section_type = _child(section, 'type', SECT_ORDER)
+    if section_type.get(VAL) not in ('oddPage', 'evenPage'):
+        section_type.set(VAL, 'nextPage')
+    _child(section, 'pgNumType', SECT_ORDER).set(W + 'start', '1')
+    # A section without a header of some kind shows the previous section's
+    kinds = ['default']
+    title_page = section.find(W + 'titlePg')
+    if title_page is not None and title_page.get(VAL) not in ('0', 'false', 'off'):
+        kinds.append('first')
+    if even_headers:
+        kinds.append('even')
+    for reltype, tag in ((RT.HEADER, 'headerReference'), (RT.FOOTER, 'footerReference')):
+        present = {reference.get(W + 'type', 'default'): reference.get(R_ID)
+                   for reference in section.findall(W + tag)}
+        for kind in kinds:
+            if kind not in present:
+                # Even pages of a document without even headers show its default
+                rel_id = present.get('default') if kind == 'even' else None
+                reference = section.makeelement(W + tag, {W + 'type': kind})
+                reference.set(R_ID, rel_id or packet.blank(reltype))
+                insert_ordered(section, reference, SECT_ORDER)
+
+
+def _end_section(body, content, section):
+    """Close a document's last section after its content, as Word does."""
+    last = content[-1] if content else None
+    if last is not None and last.tag == W + 'p':
+        ppr = last.find(W + 'pPr')
+        if ppr is None:
+            ppr = last.makeelement(W + 'pPr', {})
+            last.insert(0, ppr)
+        if ppr.find(W + 'sectPr') is None:
+            insert_ordered(ppr, section, PPR_ORDER)
+            return
+    paragraph = body.makeelement(W + 'p', {})
+    paragraph.append(paragraph.makeelement(W + 'pPr', {}))
+    paragraph[0].append(section)
+    body.append(paragraph)
+
+
+def merge_documents(documents, table):
+    """Merge [(title, Document)] into one Document, one section per document.
+
+    The first Document becomes the packet and the others are emptied into
+    it, so none of them should be used afterwards. table is the
+    DefinitionTable to map styles through; styles unknown to it are added.
+    """
+    if not documents:
+        raise ValueError('A signing packet needs at least one document')
+    packet = _Packet(documents[0][1], table)
+    body = packet.document.element.body
+    even_headers = packet.document.settings.odd_and_even_pages_header_footer
+    sources = []
+    for index, (title, document) in enumerate(documents):
+        source = _Source(packet, document, index)
+        sources.append(source)
+        source_body = document.element.body
+        content = list(source_body)
+        final = content.pop() if content and content[-1].tag == W + 'sectPr' else None
+        if final is None:
+            final = source_body.makeelement(W + 'sectPr', {})
+        else:
+            source_body.remove(final)
+        source.single_section = source_body.find(f'{W}p/{W}pPr/{W}sectPr') is None
+        source.adopt(source_body, source.part)
+        source.adopt(final, source.part)
+        if index:
+            body.extend(content)
+            _start_section(packet, source.sections[0], even_headers)
+        if index < len(documents) - 1:
+            _end_section(body, content, final)
+        else:
+            body.append(final)
+
+    # Styles used by a numbered style bring in its list, which may bring in styles
+    emitted = set()
+    while True:
+        new = table.closure(packet.used) - emitted
+        if not new:
+            break
+        emitted |= new
+        for style_id in sorted(new):
+            if style_id in table.numbered:
+                key, num_id = table.numbered[style_id]
+                owner = next((s for s in sources if s.styles.key == key), None)
+                if owner is not None:
+                    packet.numbered_styles[style_id] = owner.num(num_id)
+
+    styles = table.styles_element(emitted)
+    for style in styles.iterfind(W + 'style'):
+        num_id = style.find(f'{W}pPr/{W}numPr/{W}numId')
+        if num_id is not None:
+            mapped = packet.numbered_styles.get(style.get(W + 'styleId'))
+            if mapped is None:
+                num_id.getparent().getparent().remove(num_id.getparent())
+            else:
+                num_id.set(VAL, mapped)
+    packet.part.part_related_by(RT.STYLES)._element = styles
+    _write_numbering(packet, sources[0])
+    return packet.document
+
+
+def _write_numbering(packet, first):
+    try:
+        part = packet.part.part_related_by(RT.NUMBERING)
+    except KeyError:
+        if not packet.nums:
+            return
+        part = NumberingPart(packet.partname('/word/numbering%d.xml'), CT.WML_NUMBERING,
+                             parse_xml(f'<w:numbering {nsdecls("w")}/>'), packet.package)
+        packet.relate(packet.part, RT.NUMBERING, part)
+    template = first.numbering.root
+    if template is not None:
+        root = etree.Element(template.tag, template.attrib, nsmap=template.nsmap)
+    else:
+        root = etree.Element(W + 'numbering', nsmap={'w': W_NS})
+    root.extend(packet.abstracts)
+    root.extend(packet.nums)
+    part._element = root
@@ -0,0 +1,104 @@
+# api/template_cache.py
+"""Thread-safe template cache with single-flight fetches.
+
+On a cold instance, or under a threaded server, several requests can miss
+the cache for the same template at once. TemplateCache lets exactly one of
+them fetch; the others wait for that fetch and share its result. A failed
+fetch is raised to the caller and every waiter, and nothing is cached, so
+the next request retries.
+
+    _template_cache = TemplateCache()
+    content = _template_cache.get(url, fetch)   # fetch(url) -> bytes
+
+The Drive generators (will, POA, HCPOA, ACP) keep their template in a
+module-level cache, so warm invocations do not download it again:
+
+    _template_cache = TemplateCache(lookup=shared_drive_template)
+    _template_cache.get(url, through_cache('template', _fetch_template))
+
+A miss first tries the template published to shared memory (see
+shared_templates), which is returned as a view without a private copy.
+Otherwise the single fetch tries the shared cache (see cache_backend)
+before downloading from Drive, and fills it afterwards.
+"""
+import threading
+
+
+class _Flight:
+    """One in-progress fetch that other callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TemplateCache:
+    """Key -> value cache where concurrent misses share a single fetch."""
+
+    def __init__(self, lookup=None):
+        """lookup(key), if given, is tried on a miss before fetching. A
+        non-None result is returned as-is and not copied into this cache
+        (it already lives in a shared tier, see shared_templates).
+        """
+        self._lookup = lookup
+        self._values = {}
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, fetch):
+        """Return the cached value for key, calling fetch(key) on a miss.
+
+        Only one fetch per key runs at a time; concurrent callers block
+        until it finishes and get its value or its exception.
+        """
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+        if self._lookup is not None:
+            value = self._lookup(key)
+            if value is not None:
+                return value
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = fetch(key)
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            flight.value = value
+            with self._lock:
+                self._values[key] = value
+            return value
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def discard(self, key):
+        """Drop a cached value (the next get() fetches again)."""
+        with self._lock:
+            self._values.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def __len__(self):
+        return len(self._values)
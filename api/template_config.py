@@ -7,6 +7,8 @@
 # 3. Copy the FILE_ID_HERE part
 # 4. Use format: https://drive.google.com/uc?export=download&id=FILE_ID_HERE
 
+import os
+
 TEMPLATE_URLS = {
     # Power of Attorney Template (Google Doc — use Docs export URL)
     'poa': 'https://docs.google.com/document/d/1t1vfNzq1Ri6q7LqwM2-vmRtQm9i2wOY0/export?format=docx',
@@ -42,3 +44,20 @@ PLACEHOLDERS = {
     'pronoun_his_her': '{PRONOUN_POSSESSIVE}',
     'pronoun_him_her': '{PRONOUN_OBJECTIVE}'
 }
+
+# Firm constants: values that are the same for every request of a deployment.
+# They are substituted into each template once, when it is first loaded, and
+# the evaluated copy is cached (see probate_utils.load_evaluated_template).
+# A request that sends its own value for one of these fields still renders
+# correctly from the original template. Keys are canonical field names;
+# empty values are never baked in.
+FIRM_CONSTANTS = {
+    # Replaces the legacy firm name printed in the probate signature blocks
+    'firm_name': os.environ.get('FIRM_NAME', 'Muletown Law, P.C.'),
+    # Attorney of record for the deployment ({ATTORNEY}, {BPR #}, ...)
+    'attorney_name': os.environ.get('ATTORNEY_NAME', ''),
+    'attorney_bpr': os.environ.get('ATTORNEY_BPR', ''),
+}
+
+# Attorney named in the POA ({AttorneyName}) when the request names none
+POA_ATTORNEY_NAME = FIRM_CONSTANTS['attorney_name'] or 'Thomas M. Hutto'
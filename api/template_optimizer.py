@@ -0,0 +1,443 @@
+# api/template_optimizer.py
+"""Offline optimizer that slims Word-authored .docx templates.
+
+Word leaves markup in templates that means nothing to a render but costs
+parse, traversal and save time on every request. It also splits
+placeholders across runs. The optimizer rewrites each template without:
+
+- w:rsid* revision-session attributes and the settings.xml rsid table
+- w:proofErr spelling/grammar marks and w:lastRenderedPageBreak hints
+- bookmarks that are empty or named _GoBack, unless a field or hyperlink
+  refers to them
+- styles that nothing uses, directly or through basedOn/next/link
+- fontTable entries that no part or theme font refers to
+- [trash]/ members that no relationship points at
+
+It then merges adjacent runs whose properties are identical, which heals
+most split placeholders. Every rewritten template is checked for render
+equivalence: both versions are rendered with a probe value for each
+placeholder, and the paragraphs of every story part (body, headers,
+footers, footnotes, endnotes, and the tables in them) must match in text
+and in the paragraph and run formatting they resolve to through the
+styles. A template that fails the check is reported and left alone.
+
+    python api/template_optimizer.py                  # report only
+    python api/template_optimizer.py --out slim/      # write slim copies
+    python api/template_optimizer.py --in-place       # rewrite the sources
+    python api/template_optimizer.py --json DIR ...   # machine-readable report
+"""
+import argparse
+import copy
+import io
+import json
+import os
+import sys
+import zipfile
+
+from docx import Document
+from lxml import etree
+
+from probate_utils import TEMPLATE_DIR, iter_document_paragraphs, replace_in_document
+from residual_placeholders import RESIDUAL_TOKEN
+
+W = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+A = 'http://schemas.openxmlformats.org/drawingml/2006/main'
+XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+_W = '{%s}' % W
+_STORY_PARTS = ('word/document.xml', 'word/header', 'word/footer', 'word/footnotes.xml',
+                'word/endnotes.xml')
+_DROPPED_ELEMENTS = ('proofErr', 'lastRenderedPageBreak')
+_FONT_ATTRIBUTES = ('ascii', 'hAnsi', 'cs', 'eastAsia')
+
+
+def _w(tag):
+    return _W + tag
+
+
+def _is_story(name):
+    return name.startswith(_STORY_PARTS) and name.endswith('.xml')
+
+
+def _canonical(element):
+    return b'' if element is None else etree.tostring(element, method='c14n')
+
+
+# --- Individual passes ---
+
+def strip_rsids(root):
+    """Remove w:rsid* attributes and the w:rsids table; return the count."""
+    removed = 0
+    for element in root.iter():
+        for attribute in [a for a in element.attrib if a.startswith(_W + 'rsid')]:
+            del element.attrib[attribute]
+            removed += 1
+    for table in root.findall(_w('rsids')):
+        root.remove(table)
+        removed += 1
+    return removed
+
+
+def strip_elements(root, names=_DROPPED_ELEMENTS):
+    """Remove every w:<name> element in names; return the count."""
+    doomed = [e for e in root.iter(*[_w(name) for name in names])]
+    for element in doomed:
+        element.getparent().remove(element)
+    return len(doomed)
+
+
+def referenced_bookmarks(roots):
+    """Names that fields (REF, PAGEREF, ...) or hyperlinks point at."""
+    text = []
+    for root in roots:
+        text.extend(t.text or '' for t in root.iter(_w('instrText')))
+        text.extend(e.get(_w('instr'), '') for e in root.iter(_w('fldSimple')))
+        text.extend(e.get(_w('anchor'), '') for e in root.iter(_w('hyperlink')))
+    return ' '.join(text)
+
+
+def strip_bookmarks(root, references):
+    """Remove empty or _GoBack bookmarks nothing refers to; return the count."""
+    removed = 0
+    for start in list(root.iter(_w('bookmarkStart'))):
+        name, bookmark_id = start.get(_w('name'), ''), start.get(_w('id'))
+        if name in references:
+            continue
+        following = start.getnext()
+        empty = (following is not None and following.tag == _w('bookmarkEnd')
+                 and following.get(_w('id')) == bookmark_id)
+        if not (empty or name == '_GoBack'):
+            continue
+        for end in list(root.iter(_w('bookmarkEnd'))):
+            if end.get(_w('id')) == bookmark_id:
+                end.getparent().remove(end)
+        start.getparent().remove(start)
+        removed += 1
+    return removed
+
+
+def _plain_run(run):
+    return all(child.tag in (_w('rPr'), _w('t')) for child in run)
+
+
+def merge_runs(root):
+    """Merge adjacent plain-text runs with identical properties; return merges."""
+    merged = 0
+    for parent in list(root.iter()):
+        previous = None
+        for child in list(parent):
+            if child.tag != _w('r') or not _plain_run(child):
+                previous = None
+                continue
+            if previous is not None and (_canonical(previous.find(_w('rPr')))
+                                         == _canonical(child.find(_w('rPr')))):
+                texts = previous.findall(_w('t'))
+                extra = ''.join(t.text or '' for t in child.findall(_w('t')))
+                if texts:
+                    texts[-1].text = (texts[-1].text or '') + extra
+                    texts[-1].set(XML_SPACE, 'preserve')
+                else:
+                    t = etree.SubElement(previous, _w('t'))
+                    t.text = extra
+                    t.set(XML_SPACE, 'preserve')
+                parent.remove(child)
+                merged += 1
+                continue
+            previous = child
+    return merged
+
+
+def strip_unused_styles(styles_root, used):
+    """Drop styles outside the closure of used ids and defaults; return the count."""
+    styles = {s.get(_w('styleId')): s for s in styles_root.findall(_w('style'))}
+    keep = {sid for sid, s in styles.items() if s.get(_w('default')) in ('1', 'true', 'on')}
+    pending = list(keep | (used & set(styles)))
+    while pending:
+        sid = pending.pop()
+        keep.add(sid)
+        for link in ('basedOn', 'next', 'link'):
+            target = styles[sid].find(_w(link))
+            if target is not None:
+                ref = target.get(_w('val'))
+                if ref in styles and ref not in keep:
+                    pending.append(ref)
+    removed = 0
+    for sid, style in styles.items():
+        if sid not in keep:
+            styles_root.remove(style)
+            removed += 1
+    return removed
+
+
+def used_style_ids(roots):
+    used = set()
+    for root in roots:
+        for tag in ('pStyle', 'rStyle', 'tblStyle', 'numStyleLink', 'styleLink'):
+            used.update(e.get(_w('val')) for e in root.iter(_w(tag)))
+    return used
+
+
+def used_fonts(roots, theme_roots):
+    fonts = set()
+    for root in roots:
+        for rfonts in root.iter(_w('rFonts')):
+            fonts.update(rfonts.get(_w(a)) for a in _FONT_ATTRIBUTES)
+    for theme in theme_roots:
+        fonts.update(e.get('typeface') for e in theme.iter() if e.get('typeface'))
+    fonts.discard(None)
+    return fonts
+
+
+def strip_unused_fonts(font_root, used):
+    removed = 0
+    for font in font_root.findall(_w('font')):
+        if font.get(_w('name')) not in used:
+            font_root.remove(font)
+            removed += 1
+    return removed
+
+
+# --- Whole template ---
+
+def count_nodes(docx_bytes):
+    """Element count over every XML member."""
+    total = 0
+    with zipfile.ZipFile(io.BytesIO(docx_bytes)) as package:
+        for name in package.namelist():
+            if name.endswith(('.xml', '.rels')):
+                total += sum(1 for _ in etree.fromstring(package.read(name)).iter())
+    return total
+
+
+def slim_docx(docx_bytes):
+    """Return (slim .docx bytes, {pass: count}) for one template."""
+    source = zipfile.ZipFile(io.BytesIO(docx_bytes))
+    members = [info for info in source.infolist() if not info.filename.startswith('[trash]/')]
+    roots = {info.filename: etree.fromstring(source.read(info)) for info in members
+             if info.filename.startswith('word/') and info.filename.endswith('.xml')
+             and not info.filename.startswith('word/theme/')}
+    themes = [etree.fromstring(source.read(info)) for info in members
+              if info.filename.startswith('word/theme/')]
+    stats = {'trash members': len(source.infolist()) - len(members)}
+
+    stats['rsids'] = sum(strip_rsids(root) for root in roots.values())
+    stats['proofing and layout marks'] = sum(strip_elements(root) for root in roots.values())
+    stories = [root for name, root in roots.items() if _is_story(name)]
+    references = referenced_bookmarks(stories)
+    stats['bookmarks'] = sum(strip_bookmarks(root, references) for root in stories)
+    stats['merged runs'] = sum(merge_runs(root) for root in stories)
+
+    if 'word/styles.xml' in roots:
+        used = used_style_ids(root for name, root in roots.items() if name != 'word/styles.xml')
+        stats['styles'] = strip_unused_styles(roots['word/styles.xml'], used)
+    if 'word/fontTable.xml' in roots:
+        fonts = used_fonts([root for name, root in roots.items() if name != 'word/fontTable.xml'],
+                           themes)
+        stats['fonts'] = strip_unused_fonts(roots['word/fontTable.xml'], fonts)
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as target:
+        for info in members:
+            if info.filename in roots:
+                content = etree.tostring(roots[info.filename], xml_declaration=True,
+                                         encoding='UTF-8', standalone=True)
+            else:
+                content = source.read(info)
+            entry = zipfile.ZipInfo(info.filename, info.date_time)
+            entry.compress_type = zipfile.ZIP_DEFLATED
+            entry.external_attr = info.external_attr
+            target.writestr(entry, content)
+    return buffer.getvalue(), stats
+
+
+# --- Equivalence check ---
+
+def _clean(element):
+    """Canonical XML of element without rsid attributes."""
+    element = copy.deepcopy(element)
+    strip_rsids(element)
+    return _canonical(element)
+
+
+class _Formatting:
+    """Effective properties of the paragraphs and runs of one package.
+
+    Properties resolve as Word applies them: document defaults, then the
+    paragraph style chain (basedOn), then the run style chain, then direct
+    formatting. A reference to a style that does not exist contributes
+    nothing, so a stripped style still in use changes the result.
+    """
+
+    def __init__(self, styles_root):
+        self.styles, self.default_style, self.defaults = {}, None, {}
+        if styles_root is None:
+            return
+        for style in styles_root.findall(_w('style')):
+            style_id = style.get(_w('styleId'))
+            self.styles[style_id] = style
+            if (style.get(_w('type')) == 'paragraph'
+                    and style.get(_w('default')) in ('1', 'true', 'on')):
+                self.default_style = style_id
+        for kind in ('pPr', 'rPr'):
+            self.defaults[kind] = styles_root.find(
+                f'{_w("docDefaults")}/{_w(kind + "Default")}/{_w(kind)}')
+
+    def _chain(self, style_id):
+        """Style elements from the root of style_id's basedOn chain down."""
+        chain, seen = [], set()
+        while style_id in self.styles and style_id not in seen:
+            seen.add(style_id)
+            chain.insert(0, self.styles[style_id])
+            based_on = self.styles[style_id].find(_w('basedOn'))
+            style_id = based_on.get(_w('val')) if based_on is not None else None
+        return chain
+
+    def _styled(self, kind, style_id):
+        return [style.find(_w(kind)) for style in self._chain(style_id)]
+
+    @staticmethod
+    def _merge(layers):
+        """Return sorted ((tag, XML), ...), later layers winning."""
+        properties = {}
+        for layer in layers:
+            if layer is not None:
+                properties.update((child.tag, _clean(child)) for child in layer)
+        return tuple(sorted(properties.items()))
+
+    def paragraph(self, p):
+        """Return (resolved pPr, ((resolved rPr, text), ...)) for a w:p."""
+        ppr = p.find(_w('pPr'))
+        style = ppr.find(_w('pStyle')) if ppr is not None else None
+        style_id = style.get(_w('val')) if style is not None else self.default_style
+        paragraph_rpr = [self.defaults.get('rPr'), *self._styled('rPr', style_id)]
+        runs = []
+        for run in p.iter(_w('r')):
+            if next(run.iterancestors(_w('p')), None) is not p:
+                continue  # belongs to a nested paragraph (text box)
+            text = _run_text(run)
+            if not text:
+                continue
+            rpr = run.find(_w('rPr'))
+            rstyle = rpr.find(_w('rStyle')) if rpr is not None else None
+            run_style = rstyle.get(_w('val')) if rstyle is not None else None
+            resolved = self._merge(
+                paragraph_rpr + self._styled('rPr', run_style) + [rpr])
+            if runs and runs[-1][0] == resolved:
+                runs[-1] = (resolved, runs[-1][1] + text)
+            else:
+                runs.append((resolved, text))
+        ppr_layers = [self.defaults.get('pPr'), *self._styled('pPr', style_id), ppr]
+        return self._merge(ppr_layers), tuple(runs)
+
+
+_RUN_TEXT = {_w('tab'): '\t', _w('br'): '\n', _w('cr'): '\n'}
+
+
+def _run_text(run):
+    parts = []
+    for child in run:
+        if child.tag in (_w('t'), _w('instrText')):
+            parts.append(child.text or '')
+        else:
+            parts.append(_RUN_TEXT.get(child.tag, ''))
+    return ''.join(parts)
+
+
+def package_signature(docx_bytes):
+    """{story part: [(resolved pPr, runs), ...]} for every story part.
+
+    Story parts are the body, headers, footers, footnotes and endnotes;
+    every paragraph in them counts, including those in tables.
+    """
+    with zipfile.ZipFile(io.BytesIO(docx_bytes)) as package:
+        names = package.namelist()
+        styles = (etree.fromstring(package.read('word/styles.xml'))
+                  if 'word/styles.xml' in names else None)
+        formatting = _Formatting(styles)
+        return {name: [formatting.paragraph(p)
+                       for p in etree.fromstring(package.read(name)).iter(_w('p'))]
+                for name in sorted(names) if _is_story(name)}
+
+
+def render_signature(docx_bytes):
+    """Signatures of a template before and after rendering a probe value
+    per placeholder (see package_signature)."""
+    doc = Document(io.BytesIO(docx_bytes))
+    tokens = set()
+    for paragraph in iter_document_paragraphs(doc):
+        tokens.update(RESIDUAL_TOKEN.findall(paragraph.text))
+    replace_in_document(doc, {token: f'<probe {n}>' for n, token in enumerate(sorted(tokens))})
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return package_signature(docx_bytes), package_signature(buffer.getvalue())
+
+
+def equivalent(original, slim):
+    """True if both templates have the same formatted paragraphs in every
+    story part, before and after rendering."""
+    return render_signature(original) == render_signature(slim)
+
+
+def optimize_template(docx_bytes):
+    """Slim one template and verify it; return (slim bytes or None, report dict)."""
+    slim, stats = slim_docx(docx_bytes)
+    ok = equivalent(docx_bytes, slim)
+    report = {
+        'bytes': [len(docx_bytes), len(slim)],
+        'nodes': [count_nodes(docx_bytes), count_nodes(slim)],
+        'removed': stats,
+        'equivalent': ok,
+    }
+    return (slim if ok else None), report
+
+
+def optimize_directory(directory=TEMPLATE_DIR, out=None, in_place=False):
+    """Optimize every .docx in directory; return {filename: report}.
+
+    Slim copies are written to out (or over the sources with in_place);
+    templates that fail the equivalence check are never written.
+    """
+    reports = {}
+    for name in sorted(n for n in os.listdir(directory) if n.endswith('.docx')):
+        with open(os.path.join(directory, name), 'rb') as f:
+            slim, report = optimize_template(f.read())
+        reports[name] = report
+        target = os.path.join(directory, name) if in_place else (
+            os.path.join(out, name) if out else None)
+        if slim is not None and target:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(slim)
+    return reports
+
+
+def format_report(reports):
+    lines = [f'{"template":<58}{"bytes":>17}{"nodes":>17}  check']
+    totals = [0, 0, 0, 0]
+    for name, report in reports.items():
+        (b0, b1), (n0, n1) = report['bytes'], report['nodes']
+        totals = [totals[0] + b0, totals[1] + b1, totals[2] + n0, totals[3] + n1]
+        lines.append(f'{name[:57]:<58}{b0:>8,}>{b1:<8,}{n0:>8,}>{n1:<8,}  '
+                     f'{"ok" if report["equivalent"] else "DIFFERS (not written)"}')
+    b0, b1, n0, n1 = totals
+    if b0 and n0:
+        lines.append(f'{"total":<58}{b0:>8,}>{b1:<8,}{n0:>8,}>{n1:<8,}  '
+                     f'-{1 - b1 / b0:.0%} bytes, -{1 - n1 / n0:.0%} nodes')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Slim .docx templates and verify them.')
+    parser.add_argument('directory', nargs='?', default=TEMPLATE_DIR)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--out', help='write slim copies to this directory')
+    target.add_argument('--in-place', action='store_true', help='rewrite the templates')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    reports = optimize_directory(args.directory, args.out, args.in_place)
+    print(json.dumps(reports, indent=2) if args.json else format_report(reports))
+    return 0 if all(r['equivalent'] for r in reports.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
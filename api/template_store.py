@@ -0,0 +1,383 @@
+# api/template_store.py
+"""Read-only stores for the probate .docx templates.
+
+PackedTemplateStore memory-maps one archive holding every template, so
+worker processes on the same host share the templates through the page
+cache instead of each buffering its own copy. Templates are handed to
+python-docx as seekable streams over memoryview slices of the mapping;
+only the zip members python-docx actually reads are copied out.
+
+Pack layout (all integers little-endian):
+
+    b'TPK1' | uint32 index length | JSON index | template bytes ...
+
+The JSON index maps template filename -> [offset, length, sha256 hex digest],
+with offsets relative to the start of the file. A pack is only served while
+every digest matches the template directory, so an edited template is never
+served stale, whatever its size or timestamp.
+
+The pack is for hosts running several worker processes (local_server.py,
+asgi_app.py), which call ensure_pack() at startup when the compiled
+artifacts cannot be built. Vercel runs no build
+step for the Python functions, so serverless instances read the template
+directory; the pack file is gitignored and never deployed. To build it by
+hand:
+
+    python api/template_store.py                 # writes api/probate-templates.pack
+
+CompiledTemplateStore reads the same layout holding precompiled artifacts
+and their placeholder plans, built by compiled_templates.py; CompiledView
+gives any pack view of such artifacts the same interface.
+
+DirectoryTemplateStore reads the template directory directly and caches
+bytes per process, with concurrent first reads of a template sharing one
+file read; open_template_store() falls back to it when no current pack has
+been built.
+"""
+import hashlib
+import io
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import zipfile
+
+from template_cache import TemplateCache
+
+MAGIC = b'TPK1'
+_HEADER = struct.Struct('<4sI')
+API_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TEMPLATE_DIR = os.path.join(API_DIR, 'probate-templates')
+DEFAULT_PACK_PATH = os.path.join(API_DIR, 'probate-templates.pack')
+DEFAULT_COMPILED_PATH = os.path.join(API_DIR, 'probate-templates.compiled.pack')
+PLAN_SUFFIX = '.plan'
+SOURCES = '.sources'
+
+
+class MemoryViewStream(io.RawIOBase):
+    """Seekable, read-only stream over a memoryview (no up-front copy)."""
+
+    def __init__(self, view):
+        self._view = view
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = len(self._view) + offset
+        else:
+            raise ValueError(f"Invalid whence: {whence}")
+        if pos < 0:
+            raise ValueError(f"Negative seek position {pos}")
+        self._pos = pos
+        return pos
+
+    def readinto(self, buffer):
+        chunk = self._view[self._pos:self._pos + len(buffer)]
+        n = len(chunk)
+        buffer[:n] = chunk
+        self._pos += n
+        return n
+
+    def read(self, size=-1):
+        end = len(self._view) if size is None or size < 0 else self._pos + size
+        chunk = bytes(self._view[self._pos:end])
+        self._pos += len(chunk)
+        return chunk
+
+    def getvalue(self):
+        return bytes(self._view)
+
+
+class DirectoryTemplateStore:
+    """Templates read from a directory, bytes cached per process."""
+
+    # Templates are the original .docx files, runs not yet merged
+    healed = False
+
+    def __init__(self, directory=DEFAULT_TEMPLATE_DIR):
+        self.directory = directory
+        self._cache = TemplateCache()
+
+    def _read_file(self, name):
+        with open(os.path.join(self.directory, name), 'rb') as f:
+            return f.read()
+
+    def read(self, name):
+        """Return the raw bytes of a template."""
+        return self._cache.get(name, self._read_file)
+
+    def open(self, name):
+        """Return a fresh read-only stream over a template."""
+        return io.BytesIO(self.read(name))
+
+    def names(self):
+        return sorted(n for n in os.listdir(self.directory) if n.endswith('.docx'))
+
+    def sources(self):
+        """Return {name: sha256 hex digest} of the source templates."""
+        return {name: hashlib.sha256(self.read(name)).hexdigest() for name in self.names()}
+
+    def __len__(self):
+        return len(self._cache)
+
+
+class PackView:
+    """Read-only template store over a buffer in the pack layout."""
+
+    healed = False
+
+    def __init__(self, buffer, label):
+        self.label = label
+        self._view = memoryview(buffer)
+        magic, index_length = _HEADER.unpack_from(self._view)
+        if magic != MAGIC:
+            raise ValueError(f"{label} is not a template pack")
+        index_start = _HEADER.size
+        self.index = json.loads(bytes(self._view[index_start:index_start + index_length]))
+
+    def _slice(self, name):
+        try:
+            offset, length = self.index[name][:2]
+        except KeyError:
+            raise FileNotFoundError(f"{name} is not in template pack {self.label}") from None
+        return self._view[offset:offset + length]
+
+    def read(self, name):
+        """Return the raw bytes of a template (a copy)."""
+        return bytes(self._slice(name))
+
+    def view(self, name):
+        """Return a zero-copy memoryview of a template."""
+        return self._slice(name)
+
+    def open(self, name):
+        """Return a zero-copy stream over a template."""
+        return MemoryViewStream(self._slice(name))
+
+    def names(self):
+        return sorted(self.index)
+
+    def digests(self):
+        """Return {name: sha256 hex digest recorded at build time, or None}."""
+        return {name: entry[2] if len(entry) > 2 else None
+                for name, entry in self.index.items()}
+
+    def sources(self):
+        """Return {name: sha256 hex digest} of the source templates."""
+        return {name: digest or hashlib.sha256(self._slice(name)).hexdigest()
+                for name, digest in self.digests().items()}
+
+    def is_current(self, directory):
+        """True if the pack holds exactly the directory's templates, byte for byte."""
+        if not os.path.isdir(directory):
+            return True
+        return self.digests() == source_digests(directory)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+
+class PackedTemplateStore(PackView):
+    """Templates served from a memory-mapped pack file (see module docstring)."""
+
+    def __init__(self, path=DEFAULT_PACK_PATH):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        super().__init__(self._mmap, path)
+
+
+def encode_pack(items):
+    """Return (header and index bytes, [template bytes, ...]) for a pack.
+
+    items is a sorted list of (name, bytes); the blobs follow the header in
+    the same order.
+    """
+    # Offsets depend on the index length, which depends on the offsets'
+    # digits; iterate until the encoded index stops growing.
+    index_bytes = b''
+    while True:
+        offset = _HEADER.size + len(index_bytes)
+        index = {}
+        for name, blob in items:
+            index[name] = [offset, len(blob), hashlib.sha256(blob).hexdigest()]
+            offset += len(blob)
+        encoded = json.dumps(index, sort_keys=True).encode('utf-8')
+        if len(encoded) == len(index_bytes):
+            index_bytes = encoded
+            break
+        index_bytes = encoded
+    return _HEADER.pack(MAGIC, len(index_bytes)) + index_bytes, [blob for _, blob in items]
+
+
+def build_pack(directory=DEFAULT_TEMPLATE_DIR, path=DEFAULT_PACK_PATH):
+    """Pack every .docx in directory into one file at path.
+
+    Returns the number of templates packed. The file is written next to
+    path and renamed into place, so running workers never map a partial pack.
+    """
+    names = sorted(n for n in os.listdir(directory) if n.endswith('.docx'))
+    items = []
+    for name in names:
+        with open(os.path.join(directory, name), 'rb') as f:
+            items.append((name, f.read()))
+    write_pack(items, path)
+    return len(names)
+
+
+def write_pack(items, path):
+    """Write a sorted list of (name, bytes) as a pack file at path.
+
+    The file is written next to path and renamed into place.
+    """
+    head, blobs = encode_pack(items)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(head)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp, path)
+
+
+# Digests by (path, size, mtime, ctime), so opening a store again only stats
+# the files. A file changed within SETTLE_NS of being hashed is hashed again
+# next time: its timestamps cannot yet tell it from a same-size edit made
+# in the same clock tick (git's "racily clean" rule).
+SETTLE_NS = 2 * 10 ** 9
+_file_digests = {}
+
+
+def _file_digest(path):
+    stat = os.stat(path)
+    key = (path, stat.st_size, stat.st_mtime_ns, stat.st_ctime_ns)
+    digest = _file_digests.get(key)
+    if digest is None:
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        if time.time_ns() - max(stat.st_mtime_ns, stat.st_ctime_ns) > SETTLE_NS:
+            _file_digests[key] = digest
+    return digest
+
+
+def source_digests(directory):
+    """Return {template filename: sha256 hex digest} for a template directory.
+
+    Each settled file is hashed once per process and version (see
+    SETTLE_NS); later calls only stat it.
+    """
+    return {name: _file_digest(os.path.join(directory, name))
+            for name in os.listdir(directory) if name.endswith('.docx')}
+
+
+def open_template_store(directory=DEFAULT_TEMPLATE_DIR, pack_path=DEFAULT_PACK_PATH):
+    """Return a PackedTemplateStore if a current pack exists, else a
+    DirectoryTemplateStore over directory.
+
+    A pack that no longer matches the directory (templates added, removed or
+    edited since it was built) is ignored rather than served stale.
+    """
+    if pack_path and os.path.exists(pack_path):
+        store = PackedTemplateStore(pack_path)
+        if store.is_current(directory):
+            return store
+    return DirectoryTemplateStore(directory)
+
+
+def ensure_pack(directory=DEFAULT_TEMPLATE_DIR, path=DEFAULT_PACK_PATH):
+    """Build the pack at path unless a current one exists.
+
+    Returns True if a current pack is in place afterwards; a read-only
+    deployment just keeps reading the directory.
+    """
+    if not os.path.isdir(directory):
+        return False
+    try:
+        if os.path.exists(path) and PackedTemplateStore(path).is_current(directory):
+            return True
+        build_pack(directory, path)
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+class CompiledView:
+    """Precompiled templates with their placeholder plans (see compiled_templates).
+
+    Mixed into a pack view: alongside each '<name>' artifact the pack holds
+    '<name>.plan' (JSON) and one SOURCES entry recording the sha256 digest of
+    every source template.
+    """
+
+    # Artifacts have their paragraph runs merged already
+    healed = True
+
+    def names(self):
+        return sorted(n for n in self.index if n.endswith('.docx'))
+
+    def plan(self, name):
+        """Return the placeholder plan of a template."""
+        return json.loads(bytes(self._slice(name + PLAN_SUFFIX)))
+
+    def sources(self):
+        """Return {name: sha256 hex digest} of the templates compiled from."""
+        return json.loads(bytes(self._slice(SOURCES)))
+
+    def is_current(self, directory):
+        """True if the artifacts were compiled from the directory's templates."""
+        if not os.path.isdir(directory):
+            return True
+        return source_digests(directory) == json.loads(bytes(self._slice(SOURCES)))
+
+    def __len__(self):
+        return len(self.names())
+
+
+class CompiledTemplateStore(CompiledView, PackedTemplateStore):
+    """Compiled artifacts served from a memory-mapped pack file."""
+
+
+def open_compiled_store(directory=DEFAULT_TEMPLATE_DIR, path=DEFAULT_COMPILED_PATH):
+    """Return a CompiledTemplateStore if current artifacts exist, else None."""
+    if path and os.path.exists(path):
+        store = CompiledTemplateStore(path)
+        if store.is_current(directory):
+            return store
+    return None
+
+
+def store_uncompressed(docx_bytes):
+    """Return a .docx with the same members, all stored (no deflate).
+
+    Opening it skips inflating every part; it is about three times larger.
+    """
+    source = zipfile.ZipFile(io.BytesIO(docx_bytes))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as target:
+        for info in source.infolist():
+            entry = zipfile.ZipInfo(info.filename, info.date_time)
+            entry.external_attr = info.external_attr
+            target.writestr(entry, source.read(info))
+    return buffer.getvalue()
+
+
+if __name__ == '__main__':
+    count = build_pack(*sys.argv[1:3])
+    print(f"Packed {count} templates")
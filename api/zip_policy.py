@@ -0,0 +1,94 @@
+# api/zip_policy.py
+"""ZIP compression policy and deterministic .docx/.zip packing.
+
+Shared by the probate package builder and the single-document generators;
+it has no dependencies beyond the standard library, so importing it does
+not pull the probate templates into a function's cold start.
+"""
+import os
+import re
+import zipfile
+import zlib
+from datetime import datetime
+from io import BytesIO
+
+# A .docx is itself a deflated ZIP, so deflating it again costs CPU for a
+# percent or two of size. The compression policy picks, per entry:
+#   'stored'  - no compression
+#   'deflate' - deflate at ZIP_COMPRESSLEVEL (zlib 1-9)
+#   'auto'    - store nested ZIP containers (.docx) outright; deflate other
+#               entries only if a level-1 pass over a sample saves at least
+#               AUTO_MIN_SAVING
+
+ZIP_COMPRESSION_POLICIES = ('stored', 'deflate', 'auto')
+ZIP_COMPRESSION = os.environ.get('PROBATE_ZIP_COMPRESSION', 'auto')
+ZIP_COMPRESSLEVEL = int(os.environ.get('PROBATE_ZIP_COMPRESSLEVEL', 6))
+AUTO_SAMPLE_BYTES = 16 * 1024
+AUTO_MIN_SAVING = 0.10
+
+
+def entry_compression(content, policy, level):
+    """Return (compress_type, compresslevel) for one ZIP entry."""
+    if policy == 'stored':
+        return zipfile.ZIP_STORED, None
+    if policy == 'deflate':
+        return zipfile.ZIP_DEFLATED, level
+    if policy != 'auto':
+        raise ValueError(f"Unknown ZIP compression policy: {policy!r} "
+                         f"(expected one of {ZIP_COMPRESSION_POLICIES})")
+    if content[:4] == b'PK\x03\x04':
+        return zipfile.ZIP_STORED, None
+    sample = content[:AUTO_SAMPLE_BYTES]
+    if sample and len(zlib.compress(sample, 1)) <= len(sample) * (1 - AUTO_MIN_SAVING):
+        return zipfile.ZIP_DEFLATED, level
+    return zipfile.ZIP_STORED, None
+
+
+# Deterministic mode: identical inputs give byte-identical bundles, so the
+# output can be content-addressed. Every ZIP entry (in the bundle and inside
+# each .docx) gets a fixed timestamp at midnight of the generation date, and
+# the volatile docProps/core.xml fields are pinned to the same instant.
+
+_CORE_TIMESTAMP = re.compile(
+    rb'(<dcterms:(created|modified)\b[^>]*>)[^<]*(</dcterms:\2>)')
+_CORE_REVISION = re.compile(rb'<cp:revision>[^<]*</cp:revision>')
+_CORE_LAST_PRINTED = re.compile(rb'<cp:lastPrinted>[^<]*</cp:lastPrinted>|<cp:lastPrinted/>')
+
+
+def zip_date_time(date_str):
+    """Return the ZIP date_time tuple for midnight of a YYYY-MM-DD date."""
+    d = datetime.strptime(date_str.strip(), '%Y-%m-%d')
+    return (d.year, d.month, d.day, 0, 0, 0)
+
+
+def fixed_zipinfo(name, date_time):
+    info = zipfile.ZipInfo(name, date_time)
+    info.create_system = 3
+    info.external_attr = 0o600 << 16
+    return info
+
+
+def normalize_core_properties(core_xml, date_str):
+    """Pin created/modified to date_str, revision to 1, and drop lastPrinted."""
+    stamp = f'{date_str}T00:00:00Z'.encode('ascii')
+    core_xml = _CORE_TIMESTAMP.sub(lambda m: m.group(1) + stamp + m.group(3), core_xml)
+    core_xml = _CORE_REVISION.sub(b'<cp:revision>1</cp:revision>', core_xml)
+    return _CORE_LAST_PRINTED.sub(b'', core_xml)
+
+
+def normalize_docx(docx_bytes, date_str):
+    """Re-pack a saved .docx with fixed entry timestamps and core properties.
+
+    Entry order and compression are kept; the result is a pure function of
+    the document content and date_str.
+    """
+    date_time = zip_date_time(date_str)
+    out = BytesIO()
+    with zipfile.ZipFile(BytesIO(docx_bytes)) as src, zipfile.ZipFile(out, 'w') as dst:
+        for info in src.infolist():
+            content = src.read(info)
+            if info.filename == 'docProps/core.xml':
+                content = normalize_core_properties(content, date_str)
+            dst.writestr(fixed_zipinfo(info.filename, date_time), content,
+                         info.compress_type, 6)
+    return out.getvalue()
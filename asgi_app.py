@@ -0,0 +1,199 @@
+"""ASGI application serving the document generators.
+
+Exposes the same /api/<endpoint> routes as Vercel and local_server.py, for
+any ASGI server:
+
+    uvicorn asgi_app:app
+
+Rendering is CPU-bound python-docx work, so the event loop never runs a
+handler itself. Each request is handed to a bounded process pool, where the
+endpoint's unchanged handler class runs against an in-memory connection and
+its raw HTTP response is parsed back. When every worker is busy and the
+wait queue is full, new requests get 503 with Retry-After instead of piling
+up behind one slow render.
+
+Each pool worker fetches the Google Drive templates at startup, concurrently
+on threads, so renders do not block on a download. The generators use
+requests, which has no async API, and the fetch runs in the workers because
+their template caches are per process.
+
+Configuration (environment): ASGI_WORKERS (default: one per core) and
+ASGI_QUEUE_DEPTH (requests allowed to wait per worker, default 2).
+"""
+import asyncio
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import local_server
+
+# Response headers the ASGI server supplies itself
+_SERVER_HEADERS = {'server', 'date'}
+# Request headers rewritten for the buffered body
+_HOP_HEADERS = {'content-length', 'transfer-encoding', 'connection'}
+
+_worker_routes = None
+
+
+class _BufferConnection:
+    """Socket stand-in: serves one buffered request, collects the response."""
+
+    def __init__(self, raw_request):
+        self._request = raw_request
+        self._response = io.BytesIO()
+
+    def makefile(self, mode, buffering=None):
+        return io.BytesIO(self._request)
+
+    def sendall(self, data):
+        self._response.write(data)
+
+    def getvalue(self):
+        return self._response.getvalue()
+
+
+def _init_worker(warm_drive):
+    """Pool initializer: import the endpoints and warm the template caches."""
+    global _worker_routes
+    _worker_routes = {}
+    for path, handler in local_server.load_routes().items():
+        # Subclass only to silence per-request stderr logging
+        _worker_routes[path] = type(handler.__name__, (handler,),
+                                    {'log_message': lambda self, *args: None})
+    for warning in local_server.warm_caches(_worker_routes, warm_drive):
+        print(f'[asgi] warm-up skipped {warning}', file=sys.stderr, flush=True)
+
+
+def render_request(path, method, target, headers, body):
+    """Run one request through its endpoint handler (in a pool worker).
+
+    Returns (status, [(name, value), ...], body) parsed from the raw response.
+    """
+    lines = [f'{method} {target} HTTP/1.0']
+    lines.extend(f'{name}: {value}' for name, value in headers
+                 if name.lower() not in _HOP_HEADERS)
+    lines.append(f'Content-Length: {len(body)}')
+    raw_request = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+    connection = _BufferConnection(raw_request)
+    _worker_routes[path](connection, ('asgi', 0), None)
+    return parse_response(connection.getvalue())
+
+
+def parse_response(raw):
+    """Split a raw HTTP/1.x response into (status, headers, body)."""
+    head, _, body = raw.partition(b'\r\n\r\n')
+    status_line, *header_lines = head.decode('latin-1').split('\r\n')
+    status = int(status_line.split()[1])
+    headers = []
+    for line in header_lines:
+        name, _, value = line.partition(':')
+        if name.lower() not in _SERVER_HEADERS:
+            headers.append((name, value.strip()))
+    return status, headers, body
+
+
+class GeneratorApp:
+    """ASGI callable dispatching /api/<endpoint> requests to a process pool."""
+
+    def __init__(self, workers=None, queue_depth=None, warm_drive=True):
+        self.workers = workers or int(os.environ.get('ASGI_WORKERS', 0)) or os.cpu_count() or 1
+        depth = queue_depth if queue_depth is not None else int(os.environ.get('ASGI_QUEUE_DEPTH', 2))
+        self.capacity = self.workers * (1 + depth)
+        self.warm_drive = warm_drive
+        self.routes = set(local_server.load_routes())
+        self.pool = None
+        self.in_flight = 0
+
+    def start(self):
+        if self.pool is None:
+            # Set before the pool starts so every worker inherits it
+            local_server.enable_async_jobs()
+            local_server.ensure_template_artifacts()
+            self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            initargs=(self.warm_drive,))
+
+    def stop(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await asyncio.get_running_loop().run_in_executor(None, self.stop)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _http(self, scope, receive, send):
+        body = b''
+        more = True
+        while more:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body += message.get('body', b'')
+            more = message.get('more_body', False)
+
+        path = scope['path'].rstrip('/')
+        if path not in self.routes:
+            await _respond(send, *_error(404, 'Not found'))
+            return
+        if self.in_flight >= self.capacity:
+            status, headers, content = _error(503, 'Server busy, retry shortly')
+            await _respond(send, status, headers + [('Retry-After', '1')], content)
+            return
+
+        query = scope.get('query_string', b'').decode('latin-1')
+        target = f'{path}?{query}' if query else path
+        headers = [(name.decode('latin-1'), value.decode('latin-1'))
+                   for name, value in scope.get('headers', [])]
+
+        self.start()
+        pool = self.pool
+        self.in_flight += 1
+        try:
+            status, response_headers, content = await asyncio.get_running_loop().run_in_executor(
+                pool, render_request, path, scope['method'], target, headers, body)
+        except BrokenProcessPool:
+            # Release the dead pool's manager thread and surviving workers;
+            # requests failing on it concurrently must not drop its successor.
+            pool.shutdown(wait=False, cancel_futures=True)
+            if self.pool is pool:
+                self.pool = None
+            status, response_headers, content = _error(500, 'Render worker crashed')
+        except Exception as e:
+            status, response_headers, content = _error(500, str(e))
+        finally:
+            self.in_flight -= 1
+        await _respond(send, status, response_headers, content)
+
+
+def _error(status, message):
+    return status, [('Content-Type', 'application/json')], json.dumps({'error': message}).encode()
+
+
+async def _respond(send, status, headers, body):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in headers],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+app = GeneratorApp()
@@ -0,0 +1,119 @@
+"""Load-test local_server.py: package throughput against the number of workers.
+
+For each worker count, starts the server as a subprocess, drives it with
+concurrent clients POSTing the same opening package (rendered every time,
+no render cache), and reports requests per second, latency and the speedup
+over one worker. Throughput should grow with the worker count up to the
+number of cores:
+
+    python benchmarks/local_server_load.py [--workers 1 2 4] [--clients 8]
+                                           [--requests 64]
+"""
+import argparse
+import json
+import os
+import re
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'api'))
+sys.path.insert(0, ROOT)
+
+from tests.test_probate_opening import SAMPLE_INTESTATE_DATA
+
+ENDPOINT = '/api/generate-probate-opening'
+_LISTENING = re.compile(r'listening on (http://\S+)')
+
+
+def start_server(workers):
+    """Start local_server.py on a free port; return (process, base URL)."""
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'local_server.py'), '--port', '0',
+         '--workers', str(workers), '--no-drive-warm'],
+        cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    for line in process.stdout:
+        match = _LISTENING.search(line)
+        if match:
+            # Keep draining output so the server never blocks on a full pipe
+            threading.Thread(target=process.stdout.read, daemon=True).start()
+            return process, match.group(1)
+    raise RuntimeError(f'local_server.py exited with status {process.wait()}')
+
+
+def stop_server(process):
+    process.send_signal(signal.SIGTERM)
+    process.wait(timeout=60)
+
+
+def post(base, body):
+    request = urllib.request.Request(base + ENDPOINT, data=body,
+                                     headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=120) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def drive(base, clients, requests):
+    """Send requests POSTs from clients threads; return (seconds, latencies)."""
+    body = json.dumps(SAMPLE_INTESTATE_DATA).encode()
+    post(base, body)  # warm-up, not timed
+    remaining = iter(range(requests))
+    lock = threading.Lock()
+    latencies = []
+
+    def client():
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            latency = post(base, body)
+            with lock:
+                latencies.append(latency)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, latencies
+
+
+def main(argv=None):
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, cores} & set(range(1, cores + 1))),
+                        help='worker counts to compare (default: 1, 2, 4 and one per core)')
+    parser.add_argument('--clients', type=int, default=2 * cores,
+                        help='concurrent clients (default: two per core)')
+    parser.add_argument('--requests', type=int, default=64, help='requests per worker count')
+    args = parser.parse_args(argv)
+
+    print(f'{cores} cores, {args.clients} clients, {args.requests} requests per run')
+    print(f'{"workers":>8}{"req/s":>10}{"p50 ms":>10}{"p95 ms":>10}{"speedup":>10}')
+    baseline = None
+    for workers in args.workers:
+        process, base = start_server(workers)
+        try:
+            elapsed, latencies = drive(base, args.clients, args.requests)
+        finally:
+            stop_server(process)
+        throughput = len(latencies) / elapsed
+        baseline = baseline or throughput
+        latencies.sort()
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f'{workers:>8}{throughput:>10.1f}{statistics.median(latencies) * 1000:>10.0f}'
+              f'{p95 * 1000:>10.0f}{throughput / baseline:>9.2f}x')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""Benchmark first-request latency with and without compiled template artifacts.
+
+Each sample is a fresh interpreter, as on a cold function instance. It
+times the first opening package render and the first closing package
+render, then a full load of all 28 templates. Stores compared:
+
+    directory   .docx files read and inflated on first use (no build step)
+    pack        memory-mapped pack of the original .docx files
+    compiled    precompiled artifacts (see api/compiled_templates.py)
+
+    python benchmarks/template_artifacts.py [--samples 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'api'))
+
+SAMPLE = r'''
+import json, sys, time
+sys.path.insert(0, 'api')
+import probate_utils, template_store
+from tests.test_probate_opening import SAMPLE_INTESTATE_DATA, generate_opening_package
+from tests.test_probate_closing import SAMPLE_MULTI_HEIR_TESTATE, generate_probate_closing
+
+kind, path = sys.argv[1], sys.argv[2]
+if kind == 'directory':
+    store = template_store.DirectoryTemplateStore(probate_utils.TEMPLATE_DIR)
+elif kind == 'pack':
+    store = template_store.PackedTemplateStore(path)
+else:
+    store = template_store.CompiledTemplateStore(path)
+probate_utils._template_store = store
+
+timings = {}
+start = time.perf_counter()
+generate_opening_package(SAMPLE_INTESTATE_DATA)
+timings['first opening'] = time.perf_counter() - start
+start = time.perf_counter()
+generate_probate_closing.generate_closing_package(SAMPLE_MULTI_HEIR_TESTATE)
+timings['first closing'] = time.perf_counter() - start
+start = time.perf_counter()
+for name in store.names():
+    probate_utils.load_template(name)
+timings['load all'] = time.perf_counter() - start
+print(json.dumps(timings))
+'''
+
+
+def sample(kind, path):
+    result = subprocess.run([sys.executable, '-c', SAMPLE, kind, path], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--samples', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    from compiled_templates import build_artifacts
+    from probate_utils import TEMPLATE_DIR
+    from template_store import build_pack
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {'directory': '', 'pack': os.path.join(tmp, 'templates.pack'),
+                 'compiled': os.path.join(tmp, 'templates.compiled.pack')}
+        build_pack(TEMPLATE_DIR, paths['pack'])
+        build_artifacts(TEMPLATE_DIR, paths['compiled'])
+
+        print(f'median of {args.samples} cold processes, ms')
+        print(f'  {"store":<11}{"first opening":>15}{"first closing":>15}{"load all":>10}{"size KiB":>10}')
+        for kind, path in paths.items():
+            runs = [sample(kind, path) for _ in range(args.samples)]
+            medians = {key: statistics.median(run[key] for run in runs) * 1000 for key in runs[0]}
+            size = (os.path.getsize(path) if path else
+                    sum(os.path.getsize(os.path.join(TEMPLATE_DIR, n)) for n in os.listdir(TEMPLATE_DIR)))
+            print(f'  {kind:<11}{medians["first opening"]:>15.1f}{medians["first closing"]:>15.1f}'
+                  f'{medians["load all"]:>10.1f}{size / 1024:>10.0f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
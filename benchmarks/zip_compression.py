@@ -0,0 +1,75 @@
+"""Benchmark ZIP compression policies for probate packages.
+
+Renders representative opening and closing packages once, then times
+build_zip under each compression policy and reports CPU time against
+bundle size:
+
+    python benchmarks/zip_compression.py [--heirs 40] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'api'))
+sys.path.insert(0, ROOT)
+
+from docx import Document
+from io import BytesIO
+from probate_utils import build_zip
+from tests.test_probate_opening import SAMPLE_INTESTATE_DATA, generate_probate_opening
+from tests.test_probate_closing import SAMPLE_MULTI_HEIR_TESTATE, generate_probate_closing
+
+POLICIES = [('deflate', 6), ('deflate', 1), ('deflate', 9), ('stored', None), ('auto', 6)]
+
+
+def closing_payload(heirs):
+    template = SAMPLE_MULTI_HEIR_TESTATE['heirs']
+    return dict(SAMPLE_MULTI_HEIR_TESTATE, heirs=[
+        dict(template[i % len(template)], heir_full_name=f'Heir Number {i}')
+        for i in range(heirs)])
+
+
+def rendered_documents(module, plan_name, data):
+    """Render a package plan once; return [(title, docx bytes)]."""
+    from probate_utils import render_plan
+    documents = []
+    for title, doc in render_plan(getattr(module, plan_name)(data)):
+        buffer = BytesIO()
+        doc.save(buffer)
+        documents.append((title, buffer.getvalue()))
+    return documents
+
+
+def bench(label, documents, repeat):
+    raw = sum(len(content) for _, content in documents)
+    print(f'\n{label}: {len(documents)} documents, {raw / 1024:.0f} KiB of .docx')
+    print(f'  {"policy":<12}{"cpu ms":>10}{"bytes":>12}{"vs raw":>9}')
+    for policy, level in POLICIES:
+        start = time.process_time()
+        for _ in range(repeat):
+            size = len(build_zip(documents, '2026-04-10', compression=policy,
+                                 compresslevel=level).getvalue())
+        cpu_ms = (time.process_time() - start) / repeat * 1000
+        name = policy if level is None or policy == 'auto' else f'{policy}:{level}'
+        print(f'  {name:<12}{cpu_ms:>10.1f}{size:>12,}{size / raw:>9.1%}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--heirs', type=int, default=40, help='heirs in the large closing package')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    bench('Opening package (intestate)',
+          rendered_documents(generate_probate_opening, 'plan_opening_package',
+                             SAMPLE_INTESTATE_DATA), args.repeat)
+    bench(f'Closing package ({args.heirs} heirs)',
+          rendered_documents(generate_probate_closing, 'plan_closing_package',
+                             closing_payload(args.heirs)), args.repeat)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
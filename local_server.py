@@ -0,0 +1,346 @@
+"""Standalone multi-process server for the document generators.
+
+Runs the same handler classes Vercel serves from api/, for bulk work on an
+internal machine:
+
+    python local_server.py --port 8000 --workers 4
+
+The parent process imports every endpoint, warms the template caches and
+binds the listening socket, then forks the workers; parsed modules and
+cached templates are shared copy-on-write. Each worker accepts on the shared
+socket and serves requests on threads.
+
+Signals (sent to the parent):
+    SIGHUP           graceful reload: re-import endpoints, re-warm, start a
+                     new set of workers, then let the old ones finish their
+                     in-flight requests and exit
+    SIGTERM, SIGINT  graceful shutdown
+
+Routes are /api/<endpoint> as on Vercel, e.g. /api/generate-probate-opening.
+Unlike on Vercel, {"async": true} probate requests are accepted: jobs run on
+worker threads and are stored in the machine's shared job directory.
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api')
+sys.path.insert(0, API_DIR)
+
+from job_store import enable_async_jobs
+
+DRIVE_GENERATORS = ('generate-will', 'generate-poa', 'generate-hcpoa', 'generate-acp')
+# Seconds a worker waits for a connection's request line before routing it
+PEEK_TIMEOUT = 2.0
+# A worker that exits within STABLE_UPTIME seconds of starting is restarted
+# after RESTART_DELAY, doubling per consecutive crash up to RESTART_DELAY_MAX.
+STABLE_UPTIME = 10.0
+RESTART_DELAY = 0.5
+RESTART_DELAY_MAX = 30.0
+
+
+class NotFoundHandler(BaseHTTPRequestHandler):
+    def _not_found(self):
+        self.send_response(404)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(b'{"error": "Not found"}')
+
+    do_GET = do_POST = do_OPTIONS = _not_found
+
+
+def load_routes(api_dir=API_DIR, fresh=False):
+    """Import every api/*.py that defines a handler; return {path: handler class}.
+
+    With fresh=True, shared api modules already imported (probate_utils, ...)
+    are dropped first so edited code is picked up on reload.
+    """
+    if fresh:
+        for name, module in list(sys.modules.items()):
+            module_file = getattr(module, '__file__', None) or ''
+            if os.path.dirname(os.path.abspath(module_file)) == api_dir:
+                del sys.modules[name]
+    routes = {}
+    for filename in sorted(os.listdir(api_dir)):
+        if not filename.endswith('.py'):
+            continue
+        endpoint = filename[:-3]
+        spec = importlib.util.spec_from_file_location(
+            f'endpoint_{endpoint.replace("-", "_")}', os.path.join(api_dir, filename))
+        module = importlib.util.module_from_spec(spec)
+        with contextlib.redirect_stdout(io.StringIO()):
+            spec.loader.exec_module(module)
+        if isinstance(getattr(module, 'handler', None), type):
+            handler = module.handler
+            handler.endpoint_module = module
+            routes[f'/api/{endpoint}'] = handler
+    return routes
+
+
+def ensure_template_artifacts():
+    """Build the compiled template artifacts, else the template pack, if stale.
+
+    Workers then map one file instead of each buffering the templates.
+    """
+    from compiled_templates import ensure_artifacts
+    from template_store import ensure_pack
+    return ensure_artifacts() or ensure_pack()
+
+
+def warm_caches(routes, drive=True):
+    """Fill template caches before forking so workers share them.
+
+    Drive templates are fetched concurrently on threads that are joined
+    before returning. Returns a list of warnings for Drive templates that
+    could not be fetched (those generators then download on first use).
+    """
+    import probate_utils
+    probate_utils.warm_template_pool()
+    if not drive:
+        return []
+
+    def fetch(endpoint):
+        module = routes[f'/api/{endpoint}'].endpoint_module
+        key = endpoint.split('-', 1)[1]
+        try:
+            module.download_template(module.TEMPLATE_URLS[key])
+        except Exception as e:
+            return f'{endpoint}: {e}'
+        return None
+
+    endpoints = [e for e in DRIVE_GENERATORS if f'/api/{e}' in routes]
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=len(endpoints) or 1) as pool:
+            results = list(pool.map(fetch, endpoints))
+    return [warning for warning in results if warning]
+
+
+def _peek_path(request, timeout=PEEK_TIMEOUT):
+    """Return the request path from the request line without consuming it.
+
+    Peeks until the whole line has arrived, the client closes, the peek
+    buffer is full or timeout seconds pass; a request line that is still
+    incomplete by then is routed as not found.
+    """
+    deadline = time.monotonic() + timeout
+    previous_timeout = request.gettimeout()
+    data = b''
+    try:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return ''
+            request.settimeout(remaining)
+            seen = len(data)
+            data = request.recv(8192, socket.MSG_PEEK)
+            if b'\n' in data or not data or len(data) == 8192:
+                break
+            if len(data) == seen:
+                # Peeking returns the buffered bytes at once; wait for more
+                time.sleep(0.005)
+    except (socket.timeout, OSError):
+        return ''
+    finally:
+        request.settimeout(previous_timeout)
+    parts = data.split(b'\n', 1)[0].split()
+    if len(parts) < 2:
+        return ''
+    return parts[1].decode('latin-1').split('?', 1)[0].rstrip('/')
+
+
+class GeneratorServer(ThreadingHTTPServer):
+    """Threaded server that dispatches each connection to its endpoint's handler.
+
+    The handlers speak HTTP/1.0 (one request per connection), so the route is
+    chosen by peeking at the request line before the handler reads it.
+    """
+
+    daemon_threads = False
+    block_on_close = True
+
+    def __init__(self, address, routes, bind_and_activate=True):
+        self.routes = routes
+        super().__init__(address, NotFoundHandler, bind_and_activate)
+
+    def finish_request(self, request, client_address):
+        handler = self.routes.get(_peek_path(request), NotFoundHandler)
+        handler(request, client_address, self)
+
+
+def serve_worker(server):
+    """Serve until SIGTERM, then finish in-flight requests and exit.
+
+    Background threads the endpoints started (async probate jobs) are joined
+    too, so a reload never abandons a half-rendered job.
+    """
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown).start()
+
+    # Workers share one listening socket; a worker that loses the race for a
+    # connection must not block in accept().
+    server.socket.setblocking(False)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        for thread in threading.enumerate():
+            if thread is not threading.current_thread() and not thread.daemon:
+                thread.join()
+
+
+class Supervisor:
+    """Pre-forks workers on one listening socket and restarts them as needed."""
+
+    def __init__(self, host, port, workers, warm_drive=True):
+        self.workers = max(1, workers)
+        self.warm_drive = warm_drive
+        self.routes = load_routes()
+        self.listener = GeneratorServer((host, port), self.routes)
+        self.address = self.listener.server_address
+        self.children = set()
+        self.retiring = set()
+        self._started = {}
+        self._crashes = 0
+        self._restarts = []
+        self._reload = False
+        self._stop = False
+
+    def _fork_worker(self):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                serve_worker(self.listener)
+            except BaseException:
+                code = 1
+            finally:
+                os._exit(code)
+        self.children.add(pid)
+        self._started[pid] = time.monotonic()
+
+    def _signal_all(self, pids, signum):
+        for pid in pids:
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(pid, signum)
+
+    def _start_generation(self):
+        for warning in warm_caches(self.routes, self.warm_drive):
+            print(f'[server] warm-up skipped {warning}', flush=True)
+        for _ in range(self.workers):
+            self._fork_worker()
+
+    def reload(self):
+        """Re-import endpoints and replace the workers without dropping the socket."""
+        old = set(self.children)
+        self.routes = load_routes(fresh=True)
+        self.listener.routes = self.routes
+        self.children = set()
+        # The new generation replaces crashed workers too
+        self._restarts = []
+        self._crashes = 0
+        self._start_generation()
+        self._signal_all(old, signal.SIGTERM)
+        self.retiring |= old
+
+    def _reap(self):
+        """Collect exited workers; schedule replacements for any that died unexpectedly.
+
+        A worker that keeps crashing at startup is restarted with
+        exponential backoff instead of being re-forked in a tight loop.
+        """
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            now = time.monotonic()
+            uptime = now - self._started.pop(pid, now)
+            if pid in self.retiring:
+                self.retiring.discard(pid)
+            elif pid in self.children:
+                self.children.discard(pid)
+                if self._stop:
+                    continue
+                self._crashes = self._crashes + 1 if uptime < STABLE_UPTIME else 0
+                delay = (min(RESTART_DELAY * 2 ** (self._crashes - 1), RESTART_DELAY_MAX)
+                         if self._crashes else 0)
+                if delay:
+                    print(f'[server] worker {pid} exited with status {status}, '
+                          f'restarting in {delay:g}s', flush=True)
+                self._restarts.append(now + delay)
+
+    def _restart_due(self):
+        """Fork the replacement workers whose restart delay has passed."""
+        now = time.monotonic()
+        due = [at for at in self._restarts if at <= now]
+        self._restarts = [at for at in self._restarts if at > now]
+        for _ in due:
+            self._fork_worker()
+
+    def run(self):
+        signal.signal(signal.SIGHUP, lambda *_: setattr(self, '_reload', True))
+        signal.signal(signal.SIGTERM, lambda *_: setattr(self, '_stop', True))
+        signal.signal(signal.SIGINT, lambda *_: setattr(self, '_stop', True))
+        self._start_generation()
+        host, port = self.address[:2]
+        print(f'[server] listening on http://{host}:{port} with {self.workers} workers',
+              flush=True)
+
+        while not self._stop:
+            if self._reload:
+                self._reload = False
+                self.reload()
+                print(f'[server] reloaded, workers {sorted(self.children)}', flush=True)
+            self._reap()
+            self._restart_due()
+            time.sleep(0.2)
+
+        self._signal_all(self.children | self.retiring, signal.SIGTERM)
+        for pid in self.children | self.retiring:
+            with contextlib.suppress(ChildProcessError):
+                os.waitpid(pid, 0)
+        self.listener.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the document generators locally.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='worker processes (default: one per core)')
+    parser.add_argument('--no-drive-warm', action='store_true',
+                        help='do not prefetch the Google Drive templates at startup')
+    args = parser.parse_args(argv)
+    # Workers live as long as the server, so background jobs can finish
+    enable_async_jobs()
+    ensure_template_artifacts()
+
+    if not hasattr(os, 'fork'):
+        routes = load_routes()
+        warm_caches(routes, not args.no_drive_warm)
+        server = GeneratorServer((args.host, args.port), routes)
+        print(f'[server] listening on http://{args.host}:{server.server_address[1]}', flush=True)
+        serve_worker(server)
+        return 0
+
+    Supervisor(args.host, args.port, args.workers, not args.no_drive_warm).run()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,109 @@
+# tests/test_asgi_app.py
+import pytest
+import sys
+import os
+import io
+import json
+import asyncio
+import zipfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api'))
+import asgi_app
+from job_store import ASYNC_JOBS_ENV
+from tests.test_probate_opening import SAMPLE_TESTATE_DATA
+
+
+def call(app, method, path, body=b'', query=b''):
+    """Drive the ASGI app for one request; return (status, headers, body)."""
+    async def run():
+        sent = []
+        chunks = [{'type': 'http.request', 'body': body, 'more_body': False}]
+
+        async def receive():
+            return chunks.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {'type': 'http', 'method': method, 'path': path, 'query_string': query,
+                 'headers': [(b'content-type', b'application/json')]}
+        await app(scope, receive, send)
+        start, content = sent[0], sent[1]
+        return start['status'], dict(start['headers']), content['body']
+    return asyncio.run(run())
+
+
+@pytest.fixture(scope='module')
+def app():
+    app = asgi_app.GeneratorApp(workers=1, queue_depth=0, warm_drive=False)
+    yield app
+    app.stop()
+    # start() opts the process in to async jobs; keep that out of other tests
+    os.environ.pop(ASYNC_JOBS_ENV, None)
+
+
+class TestParseResponse:
+    def test_parses_status_headers_body(self):
+        raw = b'HTTP/1.0 202 Accepted\r\nServer: x\r\nContent-Type: application/json\r\n\r\n{}'
+        status, headers, body = asgi_app.parse_response(raw)
+        assert status == 202
+        assert headers == [('Content-Type', 'application/json')]
+        assert body == b'{}'
+
+
+class TestGeneratorApp:
+    def test_unknown_route(self, app):
+        assert call(app, 'GET', '/api/nope')[0] == 404
+
+    def test_bulk_deadlines_with_query(self, app):
+        body = json.dumps([{'matter': 'A', 'dod': '2026-04-10'}]).encode()
+        status, headers, content = call(app, 'POST', '/api/probate-deadlines-bulk',
+                                        body, b'format=ndjson')
+        assert status == 200
+        assert headers[b'content-type'] == b'application/x-ndjson'
+        assert json.loads(content.splitlines()[0])['matter'] == 'A'
+
+    def test_renders_probate_package_in_pool(self, app):
+        status, headers, content = call(app, 'POST', '/api/generate-probate-opening',
+                                        json.dumps(SAMPLE_TESTATE_DATA).encode())
+        assert status == 200
+        assert b'x-residual-placeholders' in headers
+        assert len(zipfile.ZipFile(io.BytesIO(content)).namelist()) == 3
+
+    def test_backpressure_when_saturated(self, app):
+        app.in_flight = app.capacity
+        try:
+            status, headers, _ = call(app, 'POST', '/api/generate-probate-opening', b'{}')
+        finally:
+            app.in_flight = 0
+        assert status == 503
+        assert headers[b'retry-after'] == b'1'
+
+    def test_broken_pool_shut_down_and_replaced(self):
+        class BrokenPool:
+            def submit(self, *args):
+                raise asgi_app.BrokenProcessPool('worker died')
+
+            def shutdown(self, **kwargs):
+                self.shutdown_with = kwargs
+
+        app = asgi_app.GeneratorApp(workers=1, warm_drive=False)
+        app.pool = broken = BrokenPool()
+        status, _, content = call(app, 'POST', '/api/generate-probate-opening', b'{}')
+        assert status == 500 and b'crashed' in content
+        assert broken.shutdown_with == {'wait': False, 'cancel_futures': True}
+        assert app.pool is None
+
+    def test_lifespan(self):
+        app = asgi_app.GeneratorApp(workers=1, warm_drive=False)
+        messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(app({'type': 'lifespan'}, receive, send))
+        assert sent == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+        assert app.pool is None
@@ -0,0 +1,232 @@
+# tests/test_cache_backend.py
+import pytest
+import sys
+import os
+import socketserver
+import threading
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api'))
+import cache_backend
+from cache_backend import (CacheBackend, MemoryCacheBackend, RedisCacheBackend, CacheError,
+                           cache_get, cache_set, cache_key, through_cache, set_cache_backend,
+                           KEY_CLASSES)
+from render_cache import RenderCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    """Just enough of a Redis server for the client: AUTH, SELECT, GET, SET, DEL."""
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        data = self.server.data
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            command = args[0].upper()
+            self.server.commands.append(command)
+            if command == b'AUTH':
+                reply = b'+OK\r\n' if args[-1] == b'secret' else b'-WRONGPASS invalid password\r\n'
+            elif command == b'SELECT':
+                reply = b'+OK\r\n'
+            elif command == b'GET':
+                value = data.get(args[1])
+                reply = b'$-1\r\n' if value is None else b'$%d\r\n%s\r\n' % (len(value), value)
+            elif command == b'SET':
+                data[args[1]] = args[2]
+                self.server.ttls[args[1]] = int(args[4]) if len(args) > 4 else None
+                reply = b'+OK\r\n'
+            elif command == b'DEL':
+                reply = b':%d\r\n' % (data.pop(args[1], None) is not None)
+            else:
+                reply = b'-ERR unknown command\r\n'
+            self.wfile.write(reply)
+
+
+@pytest.fixture
+def redis_server():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _RespHandler)
+    server.daemon_threads = True
+    server.data, server.ttls, server.commands = {}, {}, []
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+@pytest.fixture
+def memory_backend(monkeypatch):
+    backend = MemoryCacheBackend()
+    monkeypatch.setattr(cache_backend, '_cache_backend', backend)
+    monkeypatch.setattr(cache_backend, '_configured', True)
+    return backend
+
+
+class TestMemoryCacheBackend:
+    def test_incomplete_backend_rejected(self):
+        class Partial(CacheBackend):
+            def get(self, key):
+                return None
+        with pytest.raises(TypeError):
+            Partial()
+
+    def test_ttl_expiry(self):
+        clock = _Clock()
+        backend = MemoryCacheBackend(clock=clock)
+        backend.set('k', b'v', ttl=10)
+        assert backend.get('k') == b'v'
+        clock.now += 11
+        assert backend.get('k') is None
+        assert backend.size == 0
+
+    def test_lru_bound(self):
+        backend = MemoryCacheBackend(max_bytes=8)
+        backend.set('a', b'1234')
+        backend.set('b', b'1234')
+        backend.get('a')
+        backend.set('c', b'1234')
+        assert backend.get('b') is None
+        assert backend.get('a') == b'1234'
+
+    def test_delete(self):
+        backend = MemoryCacheBackend()
+        backend.set('a', b'1')
+        backend.delete('a')
+        backend.delete('a')
+        assert backend.get('a') is None
+
+
+class TestRedisCacheBackend:
+    def test_round_trip_with_ttl(self, redis_server):
+        client = RedisCacheBackend('127.0.0.1', redis_server.server_address[1])
+        assert client.get('k') is None
+        client.set('k', b'\x00binary\r\nvalue', ttl=60)
+        assert client.get('k') == b'\x00binary\r\nvalue'
+        assert redis_server.ttls[b'k'] == 60
+        client.delete('k')
+        assert client.get('k') is None
+
+    def test_from_url_authenticates_and_selects(self, redis_server):
+        port = redis_server.server_address[1]
+        client = RedisCacheBackend.from_url(f'redis://:secret@127.0.0.1:{port}/2')
+        client.set('k', b'v')
+        assert redis_server.commands[:3] == [b'AUTH', b'SELECT', b'SET']
+
+    def test_server_error_raises(self, redis_server):
+        port = redis_server.server_address[1]
+        client = RedisCacheBackend.from_url(f'redis://:wrong@127.0.0.1:{port}')
+        with pytest.raises(CacheError, match='WRONGPASS'):
+            client.get('k')
+
+    def test_unreachable_server_raises_cache_error(self):
+        client = RedisCacheBackend('127.0.0.1', 1, timeout=0.2)
+        with pytest.raises(CacheError):
+            client.get('k')
+
+    def test_threads_get_their_own_connections(self, redis_server):
+        client = RedisCacheBackend('127.0.0.1', redis_server.server_address[1])
+        first, second = client._checkout(), client._checkout()
+        assert first is not second
+        client._checkin(first)
+        client._checkin(second)
+        assert client._checkout() in (first, second)
+        client.close()
+
+    def test_backs_off_after_connection_failure(self, monkeypatch):
+        clock = _Clock()
+        attempts = []
+
+        def refuse(address, timeout):
+            attempts.append(clock.now)
+            raise ConnectionRefusedError('refused')
+        monkeypatch.setattr(cache_backend.socket, 'create_connection', refuse)
+        client = RedisCacheBackend('127.0.0.1', 1, retry_delay=1.0, clock=clock)
+        for step in (0, 0.5, 0.6, 1.0, 2.1):
+            clock.now += step
+            with pytest.raises(CacheError):
+                client.get('k')
+        # Retried once the first second passed, then not for two more
+        assert attempts == pytest.approx([1000.0, 1001.1, 1004.2])
+
+    def test_rediss_wraps_socket_in_tls(self, redis_server, monkeypatch):
+        wrapped = []
+
+        class Context:
+            def wrap_socket(self, sock, server_hostname):
+                wrapped.append(server_hostname)
+                return sock
+        monkeypatch.setattr(cache_backend.ssl, 'create_default_context', Context)
+        port = redis_server.server_address[1]
+        client = RedisCacheBackend.from_url(f'rediss://:secret@127.0.0.1:{port}')
+        assert client.tls
+        client.set('k', b'v')
+        assert client.get('k') == b'v'
+        assert wrapped == ['127.0.0.1']
+
+
+class TestKeyClasses:
+    def test_values_over_the_cap_are_not_shared(self, memory_backend):
+        cap = KEY_CLASSES['template'].max_bytes
+        assert cache_set('template', 'big', b'x' * (cap + 1)) is False
+        assert cache_get('template', 'big') is None
+
+    def test_key_classes_do_not_collide(self, memory_backend):
+        cache_set('template', 'k', b'template')
+        cache_set('render', 'k', b'render')
+        assert cache_get('template', 'k') == b'template'
+        assert cache_key('template', 'k') != cache_key('render', 'k')
+
+    def test_no_backend_is_a_miss(self, monkeypatch):
+        monkeypatch.setattr(cache_backend, '_cache_backend', None)
+        monkeypatch.setattr(cache_backend, '_configured', True)
+        assert cache_set('render', 'k', b'v') is False
+        assert cache_get('render', 'k') is None
+
+    def test_backend_errors_are_misses(self, monkeypatch):
+        monkeypatch.setattr(cache_backend, '_configured', True)
+        monkeypatch.setattr(cache_backend, '_cache_backend',
+                            RedisCacheBackend('127.0.0.1', 1, timeout=0.2))
+        fetch = through_cache('template', lambda url: b'downloaded')
+        assert fetch('https://drive.example/t.docx') == b'downloaded'
+
+
+class TestSharedTiers:
+    def test_second_instance_skips_the_download(self, memory_backend):
+        downloads = []
+        fetch = through_cache('template', lambda url: downloads.append(url) or b'PK')
+        assert fetch('https://drive.example/t.docx') == b'PK'
+        assert fetch('https://drive.example/t.docx') == b'PK'
+        assert downloads == ['https://drive.example/t.docx']
+
+    def test_render_cache_shares_results(self, memory_backend):
+        RenderCache().put('"tag"', b'zip bytes', 'application/zip', 'a.zip', [('X-A', '1')])
+        entry = RenderCache().get('"tag"')
+        assert entry.content == b'zip bytes'
+        assert entry.filename == 'a.zip'
+        assert entry.headers == (('X-A', '1'),)
+
+
+def test_set_cache_backend(monkeypatch):
+    monkeypatch.setattr(cache_backend, '_cache_backend', None)
+    monkeypatch.setattr(cache_backend, '_configured', False)
+    backend = MemoryCacheBackend()
+    set_cache_backend(backend)
+    assert cache_backend.get_cache_backend() is backend
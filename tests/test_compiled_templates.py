@@ -0,0 +1,110 @@
+# tests/test_compiled_templates.py
+import pytest
+import sys
+import os
+import io
+import zipfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api'))
+from docx import Document
+import probate_utils
+from probate_utils import (TEMPLATE_DIR, iter_document_paragraphs, field_dependencies,
+                           COMMON_FIELDS)
+from compiled_templates import compile_template, build_artifacts, ensure_artifacts
+from template_store import (CompiledTemplateStore, DirectoryTemplateStore, open_compiled_store,
+                            store_uncompressed)
+from tests.test_probate_opening import (SAMPLE_TESTATE_DATA, SAMPLE_INTESTATE_DATA,
+                                        generate_opening_package)
+from tests.test_probate_closing import SAMPLE_MULTI_HEIR_TESTATE, generate_probate_closing
+
+OATH = 'Personal Representative Oath CURLY.docx'
+
+
+@pytest.fixture(scope='module')
+def compiled_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('compiled') / 'templates.compiled.pack')
+    build_artifacts(TEMPLATE_DIR, path)
+    return path
+
+
+@pytest.fixture
+def use_store(monkeypatch):
+    def install(store):
+        monkeypatch.setattr(probate_utils, '_template_store', store)
+        field_dependencies.cache_clear()
+    yield install
+    field_dependencies.cache_clear()
+
+
+class TestStoreUncompressed:
+    def test_same_members_all_stored(self):
+        source = DirectoryTemplateStore(TEMPLATE_DIR).read(OATH)
+        stored = zipfile.ZipFile(io.BytesIO(store_uncompressed(source)))
+        original = zipfile.ZipFile(io.BytesIO(source))
+        assert stored.namelist() == original.namelist()
+        assert {info.compress_type for info in stored.infolist()} == {zipfile.ZIP_STORED}
+        for name in original.namelist():
+            assert stored.read(name) == original.read(name)
+
+
+class TestCompileTemplate:
+    def test_runs_are_healed_and_text_kept(self):
+        source = DirectoryTemplateStore(TEMPLATE_DIR).read(OATH)
+        artifact, plan = compile_template(source)
+        original = [p.text for p in iter_document_paragraphs(Document(io.BytesIO(source)))]
+        compiled = list(iter_document_paragraphs(Document(io.BytesIO(artifact))))
+        assert plan['paragraphs'] == original == [p.text for p in compiled]
+        assert all(len([r for r in p.runs if r.text]) <= 1 for p in compiled)
+
+    def test_placeholder_plan(self):
+        _, plan = compile_template(DirectoryTemplateStore(TEMPLATE_DIR).read(OATH))
+        assert plan['placeholders']
+        for token, paragraphs in plan['placeholders'].items():
+            assert all(token in plan['paragraphs'][n] for n in paragraphs)
+
+
+class TestCompiledTemplateStore:
+    def test_holds_every_template(self, compiled_path):
+        store = CompiledTemplateStore(compiled_path)
+        assert store.names() == DirectoryTemplateStore(TEMPLATE_DIR).names()
+        assert len(store) == len(store.names())
+
+    def test_stale_artifacts_are_ignored(self, compiled_path, tmp_path):
+        assert isinstance(open_compiled_store(TEMPLATE_DIR, compiled_path), CompiledTemplateStore)
+        (tmp_path / OATH).write_bytes(b'edited')
+        assert open_compiled_store(str(tmp_path), compiled_path) is None
+        assert open_compiled_store(TEMPLATE_DIR, str(tmp_path / 'missing.pack')) is None
+
+    def test_same_size_edit_is_stale(self, tmp_path):
+        directory = tmp_path / 'templates'
+        directory.mkdir()
+        source = DirectoryTemplateStore(TEMPLATE_DIR).read(OATH)
+        (directory / OATH).write_bytes(source)
+        path = str(tmp_path / 'templates.compiled.pack')
+        assert ensure_artifacts(str(directory), path)
+        assert open_compiled_store(str(directory), path) is not None
+        edited = source.replace(b'word/', b'word\\', 1)
+        assert len(edited) == len(source)
+        (directory / OATH).write_bytes(edited)
+        assert open_compiled_store(str(directory), path) is None
+
+    def test_field_dependencies_from_plan(self, compiled_path, use_store):
+        use_store(DirectoryTemplateStore(TEMPLATE_DIR))
+        parsed = field_dependencies(OATH, COMMON_FIELDS)
+        use_store(CompiledTemplateStore(compiled_path))
+        assert field_dependencies(OATH, COMMON_FIELDS) == parsed
+
+
+class TestRendersAreIdentical:
+    @pytest.mark.parametrize('render', [
+        lambda: generate_opening_package(dict(SAMPLE_TESTATE_DATA, deterministic=True,
+                                              generation_date='2026-04-10')),
+        lambda: generate_opening_package(dict(SAMPLE_INTESTATE_DATA, deterministic=True,
+                                              generation_date='2026-04-10')),
+        lambda: generate_probate_closing.generate_closing_package(
+            dict(SAMPLE_MULTI_HEIR_TESTATE, deterministic=True, generation_date='2026-04-10')),
+    ])
+    def test_package_bytes_match(self, render, compiled_path, use_store):
+        use_store(DirectoryTemplateStore(TEMPLATE_DIR))
+        expected = render().getvalue()
+        use_store(CompiledTemplateStore(compiled_path))
+        assert render().getvalue() == expected
@@ -0,0 +1,65 @@
+# tests/test_court_calendar.py
+import pytest
+import sys
+import os
+from datetime import date
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api'))
+from court_calendar import CourtCalendar, tennessee_holidays, get_court_calendar
+
+
+class TestTennesseeHolidays:
+    def test_2026_holidays(self):
+        holidays = tennessee_holidays(2026)
+        assert date(2026, 1, 1) in holidays
+        assert date(2026, 1, 19) in holidays    # MLK Day
+        assert date(2026, 2, 16) in holidays    # Washington Day
+        assert date(2026, 4, 3) in holidays     # Good Friday
+        assert date(2026, 5, 25) in holidays    # Memorial Day
+        assert date(2026, 9, 7) in holidays     # Labor Day
+        assert date(2026, 10, 12) in holidays   # Columbus Day
+        assert date(2026, 11, 26) in holidays   # Thanksgiving
+        assert date(2026, 12, 25) in holidays
+
+    def test_saturday_holiday_observed_friday(self):
+        # July 4, 2026 is a Saturday
+        assert date(2026, 7, 3) in tennessee_holidays(2026)
+
+    def test_sunday_holiday_observed_monday(self):
+        # November 11, 2029 is a Sunday
+        assert date(2029, 11, 12) in tennessee_holidays(2029)
+
+    def test_good_friday_tracks_easter(self):
+        assert date(2025, 4, 18) in tennessee_holidays(2025)
+        assert date(2027, 3, 26) in tennessee_holidays(2027)
+
+
+class TestCourtCalendar:
+    def test_weekday_open(self):
+        cal = CourtCalendar(2026, 2027)
+        assert not cal.is_closed(date(2026, 4, 14))
+        assert cal.next_open_day(date(2026, 4, 14)) == date(2026, 4, 14)
+
+    def test_weekend_rolls_to_monday(self):
+        cal = CourtCalendar(2026, 2027)
+        assert cal.next_open_day(date(2026, 4, 11)) == date(2026, 4, 13)
+
+    def test_holiday_weekend_rolls_past_holiday(self):
+        cal = CourtCalendar(2026, 2027)
+        # Sat Jan 17 -> Sun -> MLK Day Mon Jan 19 -> Tue Jan 20
+        assert cal.next_open_day(date(2026, 1, 17)) == date(2026, 1, 20)
+
+    def test_thanksgiving_rolls_to_friday(self):
+        cal = CourtCalendar(2026, 2027)
+        assert cal.next_open_day(date(2026, 11, 26)) == date(2026, 11, 27)
+
+    def test_extra_closures(self):
+        cal = CourtCalendar(2026, 2027, extra_closures=[date(2026, 11, 27)])
+        assert cal.next_open_day(date(2026, 11, 26)) == date(2026, 11, 30)
+
+    def test_out_of_range_raises(self):
+        cal = CourtCalendar(2026, 2027)
+        with pytest.raises(ValueError, match='outside the court calendar'):
+            cal.next_open_day(date(2030, 1, 2))
+
+    def test_default_calendar_is_shared(self):
+        assert get_court_calendar() is get_court_calendar()
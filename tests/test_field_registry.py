@@ -0,0 +1,58 @@
+# tests/test_field_registry.py
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api'))
+from field_registry import FieldRegistry, ReplacementMap, as_replacement_map
+from probate_utils import COMMON_FIELDS, build_common_values
+
+REGISTRY = FieldRegistry({
+    'decedent_name': ('{DECEDENT}', '{Decedent Name}', '{decedent name}'),
+    'firm_name': ('Dale, Hutto & Lyle, PLLC',),
+})
+
+
+class TestFieldRegistry:
+    def test_aliases_map_to_canonical_field(self):
+        assert REGISTRY.aliases['{Decedent Name}'] == 'decedent_name'
+        assert REGISTRY.fields == {'decedent_name', 'firm_name'}
+
+    def test_conflicting_spelling_raises(self):
+        with pytest.raises(ValueError, match='maps to both'):
+            FieldRegistry({'a': ('{X}',), 'b': ('{X}',)})
+
+    def test_bind_requires_every_field(self):
+        with pytest.raises(ValueError, match='Missing values'):
+            REGISTRY.bind({'decedent_name': 'John Smith'})
+
+
+class TestReplacementMap:
+    def test_mapping_view_resolves_every_spelling(self):
+        mapping = REGISTRY.bind({'decedent_name': 'John Smith', 'firm_name': 'Muletown Law'})
+        assert mapping['{DECEDENT}'] == 'John Smith'
+        assert mapping['{decedent name}'] == 'John Smith'
+        assert len(mapping) == 4
+        assert dict(mapping)['Dale, Hutto & Lyle, PLLC'] == 'Muletown Law'
+
+    def test_substitute_resolves_tokens_and_literals(self):
+        mapping = REGISTRY.bind({'decedent_name': 'John Smith', 'firm_name': 'Muletown Law'})
+        text = 'Estate of {DECEDENT}, {Decedent Name}. Dale, Hutto & Lyle, PLLC'
+        assert mapping.substitute(text) == 'Estate of John Smith, John Smith. Muletown Law'
+
+    def test_substitute_keeps_unknown_tokens(self):
+        mapping = REGISTRY.bind({'decedent_name': 'John Smith', 'firm_name': ''})
+        assert mapping.substitute('{DECEDENT} {Curly Field}') == 'John Smith {Curly Field}'
+
+    def test_literal_dict_is_wrapped(self):
+        mapping = as_replacement_map({'{A}': 'x', 'plain text': 'y'})
+        assert isinstance(mapping, ReplacementMap)
+        assert mapping.substitute('{A} plain text {B}') == 'x y {B}'
+
+
+class TestCommonFields:
+    def test_canonical_values_cover_registry(self):
+        values = build_common_values({'estate_type': 'Testate', 'pr_gender': 'Male'})
+        assert set(values) == COMMON_FIELDS.fields
+
+    def test_far_fewer_values_than_spellings(self):
+        assert len(COMMON_FIELDS.fields) < len(COMMON_FIELDS.aliases) / 2
@@ -0,0 +1,118 @@
+# tests/test_html_preview.py
+import pytest
+import sys
+import os
+import io
+import contextlib
+import importlib.util
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api'))
+from docx import Document
+import probate_utils
+from field_registry import FieldRegistry
+from html_preview import (docx_outline, element_outline, marked_values, mark_text,
+                          outline_html, text_html, Table, VALUE_START, VALUE_END)
+from tests.test_probate_closing import SAMPLE_MULTI_HEIR_TESTATE, generate_probate_closing
+
+API_DIR = os.path.join(os.path.dirname(__file__), '..', 'api')
+
+
+def _docx_bytes(doc):
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+class TestOutline:
+    def test_paragraphs_tables_and_formatting(self):
+        doc = Document()
+        heading = doc.add_paragraph()
+        heading.alignment = 1
+        heading.add_run('{DECEDENT').bold = True
+        heading.add_run('}')
+        doc.add_table(rows=1, cols=2).rows[0].cells[1].paragraphs[0].add_run('{COUNTY}')
+        outline = docx_outline(_docx_bytes(doc))
+        paragraph, table = outline[0], outline[1]
+        assert paragraph.text == '{DECEDENT}' and paragraph.bold and paragraph.align == 'center'
+        assert isinstance(table, Table) and table.rows[0][1][0].text == '{COUNTY}'
+
+
+class TestMarking:
+    def test_values_and_residuals_marked_and_escaped(self):
+        replacements = marked_values(FieldRegistry.literal({'{A}': 'Smith & Sons'}))
+        html = text_html(replacements.substitute('{A} <owes> {Unknown}'))
+        assert html == ('<mark class="value">Smith &amp; Sons</mark> &lt;owes&gt; '
+                        '<mark class="residual">{Unknown}</mark>')
+
+    def test_empty_value_not_marked(self):
+        assert marked_values({'{A}': ''}) == {'{A}': ''}
+
+    def test_outline_html(self):
+        doc = Document()
+        doc.add_paragraph('Estate of {A}')
+        replacements = marked_values(FieldRegistry.literal({'{A}': 'X'}))
+        html = outline_html(docx_outline(_docx_bytes(doc)), replacements.substitute)
+        assert '<p>Estate of <mark class="value">X</mark></p>' in html
+
+
+class TestPreviewPlan:
+    def test_matches_rendered_text(self):
+        plan = generate_probate_closing.plan_closing_package(SAMPLE_MULTI_HEIR_TESTATE)
+        html = probate_utils.preview_plan(plan)
+        for title, _, _ in plan:
+            assert f'<h1>{title}</h1>' in html
+        rendered = probate_utils.render_template(plan[0][1], plan[0][2])
+        assert '<mark class="value">Tom Williams</mark>' in html
+        assert any('Tom Williams' in p.text for p in rendered.paragraphs)
+
+    def test_no_document_is_built(self, monkeypatch):
+        plan = generate_probate_closing.plan_closing_package(SAMPLE_MULTI_HEIR_TESTATE)
+        probate_utils.preview_plan(plan)
+
+        def refuse(*args):
+            raise AssertionError('preview built a Document')
+        monkeypatch.setattr(probate_utils, 'open_document', refuse)
+        monkeypatch.setattr(probate_utils, 'load_template', refuse)
+        assert '<mark class="value">' in probate_utils.preview_plan(plan)
+
+
+class TestMarkText:
+    def test_whole_words_longest_first(self):
+        marked = mark_text('John Publicity and John Public', ['John', 'John Public'])
+        assert marked == (f'{VALUE_START}John{VALUE_END} Publicity and '
+                          f'{VALUE_START}John Public{VALUE_END}')
+
+    def test_no_values(self):
+        assert mark_text('text', ['']) == 'text'
+
+
+class TestWillPreview:
+    @pytest.fixture
+    def will(self, monkeypatch):
+        spec = importlib.util.spec_from_file_location(
+            'generate_will', os.path.join(API_DIR, 'generate-will.py'))
+        module = importlib.util.module_from_spec(spec)
+        with contextlib.redirect_stdout(io.StringIO()):
+            spec.loader.exec_module(module)
+        with open(os.path.join(API_DIR, 'templates', 'will_template.docx'), 'rb') as f:
+            content = f.read()
+        monkeypatch.setattr(module, 'download_template', lambda url: io.BytesIO(content))
+        return module
+
+    DATA = {'CLIENT_NAME': 'Jane Q. Public', 'CLIENT_GENDER': 'Female', 'COUNTY': 'Maury',
+            'IS_MARRIED': True, 'SPOUSE_NAME': 'John Public', 'SPOUSE_GENDER': 'Male',
+            'PRIMARY_EXECUTOR': 'John Public', 'EXECUTION_MONTH': 'October',
+            'EXECUTION_YEAR': '2026'}
+
+    def test_marks_client_values(self, will):
+        with contextlib.redirect_stdout(io.StringIO()):
+            html = will.preview_will_html(self.DATA)
+        assert '<mark class="value">Jane Q. Public</mark>' in html
+        assert VALUE_START not in html and VALUE_END not in html
+
+    def test_text_matches_the_rendered_will(self, will):
+        import re
+        with contextlib.redirect_stdout(io.StringIO()):
+            html = will.preview_will_html(self.DATA)
+            body = will.build_will_document(self.DATA).element.body
+        rendered = outline_html(element_outline(body))
+        assert rendered in re.sub(r'<mark class="value">(.*?)</mark>', r'\1', html, flags=re.S)
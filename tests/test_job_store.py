@@ -0,0 +1,147 @@
+# tests/test_job_store.py
+import pytest
+import sys
+import os
+import io
+import zipfile
+import stat
+import time
+import importlib.util
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api'))
+from job_store import (JobStore, LocalFileJobStore, JobNotFound, AsyncJobsUnavailable,
+                       ASYNC_JOBS_ENV, run_job, submit_job, job_urls, get_job_store, set_job_store)
+
+# Import the hyphenated module using importlib
+_spec = importlib.util.spec_from_file_location(
+    'generate_probate_closing',
+    os.path.join(os.path.dirname(__file__), '..', 'api', 'generate-probate-closing.py')
+)
+generate_probate_closing = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(generate_probate_closing)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalFileJobStore(str(tmp_path))
+
+
+@pytest.fixture
+def async_jobs(monkeypatch):
+    monkeypatch.setenv(ASYNC_JOBS_ENV, '1')
+
+
+class TestLocalFileJobStore:
+    def test_create_and_get(self, store):
+        job_id = store.create('probate-closing', {'decedent_full_name': 'A'})
+        job = store.get(job_id)
+        assert job['status'] == 'queued'
+        assert job['kind'] == 'probate-closing'
+        assert store.load_payload(job_id) == {'decedent_full_name': 'A'}
+
+    def test_update_merges_fields(self, store):
+        job_id = store.create('probate-opening', {})
+        store.update(job_id, status='done', filename='x.zip')
+        job = store.get(job_id)
+        assert (job['status'], job['filename'], job['kind']) == ('done', 'x.zip', 'probate-opening')
+
+    def test_result_round_trip(self, store):
+        job_id = store.create('probate-opening', {})
+        store.put_result(job_id, b'PK\x03\x04')
+        assert store.get_result(job_id) == b'PK\x03\x04'
+
+    def test_unknown_job(self, store):
+        with pytest.raises(JobNotFound):
+            store.get('0' * 32)
+
+    def test_rejects_path_like_ids(self, store):
+        with pytest.raises(JobNotFound):
+            store.get('../etc')
+
+    def test_missing_result(self, store):
+        job_id = store.create('probate-opening', {})
+        with pytest.raises(JobNotFound):
+            store.get_result(job_id)
+
+    def test_files_private_to_owner(self, store):
+        job_id = store.create('probate-opening', {'decedent_full_name': 'A'})
+        store.put_result(job_id, b'PK')
+        job_dir = os.path.join(store.root, job_id)
+        assert stat.S_IMODE(os.stat(job_dir).st_mode) == 0o700
+        for name in ('payload.json', 'job.json', 'result.bin'):
+            assert stat.S_IMODE(os.stat(os.path.join(job_dir, name)).st_mode) == 0o600
+
+    def test_expired_jobs_purged(self, store):
+        old = store.create('probate-opening', {})
+        fresh = store.create('probate-opening', {})
+        stale = time.time() - store.ttl - 60
+        os.utime(os.path.join(store.root, old, 'job.json'), (stale, stale))
+        assert store.purge_expired() == 1
+        with pytest.raises(JobNotFound):
+            store.get(old)
+        assert store.get(fresh)['status'] == 'queued'
+
+
+class TestRunJob:
+    def test_success(self, store):
+        job_id = store.create('probate-opening', {'n': 2})
+        run_job(store, job_id, lambda p: ('out.zip', b'x' * p['n'], {'pages': 1}))
+        job = store.get(job_id)
+        assert job['status'] == 'done'
+        assert job['filename'] == 'out.zip'
+        assert job['pages'] == 1
+        assert store.get_result(job_id) == b'xx'
+
+    def test_failure_is_recorded(self, store):
+        def render(payload):
+            raise ValueError('Unknown will_type: Oral')
+        job_id = store.create('probate-opening', {})
+        run_job(store, job_id, render)
+        job = store.get(job_id)
+        assert job['status'] == 'failed'
+        assert 'Oral' in job['error']
+
+    def test_submit_runs_on_worker_thread(self, store, async_jobs):
+        job_id, thread = submit_job('probate-opening', {}, lambda p: ('a.zip', b'z', {}), store)
+        thread.join(timeout=10)
+        assert store.get(job_id)['status'] == 'done'
+
+    def test_submit_refused_without_server(self, store, monkeypatch):
+        monkeypatch.delenv(ASYNC_JOBS_ENV, raising=False)
+        with pytest.raises(AsyncJobsUnavailable, match='local_server.py'):
+            submit_job('probate-opening', {}, lambda p: ('a.zip', b'z', {}), store)
+        assert os.listdir(store.root) == []
+
+    def test_urls(self):
+        urls = job_urls('ab' * 16)
+        assert urls['status_url'].endswith('id=' + 'ab' * 16)
+        assert 'download=1' in urls['download_url']
+
+
+class TestClosingPackageJob:
+    def test_async_closing_package(self, store, async_jobs):
+        from tests.test_probate_closing import SAMPLE_MULTI_HEIR_TESTATE
+        job_id, thread = submit_job('probate-closing', SAMPLE_MULTI_HEIR_TESTATE,
+                                    generate_probate_closing.render_job, store)
+        thread.join(timeout=60)
+        job = store.get(job_id)
+        assert job['status'] == 'done', job.get('error')
+        assert job['filename'].startswith('Probate_Closing_')
+        names = zipfile.ZipFile(io.BytesIO(store.get_result(job_id))).namelist()
+        assert any('Receipt' in n for n in names)
+
+
+class TestStoreSelection:
+    def test_incomplete_backend_rejected(self):
+        class Partial(JobStore):
+            def create(self, kind, payload):
+                return 'id'
+        with pytest.raises(TypeError):
+            Partial()
+
+    def test_set_job_store(self, store):
+        previous = get_job_store()
+        set_job_store(store)
+        try:
+            assert get_job_store() is store
+        finally:
+            set_job_store(previous)
@@ -0,0 +1,72 @@
+# tests/test_lazy_parts.py
+import pytest
+import sys
+import os
+import io
+import zipfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api'))
+from docx import Document
+from lazy_parts import open_document, LazyXmlPart, LazyStylesPart
+from probate_utils import get_template_store, replace_in_document
+
+OATH = 'Personal Representative Oath CURLY.docx'
+
+
+def _open():
+    return open_document(get_template_store().open(OATH))
+
+
+def _save(doc):
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    buffer.seek(0)
+    return buffer
+
+
+def _lazy_parts(doc):
+    return [part for part in doc.part.package.iter_parts() if isinstance(part, LazyXmlPart)]
+
+
+class TestLazyParts:
+    def test_only_document_part_parsed_on_open(self):
+        doc = _open()
+        lazy = _lazy_parts(doc)
+        assert any(isinstance(part, LazyStylesPart) for part in lazy)
+        assert not any(part.is_parsed for part in lazy)
+
+    def test_untouched_parts_saved_as_original_bytes(self):
+        doc = _open()
+        replace_in_document(doc, {'{decedent name}': 'John Smith'})
+        source = zipfile.ZipFile(get_template_store().open(OATH))
+        saved = zipfile.ZipFile(_save(doc))
+        for part in _lazy_parts(doc):
+            name = part.partname.lstrip('/')
+            assert saved.read(name) == source.read(name)
+        assert saved.read('word/document.xml') != source.read('word/document.xml')
+
+    def test_parsed_on_access_and_edits_kept(self):
+        doc = _open()
+        doc.styles['Normal'].font.name = 'Courier New'
+        footer = doc.sections[0].footer
+        footer.paragraphs[0].text = 'Page footer edited'
+        styles = [p for p in _lazy_parts(doc) if isinstance(p, LazyStylesPart)]
+        assert styles[0].is_parsed
+
+        reopened = Document(_save(doc))
+        assert reopened.styles['Normal'].font.name == 'Courier New'
+        assert reopened.sections[0].footer.paragraphs[0].text == 'Page footer edited'
+
+    def test_python_docx_left_eager(self):
+        # Importing the renderers must not change how other code parses
+        import importlib.util
+        spec = importlib.util.spec_from_file_location(
+            'generate_will', os.path.join(os.path.dirname(__file__), '..', 'api', 'generate-will.py'))
+        spec.loader.exec_module(importlib.util.module_from_spec(spec))
+        doc = Document(get_template_store().open(OATH))
+        assert _lazy_parts(doc) == []
+
+    def test_output_opens_like_the_eager_one(self):
+        doc = _open()
+        text = [p.text for p in doc.paragraphs]
+        reopened = Document(_save(doc))
+        assert [p.text for p in reopened.paragraphs] == text
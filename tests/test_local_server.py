@@ -0,0 +1,156 @@
+# tests/test_local_server.py
+import pytest
+import sys
+import os
+import json
+import signal
+import socket
+import subprocess
+import threading
+import time
+import urllib.request
+import urllib.error
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api'))
+import local_server
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+GENERATORS = ('generate-will', 'generate-poa', 'generate-hcpoa', 'generate-acp',
+              'generate-probate-opening', 'generate-probate-closing')
+
+
+def _request(base, path, body=None, method=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(base + path, data=data, method=method,
+                                 headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+@pytest.fixture(scope='module')
+def routes():
+    return local_server.load_routes()
+
+
+@pytest.fixture(scope='module')
+def base_url(routes):
+    server = local_server.GeneratorServer(('127.0.0.1', 0), routes)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+class TestRoutes:
+    def test_mounts_all_six_generators(self, routes):
+        for endpoint in GENERATORS:
+            assert f'/api/{endpoint}' in routes
+
+    def test_helper_modules_are_not_routes(self, routes):
+        assert '/api/probate_utils' not in routes
+        assert '/api/field_registry' not in routes
+
+
+class TestGeneratorServer:
+    def test_unknown_route(self, base_url):
+        status, _ = _request(base_url, '/api/nope')
+        assert status == 404
+
+    def test_dispatches_by_path_with_query(self, base_url):
+        status, body = _request(base_url, '/api/probate-deadlines-bulk?format=ndjson',
+                                [{'matter': 'A', 'dod': '2026-04-10'}])
+        assert status == 200
+        assert json.loads(body.splitlines()[0])['absolute_bar_date'] == '2027-04-10'
+
+    def test_options(self, base_url):
+        status, _ = _request(base_url, '/api/generate-probate-opening', method='OPTIONS')
+        assert status == 200
+
+
+class TestPeekPath:
+    def test_waits_for_split_request_line(self):
+        client, server = socket.socketpair()
+        with client, server:
+            client.sendall(b'POST /api/generate-')
+            threading.Timer(0.1, client.sendall, [b'will?x=1 HTTP/1.1\r\n\r\n']).start()
+            assert local_server._peek_path(server) == '/api/generate-will'
+            # Nothing was consumed
+            assert server.recv(4) == b'POST'
+
+    def test_gives_up_after_timeout(self):
+        client, server = socket.socketpair()
+        with client, server:
+            client.sendall(b'GET /api/gen')
+            started = time.monotonic()
+            assert local_server._peek_path(server, timeout=0.2) == ''
+            assert time.monotonic() - started < 2
+
+
+class TestSupervisorRestarts:
+    @staticmethod
+    def _supervisor():
+        supervisor = local_server.Supervisor.__new__(local_server.Supervisor)
+        supervisor.children, supervisor.retiring = set(), set()
+        supervisor._started, supervisor._crashes, supervisor._restarts = {}, 0, []
+        supervisor._stop = False
+        supervisor.forked = 0
+
+        def fork():
+            supervisor.forked += 1
+        supervisor._fork_worker = fork
+        return supervisor
+
+    def _crash(self, supervisor, monkeypatch, pid):
+        exits = [(pid, 256)]
+        monkeypatch.setattr(local_server.os, 'waitpid',
+                            lambda *args: exits.pop() if exits else (0, 0))
+        supervisor.children.add(pid)
+        supervisor._started[pid] = time.monotonic()
+        supervisor._reap()
+
+    def test_crash_loop_backs_off(self, monkeypatch, capsys):
+        supervisor = self._supervisor()
+        delays = []
+        for pid in (101, 102, 103):
+            self._crash(supervisor, monkeypatch, pid)
+            delays.append(supervisor._restarts.pop() - time.monotonic())
+        assert supervisor.forked == 0
+        assert [round(d, 1) for d in delays] == [0.5, 1.0, 2.0]
+        assert 'restarting in 2s' in capsys.readouterr().out
+
+    def test_restart_forks_when_due(self, monkeypatch):
+        supervisor = self._supervisor()
+        self._crash(supervisor, monkeypatch, 101)
+        supervisor._restart_due()
+        assert supervisor.forked == 0
+        supervisor._restarts = [time.monotonic() - 1]
+        supervisor._restart_due()
+        assert supervisor.forked == 1 and supervisor._restarts == []
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='pre-fork mode needs os.fork')
+class TestPreforkServer:
+    def test_reload_and_shutdown(self):
+        proc = subprocess.Popen(
+            [sys.executable, 'local_server.py', '--port', '0', '--workers', '2', '--no-drive-warm'],
+            cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+        try:
+            line = proc.stdout.readline()
+            base = line.split('listening on ')[1].split()[0]
+            assert _request(base, '/api/nope')[0] == 404
+
+            proc.send_signal(signal.SIGHUP)
+            assert 'reloaded' in proc.stdout.readline()
+            status, _ = _request(base, '/api/generate-probate-opening', method='OPTIONS')
+            assert status == 200
+
+            proc.send_signal(signal.SIGTERM)
+            assert proc.wait(timeout=30) == 0
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
@@ -0,0 +1,72 @@
+# tests/test_partial_evaluation.py
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api'))
+import probate_utils
+from probate_utils import (build_common_replacements, baked_constants,
+                           load_evaluated_template, render_template, iter_document_paragraphs)
+from tests.test_probate_opening import SAMPLE_TESTATE_DATA, generate_opening_package
+from tests.test_probate_closing import SAMPLE_MULTI_HEIR_TESTATE, generate_probate_closing
+
+OATH = 'Personal Representative Oath CURLY.docx'
+RECEIPT = 'Receipt & Waiver - Testate CURLY.docx'
+PETITION = 'Petition to Probate Will Ltrs Testamentary CURLY (1).docx'
+CONSTANTS = {'firm_name': 'Muletown Law, P.C.', 'attorney_name': 'Ada Lovelace',
+             'attorney_bpr': '012345'}
+
+
+@pytest.fixture
+def constants(monkeypatch):
+    monkeypatch.setattr(probate_utils, 'FIRM_CONSTANTS', CONSTANTS)
+    monkeypatch.setattr(probate_utils, '_evaluated_templates', probate_utils.TemplateCache())
+    return CONSTANTS
+
+
+def _payload(data, **overrides):
+    return dict(data, **dict({'deterministic': True, 'generation_date': '2026-04-10',
+                              'attorney_full_name': 'Ada Lovelace', 'attorney_bpr': '012345'},
+                             **overrides))
+
+
+class TestBakedConstants:
+    def test_only_agreeing_constants(self, constants):
+        replacements = build_common_replacements(_payload(SAMPLE_TESTATE_DATA, attorney_bpr='999'))
+        assert baked_constants(replacements) == (('attorney_name', 'Ada Lovelace'),
+                                                 ('firm_name', 'Muletown Law, P.C.'))
+
+    def test_remaining_fields_exclude_constants(self, constants):
+        replacements = build_common_replacements(_payload(SAMPLE_TESTATE_DATA))
+        doc, remaining = load_evaluated_template(OATH, replacements)
+        assert not remaining.registry.fields & set(CONSTANTS)
+        assert 'Dale, Hutto & Lyle, PLLC' not in remaining.registry.matcher.pattern
+        assert 'Dale, Hutto & Lyle, PLLC' not in '\n'.join(
+            p.text for p in iter_document_paragraphs(doc))
+
+    def test_evaluated_once_per_template(self, constants):
+        replacements = build_common_replacements(_payload(SAMPLE_TESTATE_DATA))
+        render_template(PETITION, replacements)
+        render_template(PETITION, replacements)
+        assert len(probate_utils._evaluated_templates) == 1
+
+    @pytest.mark.parametrize('firm', ['Muletown Law, P.C.', 'Other Firm LLP'])
+    def test_firm_name_rendered(self, firm, constants):
+        _, _, replacements = generate_probate_closing.plan_receipt_waiver(
+            SAMPLE_MULTI_HEIR_TESTATE['heirs'][0],
+            _payload(SAMPLE_MULTI_HEIR_TESTATE, firm_name=firm))
+        text = '\n'.join(p.text for p in iter_document_paragraphs(
+            render_template(RECEIPT, replacements)))
+        assert firm in text and 'Dale, Hutto' not in text
+
+
+class TestRendersAreIdentical:
+    @pytest.mark.parametrize('render', [
+        lambda: generate_opening_package(_payload(SAMPLE_TESTATE_DATA)),
+        lambda: generate_probate_closing.generate_closing_package(
+            _payload(SAMPLE_MULTI_HEIR_TESTATE)),
+    ])
+    def test_package_bytes_match(self, render, constants, monkeypatch):
+        evaluated = render().getvalue()
+        monkeypatch.setattr(probate_utils, 'baked_constants', lambda replacements: ())
+        assert render().getvalue() == evaluated
+        assert len(probate_utils._evaluated_templates) > 0
@@ -0,0 +1,85 @@
+# tests/test_placeholder_index.py
+import pytest
+import sys
+import os
+import json
+from io import BytesIO
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api'))
+from placeholder_index import (scan_template, template_families, build_report,
+                               format_report, build_manifest)
+from probate_utils import PLACEHOLDER_MANIFEST
+
+KNOWN_UNMAPPED_PATH = os.path.join(os.path.dirname(__file__), 'fixtures',
+                                   'known_unmapped_placeholders.json')
+
+
+@pytest.fixture(scope='module')
+def report():
+    return build_report(template_families())
+
+
+def _docx_bytes(doc):
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+class TestScanTemplate:
+    def test_finds_placeholder_split_across_runs(self):
+        from docx import Document
+        doc = Document()
+        doc.add_paragraph('Intro')
+        para = doc.add_paragraph('')
+        para.add_run('{DECEDENT')
+        para.add_run(' NAME} of {COUNTY}')
+        found = scan_template(_docx_bytes(doc))
+        assert found['{DECEDENT NAME}'] == ['document.xml:p1']
+        assert '{COUNTY}' in found
+
+    def test_scans_table_cells(self):
+        from docx import Document
+        doc = Document()
+        table = doc.add_table(rows=1, cols=1)
+        table.rows[0].cells[0].paragraphs[0].add_run('{Docket Number}')
+        assert '{Docket Number}' in scan_template(_docx_bytes(doc))
+
+
+class TestCoverageReport:
+    def test_indexes_every_template(self, report):
+        families = {info['family'] for info in report['templates'].values()}
+        assert {'probate-common', 'probate-declination', 'probate-receipt-waiver',
+                'will', 'poa', 'hcpoa', 'acp'} <= families
+        assert len([t for t in report['templates'].values()
+                    if t['family'].startswith('probate')]) == 28
+
+    def test_inverted_index_points_back_to_templates(self, report):
+        entries = report['index']['{DECLINER NAME}']
+        assert any(e['template'] == 'Declination to Serve CURLY.docx' for e in entries)
+
+    def test_mapped_placeholders_are_not_reported(self, report):
+        info = report['templates']['Declination to Serve CURLY.docx']
+        assert '{DECLINER NAME}' in info['placeholders']
+        assert '{DECLINER NAME}' not in info['unmapped']
+
+    def test_firm_name_literal_is_indexed(self, report):
+        assert 'Dale, Hutto & Lyle, PLLC' in report['index']
+
+    def test_no_new_unmapped_placeholders(self, report):
+        """Fails when a template gains a field no replacement map fills.
+
+        Map the new field (or, if it is intentionally left for Curly, add it
+        to tests/fixtures/known_unmapped_placeholders.json).
+        """
+        with open(KNOWN_UNMAPPED_PATH, encoding='utf-8') as f:
+            known = json.load(f)
+        new_gaps = {label: sorted(set(info['unmapped']) - set(known.get(label, [])))
+                    for label, info in report['templates'].items()}
+        assert {k: v for k, v in new_gaps.items() if v} == {}
+
+    def test_dry_run_manifest_is_current(self, report):
+        """Regenerate with: python api/placeholder_index.py --manifest"""
+        with open(PLACEHOLDER_MANIFEST, encoding='utf-8') as f:
+            assert json.load(f) == build_manifest(report)
+
+    def test_format_report_summarizes(self, report):
+        assert 'distinct placeholders' in format_report(report)
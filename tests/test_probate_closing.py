@@ -2,6 +2,7 @@
 import pytest
 import sys
 import os
+import io
 import zipfile
 import importlib.util
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api'))
@@ -323,3 +324,113 @@ class TestZipFilenames:
         zf = zipfile.ZipFile(result)
         names = zf.namelist()
         assert all(n.endswith('.docx') for n in names)
+
+
+class TestRerenderClosingPackage:
+    @staticmethod
+    def _texts(zip_bytes):
+        import io
+        from docx import Document
+        zf = zipfile.ZipFile(io.BytesIO(zip_bytes))
+        return {name: '\n'.join(p.text for p in Document(io.BytesIO(zf.read(name))).paragraphs)
+                for name in zf.namelist()}
+
+    def test_only_affected_receipt_is_rerendered(self):
+        old = {**SAMPLE_MULTI_HEIR_TESTATE, 'generation_date': '2026-04-10'}
+        heirs = list(old['heirs'])
+        heirs[1] = dict(heirs[1], heir_address='9 New Street')
+        new = {**old, 'heirs': heirs}
+        previous = generate_closing_package(old).getvalue()
+
+        rerendered = []
+        result = generate_probate_closing.rerender_closing_package(
+            old, new, previous, rerendered=rerendered).getvalue()
+
+        changed_title = f"Receipt and Waiver - {heirs[1]['heir_full_name']}"
+        assert rerendered == [changed_title]
+        old_zip, new_zip = zipfile.ZipFile(io.BytesIO(previous)), zipfile.ZipFile(io.BytesIO(result))
+        assert new_zip.namelist() == old_zip.namelist()
+        for name in new_zip.namelist():
+            if changed_title not in name:
+                assert new_zip.read(name) == old_zip.read(name)
+        assert self._texts(result) == self._texts(generate_closing_package(new).getvalue())
+
+    def test_common_field_change_rerenders_users_of_field(self):
+        old = {**SAMPLE_TESTATE_CLOSING, 'generation_date': '2026-04-10'}
+        new = {**old, 'decedent_full_name': 'Smith, Jonathan Robert'}
+        rerendered = []
+        generate_probate_closing.rerender_closing_package(
+            old, new, generate_closing_package(old).getvalue(), rerendered=rerendered)
+        from probate_utils import field_dependencies
+        plan = generate_probate_closing.plan_closing_package(new)
+        expected = [title for title, template_name, replacements in plan
+                    if 'decedent_name' in field_dependencies(template_name, replacements.registry)]
+        assert 'Order to Close Estate' in expected
+        assert rerendered == expected
+
+    def test_new_heir_is_rendered(self):
+        old = {**SAMPLE_MULTI_HEIR_TESTATE, 'generation_date': '2026-04-10'}
+        new = {**old, 'heirs': old['heirs'][:2]}
+        rerendered = []
+        result = generate_probate_closing.rerender_closing_package(
+            new, old, generate_closing_package(new).getvalue(), rerendered=rerendered)
+        assert rerendered == [f"Receipt and Waiver - {old['heirs'][2]['heir_full_name']}"]
+        assert len(zipfile.ZipFile(result).namelist()) == 5
+
+    def test_correction_on_a_later_day_rerenders_everything(self):
+        old = {**SAMPLE_MULTI_HEIR_TESTATE, 'generation_date': '2026-04-30'}
+        heirs = list(old['heirs'])
+        heirs[1] = dict(heirs[1], heir_address='9 New Street')
+        new = {**old, 'heirs': heirs, 'generation_date': '2026-05-01'}
+        rerendered = []
+        result = generate_probate_closing.rerender_closing_package(
+            old, new, generate_closing_package(old).getvalue(), rerendered=rerendered).getvalue()
+        plan = generate_probate_closing.plan_closing_package(new)
+        assert rerendered == [title for title, _, _ in plan]
+        assert all(name.startswith('2026-05-01 ')
+                   for name in zipfile.ZipFile(io.BytesIO(result)).namelist())
+        assert self._texts(result) == self._texts(generate_closing_package(new).getvalue())
+
+    def test_package_from_other_templates_rerendered(self, monkeypatch):
+        import probate_utils
+        old = dict(SAMPLE_TESTATE_CLOSING, generation_date='2026-04-10')
+        previous = generate_closing_package(old).getvalue()
+        assert zipfile.ZipFile(io.BytesIO(previous)).comment == probate_utils.package_comment()
+        # A template or firm constant changed since the package was built
+        monkeypatch.setattr(probate_utils, 'templates_version', lambda: 'another')
+        rerendered = []
+        generate_probate_closing.rerender_closing_package(old, dict(old), previous,
+                                                          rerendered=rerendered)
+        assert rerendered == [title for title, _, _ in
+                              generate_probate_closing.plan_closing_package(old)]
+
+    def test_correction_without_date_compares_against_today(self, monkeypatch):
+        import probate_utils
+        old = dict(SAMPLE_TESTATE_CLOSING)
+        previous = generate_closing_package(old).getvalue()
+        # The correction arrives after midnight
+        monkeypatch.setattr(probate_utils, 'package_date', lambda data: '2099-01-01')
+        monkeypatch.setattr(generate_probate_closing, 'package_date', lambda data: '2099-01-01')
+        rerendered = []
+        generate_probate_closing.rerender_closing_package(old, dict(old), previous,
+                                                          rerendered=rerendered)
+        assert rerendered == [title for title, _, _ in
+                              generate_probate_closing.plan_closing_package(old)]
+
+
+class TestDryRun:
+    def test_matches_rendered_package_without_templates(self, monkeypatch):
+        import json
+        import probate_utils
+        rendered = zipfile.ZipFile(generate_closing_package(SAMPLE_MULTI_HEIR_TESTATE)).namelist()
+
+        def refuse(*args):
+            raise AssertionError('dry run loaded a template')
+        monkeypatch.setattr(probate_utils, 'get_template_store', refuse)
+        monkeypatch.setattr(probate_utils, 'load_template', refuse)
+        result = generate_probate_closing.dry_run_closing_package(SAMPLE_MULTI_HEIR_TESTATE)
+        json.dumps(result)
+        assert sorted(f"{n[11:-5]}" for n in rendered) == sorted(
+            d['title'] for d in result['documents'])
+        assert [r['heir'] for r in result['receipt_waivers']] == [
+            'Tom Williams', 'Lisa Williams', 'Mark Williams']
@@ -0,0 +1,74 @@
+# tests/test_probate_deadlines_bulk.py
+import pytest
+import sys
+import os
+import csv
+import io
+import json
+import importlib.util
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api'))
+
+# Import the hyphenated module using importlib
+_spec = importlib.util.spec_from_file_location(
+    'probate_deadlines_bulk',
+    os.path.join(os.path.dirname(__file__), '..', 'api', 'probate-deadlines-bulk.py')
+)
+probate_deadlines_bulk = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(probate_deadlines_bulk)
+
+from probate_utils import calculate_deadlines_bulk
+
+CSV_BODY = (
+    'matter,dod,publication_date\n'
+    '2026-101,2026-04-10,2026-05-01\n'
+    '2026-102,2024-02-29,\n'
+).encode()
+
+
+class TestParseRows:
+    def test_csv_rows(self):
+        rows = list(probate_deadlines_bulk.parse_rows(CSV_BODY, 'text/csv'))
+        assert rows[0] == {'matter': '2026-101', 'dod': '2026-04-10',
+                           'publication_date': '2026-05-01'}
+
+    def test_json_list(self):
+        body = json.dumps([{'matter': 'A', 'dod': '2026-04-10'}]).encode()
+        rows = probate_deadlines_bulk.parse_rows(body, 'application/json')
+        assert rows == [{'matter': 'A', 'dod': '2026-04-10'}]
+
+    def test_json_object_with_rows(self):
+        body = json.dumps({'rows': [{'matter': 'A', 'dod': '2026-04-10'}]}).encode()
+        rows = probate_deadlines_bulk.parse_rows(body, 'application/json')
+        assert rows[0]['matter'] == 'A'
+
+
+class TestFormatResults:
+    def test_csv_output_round_trips(self):
+        rows = probate_deadlines_bulk.parse_rows(CSV_BODY, 'text/csv')
+        text = ''.join(probate_deadlines_bulk.format_csv(calculate_deadlines_bulk(rows)))
+        parsed = list(csv.DictReader(io.StringIO(text)))
+        assert len(parsed) == 2
+        assert parsed[0]['claims_deadline'] == '2026-09-01'
+        assert parsed[1]['absolute_bar_date'] == '2025-02-28'
+        assert parsed[1]['claims_deadline'] == ''
+
+    def test_csv_output_includes_adjusted_columns(self):
+        from court_calendar import get_court_calendar
+        rows = probate_deadlines_bulk.parse_rows(CSV_BODY, 'text/csv')
+        results = calculate_deadlines_bulk(rows, get_court_calendar())
+        text = ''.join(probate_deadlines_bulk.format_csv(results))
+        parsed = list(csv.DictReader(io.StringIO(text)))
+        # 2025-02-28 is a Friday, so no adjustment
+        assert parsed[1]['absolute_bar_date_adjusted'] == '2025-02-28'
+        # 2027-04-10 is a Saturday
+        assert parsed[0]['absolute_bar_date_adjusted'] == '2027-04-12'
+
+    def test_csv_streams_one_chunk_per_row(self):
+        rows = probate_deadlines_bulk.parse_rows(CSV_BODY, 'text/csv')
+        chunks = list(probate_deadlines_bulk.format_csv(calculate_deadlines_bulk(rows)))
+        assert len(chunks) == 2  # header + first row, then second row
+
+    def test_ndjson_output(self):
+        rows = [{'matter': 'A', 'dod': '2026-04-10'}]
+        lines = list(probate_deadlines_bulk.format_ndjson(calculate_deadlines_bulk(rows)))
+        assert json.loads(lines[0])['absolute_bar_date'] == '2027-04-10'
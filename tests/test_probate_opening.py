@@ -203,3 +203,89 @@ class TestOpeningDocumentSelection:
         # Should have 5 docs: petition, order, oath, + 2 declinations
         assert len(names) == 5
         assert all(n.endswith('.docx') for n in names)
+
+
+class TestResidualPlaceholders:
+    def test_residuals_reported_per_document(self):
+        residuals = {}
+        generate_opening_package(SAMPLE_TESTATE_DATA, residuals)
+        assert residuals
+        assert all(name.endswith('.docx') for name in residuals)
+        assert all(token.startswith('{') for tokens in residuals.values() for token in tokens)
+        assert not any('{Decedent Name}' in tokens for tokens in residuals.values())
+
+    def test_placeholder_report_adds_sidecar(self):
+        import zipfile
+        from residual_placeholders import REPORT_FILENAME
+        data = dict(SAMPLE_TESTATE_DATA, placeholder_report=True)
+        residuals = {}
+        zf = zipfile.ZipFile(generate_opening_package(data, residuals))
+        assert REPORT_FILENAME in zf.namelist()
+        assert json.loads(zf.read(REPORT_FILENAME)) == residuals
+
+    def test_strict_mode_raises(self):
+        from residual_placeholders import ResidualPlaceholderError
+        data = dict(SAMPLE_TESTATE_DATA, strict_placeholders=True)
+        with pytest.raises(ResidualPlaceholderError) as excinfo:
+            generate_opening_package(data)
+        assert excinfo.value.residuals
+
+
+class TestDeterministicOutput:
+    def _generate_at(self, monkeypatch, data, clock):
+        import time
+        monkeypatch.setattr(time, 'time', lambda: clock)
+        return generate_opening_package(data).getvalue()
+
+    def test_identical_payloads_hash_identically(self, monkeypatch):
+        data = dict(SAMPLE_INTESTATE_DATA, generation_date='2026-04-10', deterministic=True)
+        first = self._generate_at(monkeypatch, data, 1_800_000_000)
+        second = self._generate_at(monkeypatch, data, 1_800_003_600)
+        assert first == second
+
+    def test_default_output_is_timestamped(self, monkeypatch):
+        data = dict(SAMPLE_INTESTATE_DATA, generation_date='2026-04-10')
+        first = self._generate_at(monkeypatch, data, 1_800_000_000)
+        second = self._generate_at(monkeypatch, data, 1_800_003_600)
+        assert first != second
+
+    def test_entries_and_core_properties_are_pinned(self):
+        import io
+        import zipfile
+        data = dict(SAMPLE_TESTATE_DATA, generation_date='2026-04-10', deterministic=True)
+        bundle = zipfile.ZipFile(generate_opening_package(data))
+        assert {info.date_time for info in bundle.infolist()} == {(2026, 4, 10, 0, 0, 0)}
+        docx = zipfile.ZipFile(io.BytesIO(bundle.read(bundle.namelist()[0])))
+        assert {info.date_time for info in docx.infolist()} == {(2026, 4, 10, 0, 0, 0)}
+        core = docx.read('docProps/core.xml').decode()
+        assert '2026-04-10T00:00:00Z</dcterms:modified>' in core
+        assert '2026-04-10T00:00:00Z</dcterms:created>' in core
+        assert '<cp:revision>1</cp:revision>' in core
+        assert 'lastPrinted' not in core
+
+
+class TestDryRun:
+    @pytest.fixture(autouse=True)
+    def no_templates(self, monkeypatch):
+        import probate_utils
+
+        def refuse(*args):
+            raise AssertionError('dry run loaded a template')
+        monkeypatch.setattr(probate_utils, 'get_template_store', refuse)
+        monkeypatch.setattr(probate_utils, 'load_template', refuse)
+
+    def test_describes_documents_without_templates(self):
+        result = generate_probate_opening.dry_run_opening_package(SAMPLE_INTESTATE_DATA)
+        json.dumps(result)
+        titles = [d['title'] for d in result['documents']]
+        assert titles[:len(result['selected_documents'])] == [
+            d['title'] for d in result['selected_documents']]
+        assert len(titles) == len(result['selected_documents']) + len(result['declinations'])
+        assert isinstance(result['flags'], list)
+
+    def test_resolved_values_and_unmapped(self):
+        result = generate_probate_opening.dry_run_opening_package(SAMPLE_TESTATE_DATA)
+        for document in result['documents']:
+            assert not set(document['values']) & set(document['unmapped'])
+        values = {v for d in result['documents'] for v in d['values'].values()}
+        assert SAMPLE_TESTATE_DATA['decedent_full_name'] in values
@@ -9,7 +9,13 @@ from probate_utils import (derive_pronouns, derive_pr_title,
                            ordinal_day, select_closing_documents,
                            select_receipt_waiver_template, build_common_replacements,
                            merge_runs_in_paragraph, replace_in_document,
-                           load_template, build_zip)
+                           load_template, build_zip, reachable_templates,
+                           warm_template_pool, OPENING_DOCUMENT_TABLE,
+                           CLOSING_DOCUMENT_TABLE, RECEIPT_WAIVER_TABLE,
+                           TEMPLATE_DIR, Estate, normalize_name,
+                           calculate_deadlines_bulk, calculate_court_deadlines,
+                           field_dependencies, changed_fields, COMMON_FIELDS,
+                           build_common_values, decode_previous, InvalidPrevious)
 
 
 class TestDerivePronouns:
@@ -163,6 +169,73 @@ class TestBuildZip:
             names = zf.namelist()
             assert f'{today} Doc.docx' in names
 
+    def _compress_types(self, result):
+        import zipfile
+        with zipfile.ZipFile(result) as zf:
+            return {info.filename: info.compress_type for info in zf.infolist()}
+
+    def _docs(self):
+        from docx import Document
+        doc = Document()
+        doc.add_paragraph('Test ' * 200)
+        return [('Doc', doc)]
+
+    def test_auto_stores_nested_docx(self):
+        import zipfile
+        types = self._compress_types(build_zip(self._docs(), '2026-04-10', compression='auto'))
+        assert types == {'2026-04-10 Doc.docx': zipfile.ZIP_STORED}
+
+    def test_deflate_policy(self):
+        import zipfile
+        types = self._compress_types(build_zip(self._docs(), '2026-04-10',
+                                               compression='deflate', compresslevel=1))
+        assert set(types.values()) == {zipfile.ZIP_DEFLATED}
+
+    def test_auto_deflates_compressible_sidecar(self):
+        import zipfile
+        from residual_placeholders import REPORT_FILENAME
+        from docx import Document
+        docs = []
+        for n in range(20):
+            doc = Document()
+            doc.add_paragraph('{Unfilled Placeholder Number %d}' % n)
+            docs.append((f'Doc {n}', doc))
+        types = self._compress_types(build_zip(docs, '2026-04-10', include_report=True,
+                                               compression='auto'))
+        assert types[REPORT_FILENAME] == zipfile.ZIP_DEFLATED
+        assert types['2026-04-10 Doc 0.docx'] == zipfile.ZIP_STORED
+
+    def test_unknown_policy(self):
+        with pytest.raises(ValueError):
+            build_zip(self._docs(), '2026-04-10', compression='bzip2')
+
+    def test_accepts_rendered_bytes(self):
+        import zipfile
+        from io import BytesIO
+        from docx import Document
+
+        buffer = BytesIO()
+        Document().save(buffer)
+        result = build_zip([('Copied', buffer.getvalue())], '2026-04-10')
+        with zipfile.ZipFile(result, 'r') as zf:
+            assert zf.read('2026-04-10 Copied.docx') == buffer.getvalue()
+
+
+class TestDecodePrevious:
+    def test_payload_and_zip(self):
+        import base64
+        zip_bytes = build_zip([], '2026-04-10').getvalue()
+        previous = {'payload': {'a': 1}, 'zip': base64.b64encode(zip_bytes).decode()}
+        assert decode_previous(previous) == ({'a': 1}, zip_bytes)
+
+    @pytest.mark.parametrize('previous', [
+        {}, 'zip', {'payload': {}}, {'zip': 'UEsFBg=='}, {'payload': {}, 'zip': 'not base64!'},
+        {'payload': {}, 'zip': 'aGVsbG8='},
+    ])
+    def test_malformed_rejected(self, previous):
+        with pytest.raises(InvalidPrevious):
+            decode_previous(previous)
+
 
 class TestSelectOpeningDocuments:
     def test_testate_standard_witnessed(self):
@@ -388,6 +461,90 @@ class TestCalculateDeadlines:
         assert 'claims_deadline' not in result
         assert 'exception_deadline' not in result
 
+    def test_claims_deadline_clamps_to_month_end(self):
+        result = calculate_deadlines('2026-04-10', '2026-10-31')
+        assert result['claims_deadline'] == '2027-02-28'
+
+    def test_claims_deadline_crosses_year(self):
+        result = calculate_deadlines('2026-04-10', '2026-11-15')
+        assert result['claims_deadline'] == '2027-03-15'
+        assert result['exception_deadline'] == '2027-04-14'
+
+    def test_unpadded_dates_accepted(self):
+        assert calculate_deadlines('2024-3-5', '2024-3-5') == \
+            calculate_deadlines('2024-03-05', '2024-03-05')
+
+    def test_invalid_date_rejected(self):
+        with pytest.raises(ValueError):
+            calculate_deadlines('2024-13-05')
+
+    @pytest.mark.parametrize('dod', ['20250101', '2025-W01-1', '2025-01-01T00:00'])
+    def test_non_ymd_iso_forms_rejected(self, dod):
+        with pytest.raises(ValueError):
+            calculate_deadlines(dod)
+
+
+class TestCalculateCourtDeadlines:
+    def test_returns_raw_and_adjusted(self):
+        # Bar date 2027-04-10 is a Saturday
+        result = calculate_court_deadlines('2026-04-10')
+        assert result['absolute_bar_date'] == {'raw': '2027-04-10',
+                                               'adjusted': '2027-04-12'}
+
+    def test_open_day_unchanged(self):
+        result = calculate_court_deadlines('2026-04-10', '2026-05-01')
+        assert result['claims_deadline'] == {'raw': '2026-09-01',
+                                             'adjusted': '2026-09-01'}
+
+    def test_raw_matches_calculate_deadlines(self):
+        plain = calculate_deadlines('2026-04-10', '2026-05-01')
+        adjusted = calculate_court_deadlines('2026-04-10', '2026-05-01')
+        assert {k: v['raw'] for k, v in adjusted.items()} == plain
+
+
+class TestCalculateDeadlinesBulk:
+    def test_matches_single_calculation(self):
+        rows = [
+            {'matter': 'A', 'dod': '2026-04-10', 'publication_date': '2026-05-01'},
+            {'matter': 'B', 'dod': '2024-02-29'},
+        ]
+        results = list(calculate_deadlines_bulk(rows))
+        assert results[0]['matter'] == 'A'
+        assert results[0]['claims_deadline'] == calculate_deadlines(
+            '2026-04-10', '2026-05-01')['claims_deadline']
+        assert results[1]['absolute_bar_date'] == '2025-02-28'
+        assert results[1]['claims_deadline'] == ''
+        assert results[1]['error'] == ''
+
+    def test_bad_row_reports_error_and_continues(self):
+        rows = [
+            {'matter': 'bad', 'dod': 'not a date'},
+            {'matter': 'missing'},
+            'not a row',
+            {'matter': 'good', 'dod': '2026-04-10'},
+        ]
+        results = list(calculate_deadlines_bulk(rows))
+        assert [bool(r['error']) for r in results] == [True, True, True, False]
+        assert results[3]['absolute_bar_date'] == '2027-04-10'
+
+    def test_adjusted_columns_with_calendar(self):
+        from court_calendar import get_court_calendar
+        result = next(calculate_deadlines_bulk(
+            [{'matter': 'A', 'dod': '2026-04-10'}], get_court_calendar()))
+        assert result['absolute_bar_date'] == '2027-04-10'
+        assert result['absolute_bar_date_adjusted'] == '2027-04-12'
+        assert result['claims_deadline_adjusted'] == ''
+
+    def test_no_adjusted_columns_without_calendar(self):
+        result = next(calculate_deadlines_bulk([{'matter': 'A', 'dod': '2026-04-10'}]))
+        assert 'absolute_bar_date_adjusted' not in result
+
+    def test_empty_publication_date_is_ignored(self):
+        result = next(calculate_deadlines_bulk(
+            [{'matter': 'A', 'dod': '2026-04-10', 'publication_date': ''}]))
+        assert result['error'] == ''
+        assert result['exception_deadline'] == ''
+
 
 class TestGenerateFlags:
     def test_nonresident_pr(self):
@@ -737,3 +894,129 @@ class TestSelectOpeningDocumentsErrors:
         data = {'estate_type': 'Testate', 'will_type': 'Notarized'}
         with pytest.raises(ValueError, match='Unknown will_type'):
             select_opening_documents(data)
+
+
+class TestDecisionTables:
+    WILL_TYPES = [None, 'Standard Witnessed', 'Holographic', 'Will + Codicil']
+    BENEFICIARY_TYPES = [None, 'General', 'Specific', 'Residuary']
+
+    def test_reachable_templates_exist_on_disk(self):
+        for template_name in reachable_templates():
+            assert os.path.exists(os.path.join(TEMPLATE_DIR, template_name)), template_name
+
+    def test_reachable_templates_includes_declination(self):
+        assert 'Declination to Serve CURLY.docx' in reachable_templates()
+
+    def test_warm_template_pool_loads_every_reachable_template(self):
+        assert warm_template_pool() >= len(reachable_templates())
+
+    def test_every_opening_combination_selects_from_table(self):
+        """Exhaustive walk of opening inputs: every outcome is a table row
+        and every table row is reachable."""
+        seen = set()
+        for estate_type in ['Testate', 'Intestate']:
+            for will_type in self.WILL_TYPES:
+                for muniment in [False, True]:
+                    for small in [False, True]:
+                        data = {'estate_type': estate_type, 'will_type': will_type,
+                                'muniment_only': muniment,
+                                'small_estate_election': small}
+                        try:
+                            docs = select_opening_documents(data)
+                        except ValueError:
+                            assert estate_type == 'Testate' and will_type is None
+                            continue
+                        assert tuple(docs) in OPENING_DOCUMENT_TABLE.values()
+                        seen.add(tuple(docs))
+        assert len(seen) == len(OPENING_DOCUMENT_TABLE)
+
+    def test_every_closing_combination_selects_from_table(self):
+        seen = set()
+        for estate_type in ['Testate', 'Intestate']:
+            for sui_juris in [False, True]:
+                docs = select_closing_documents({'estate_type': estate_type,
+                                                 'all_heirs_sui_juris': sui_juris})
+                seen.add(tuple(docs))
+        assert seen == set(CLOSING_DOCUMENT_TABLE.values())
+
+    def test_every_receipt_waiver_combination_selects_from_table(self):
+        seen = set()
+        for estate_type in ['Testate', 'Intestate']:
+            for btype in self.BENEFICIARY_TYPES:
+                for is_pr in [False, True]:
+                    heir = {'heir_full_name': 'Jane Doe' if is_pr else 'John Doe'}
+                    if btype:
+                        heir['heir_beneficiary_type'] = btype
+                    data = {'estate_type': estate_type, 'pr_full_name': 'Jane Doe'}
+                    template, _ = select_receipt_waiver_template(heir, data)
+                    seen.add(template)
+        assert seen == set(RECEIPT_WAIVER_TABLE.values())
+
+    def test_selection_returns_fresh_list(self):
+        data = {'estate_type': 'Intestate'}
+        select_opening_documents(data).append(('Extra.docx', 'Extra'))
+        assert len(select_opening_documents(data)) == 3
+
+
+class TestEstate:
+    DATA = {
+        'pr_full_name': 'Robert  Doe',
+        'heirs': [
+            {'heir_full_name': 'robert doe', 'heir_relationship': 'Son'},
+            {'heir_full_name': 'Susan Doe', 'heir_relationship': 'Daughter',
+             'heir_is_beneficiary': True},
+            {'heir_full_name': 'Tim Doe', 'heir_relationship': 'Son',
+             'heir_is_minor': True},
+            {'heir_full_name': 'Amy Roe', 'heir_relationship': 'Niece',
+             'heir_has_disability': True, 'heir_is_beneficiary': True},
+        ],
+    }
+
+    def test_normalize_name(self):
+        assert normalize_name('  Jane   SMITH ') == 'jane smith'
+        assert normalize_name(None) == ''
+
+    def test_pr_matched_by_normalized_name(self):
+        estate = Estate(self.DATA)
+        assert estate.heirs[0].is_pr
+        assert not estate.heirs[1].is_pr
+
+    def test_declination_pools_exclude_pr_and_minors(self):
+        estate = Estate(self.DATA)
+        assert [h.full_name for h in estate.adult_children] == ['Susan Doe']
+        assert [h.full_name for h in estate.adult_beneficiaries] == ['Susan Doe', 'Amy Roe']
+
+    def test_sui_juris(self):
+        assert not Estate(self.DATA).all_sui_juris
+        assert Estate({'heirs': []}).all_sui_juris
+
+    def test_shared_estate_matches_per_call_build(self):
+        data = dict(self.DATA, estate_type='Intestate', pr_relationship='Child',
+                    decedent_gender='Male')
+        estate = Estate(data)
+        assert determine_declinations(data, estate) == determine_declinations(data)
+        assert generate_flags(data, estate) == generate_flags(data)
+        assert (build_common_replacements(data, estate)['{HEIRS_LIST}']
+                == build_common_replacements(data)['{HEIRS_LIST}'])
+
+    def test_pr_excluded_from_declinations_despite_name_formatting(self):
+        data = dict(self.DATA, estate_type='Intestate', pr_relationship='Child')
+        names = [d['name'] for d in determine_declinations(data)]
+        assert names == ['Susan Doe']
+
+
+class TestFieldDependencies:
+    def test_maps_fields_to_paragraphs(self):
+        deps = field_dependencies('Personal Representative Oath CURLY.docx', COMMON_FIELDS)
+        assert 'decedent_name' in deps
+        assert all(isinstance(n, int) for paragraphs in deps.values() for n in paragraphs)
+        assert set(deps) <= COMMON_FIELDS.fields
+
+    def test_changed_fields_limited_to_template(self):
+        data = {'decedent_full_name': 'Smith, John', 'decedent_county': 'Maury',
+                'estate_type': 'Testate', 'heirs': []}
+        old = COMMON_FIELDS.bind(build_common_values(data))
+        new = COMMON_FIELDS.bind(build_common_values(dict(data, decedent_full_name='Smith, Jon')))
+        template = 'Personal Representative Oath CURLY.docx'
+        assert changed_fields(template, old, new) == ['decedent_name']
+        assert changed_fields(template, old, old) == []
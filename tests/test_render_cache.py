@@ -0,0 +1,154 @@
+# tests/test_render_cache.py
+import pytest
+import sys
+import os
+import json
+import threading
+import urllib.request
+import urllib.error
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api'))
+import local_server
+import render_cache
+from render_cache import RenderCache, payload_etag, etag_matches, result_url
+from tests.test_probate_opening import SAMPLE_TESTATE_DATA
+
+OPENING = '/api/generate-probate-opening'
+CACHED = dict(SAMPLE_TESTATE_DATA, result_url=True)
+
+
+def _request(base, path, body=None, headers=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(base + path, data=data,
+                                 headers={'Content-Type': 'application/json', **(headers or {})})
+    try:
+        with urllib.request.urlopen(req, timeout=30) as response:
+            return response.status, dict(response.headers), response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), e.read()
+
+
+@pytest.fixture
+def base_url(monkeypatch):
+    monkeypatch.setattr(render_cache, '_render_cache', RenderCache())
+    routes = {OPENING: local_server.load_routes()[OPENING]}
+    server = local_server.GeneratorServer(('127.0.0.1', 0), routes)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+class TestPayloadEtag:
+    def test_key_order_does_not_matter(self):
+        assert payload_etag({'a': 1, 'b': 2}, 'v1') == payload_etag({'b': 2, 'a': 1}, 'v1')
+
+    def test_versions_change_the_tag(self):
+        assert payload_etag({'a': 1}, 'v1') != payload_etag({'a': 1}, 'v2')
+
+    def test_keyed_by_secret(self, monkeypatch):
+        monkeypatch.setenv(render_cache.SECRET_ENV, 'one')
+        first = payload_etag({'a': 1}, 'v1')
+        assert payload_etag({'a': 1}, 'v1') == first
+        monkeypatch.setenv(render_cache.SECRET_ENV, 'two')
+        assert payload_etag({'a': 1}, 'v1') != first
+
+    def test_strong_and_quoted(self):
+        etag = payload_etag({'a': 1})
+        assert etag.startswith('"') and etag.endswith('"')
+
+    def test_if_none_match(self):
+        etag = '"abc"'
+        assert etag_matches('"x", "abc"', etag)
+        assert etag_matches('W/"abc"', etag)
+        assert etag_matches('*', etag, exists=True)
+        assert not etag_matches('*', etag)
+        assert not etag_matches('"abcd"', etag)
+        assert not etag_matches(None, etag)
+
+
+class TestRenderCache:
+    def test_evicts_least_recently_used(self):
+        cache = RenderCache(max_bytes=10)
+        cache.put('a', b'1234', 'x', 'a')
+        cache.put('b', b'1234', 'x', 'b')
+        cache.get('a')
+        cache.put('c', b'1234', 'x', 'c')
+        assert cache.get('b') is None
+        assert cache.get('a').content == b'1234'
+        assert cache.size == 8
+
+    def test_oversized_render_not_kept(self):
+        cache = RenderCache(max_bytes=4)
+        entry = cache.put('a', b'12345', 'x', 'a')
+        assert entry.content == b'12345'
+        assert len(cache) == 0
+
+
+class TestConditionalRequests:
+    def test_plain_post_not_cached(self, base_url):
+        status, headers, body = _request(base_url, OPENING, SAMPLE_TESTATE_DATA)
+        assert status == 200 and body
+        assert 'ETag' not in headers and 'Content-Location' not in headers
+        assert len(render_cache.get_render_cache()) == 0
+
+    def test_post_returns_etag_and_result_url(self, base_url):
+        status, headers, body = _request(base_url, OPENING, CACHED)
+        assert status == 200
+        assert headers['Content-Location'] == result_url('generate-probate-opening',
+                                                         headers['ETag'])
+        # Same payload renders the same bytes under the same tag
+        _, again, body_again = _request(base_url, OPENING, CACHED)
+        assert again['ETag'] == headers['ETag']
+        assert body_again == body
+
+    def test_if_none_match_on_post_gives_412(self, base_url):
+        _, headers, _ = _request(base_url, OPENING, CACHED)
+        status, failed, body = _request(base_url, OPENING, SAMPLE_TESTATE_DATA,
+                                        {'If-None-Match': headers['ETag']})
+        assert status == 412
+        assert failed['Content-Location'] == headers['Content-Location']
+        assert 'error' in json.loads(body)
+
+    def test_changed_payload_changes_etag(self, base_url):
+        _, headers, _ = _request(base_url, OPENING, CACHED)
+        changed = dict(SAMPLE_TESTATE_DATA, decedent_city='Spring Hill')
+        status, changed_headers, _ = _request(base_url, OPENING, changed,
+                                              {'If-None-Match': headers['ETag']})
+        assert status == 200
+        assert changed_headers['ETag'] != headers['ETag']
+
+    def test_get_result_url(self, base_url):
+        _, headers, body = _request(base_url, OPENING, CACHED)
+        status, get_headers, get_body = _request(base_url, headers['Content-Location'])
+        assert status == 200
+        assert get_body == body
+        assert get_headers['ETag'] == headers['ETag']
+        assert 'Access-Control-Allow-Origin' not in get_headers
+        status, _, _ = _request(base_url, headers['Content-Location'],
+                                headers={'If-None-Match': headers['ETag']})
+        assert status == 304
+
+    def test_get_unknown_result(self, base_url):
+        status, _, body = _request(base_url, OPENING + '?etag=0123')
+        assert status == 404
+        assert 'error' in json.loads(body)
+
+    def test_get_unknown_result_ignores_if_none_match(self, base_url):
+        for validator in ('"0123"', '*'):
+            status, _, _ = _request(base_url, OPENING + '?etag=0123',
+                                    headers={'If-None-Match': validator})
+            assert status == 404
+
+    def test_get_wildcard_matches_cached_result(self, base_url):
+        _, headers, _ = _request(base_url, OPENING, CACHED)
+        status, _, _ = _request(base_url, headers['Content-Location'],
+                                headers={'If-None-Match': '*'})
+        assert status == 304
+
+    def test_post_wildcard_renders(self, base_url):
+        status, _, body = _request(base_url, OPENING, SAMPLE_TESTATE_DATA,
+                                   {'If-None-Match': '*'})
+        assert status == 200
+        assert body
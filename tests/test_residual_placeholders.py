@@ -0,0 +1,68 @@
+# tests/test_residual_placeholders.py
+import pytest
+import sys
+import os
+import json
+from io import BytesIO
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api'))
+from docx import Document
+from residual_placeholders import (scan_docx, header_value, check_residuals,
+                                   ResidualPlaceholderError)
+
+
+def _docx_bytes(*paragraphs, header=None):
+    doc = Document()
+    for runs in paragraphs:
+        para = doc.add_paragraph('')
+        for text in runs:
+            para.add_run(text)
+    if header:
+        doc.sections[0].header.paragraphs[0].text = header
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+class TestScanDocx:
+    def test_clean_document_has_no_residuals(self):
+        assert scan_docx(_docx_bytes(['John Smith of Maury County'])) == []
+
+    def test_finds_brace_and_hash_tokens(self):
+        data = _docx_bytes(['Name: {CLIENT_NAME}'], ['##IF_MARRIED## text'])
+        assert scan_docx(data) == ['##IF_MARRIED##', '{CLIENT_NAME}']
+
+    def test_finds_token_split_across_runs(self):
+        data = _docx_bytes(['Signed by {Decedent', '’s Address}', ' today'])
+        assert scan_docx(data) == ['{Decedent’s Address}']
+
+    def test_tokens_reported_unescaped(self):
+        data = _docx_bytes(['{Heirs & Beneficiaries} {Age < 18}'])
+        assert scan_docx(data) == ['{Age < 18}', '{Heirs & Beneficiaries}']
+
+    def test_does_not_match_across_paragraphs(self):
+        assert scan_docx(_docx_bytes(['open {'], ['} close'])) == []
+
+    def test_scans_headers(self):
+        assert scan_docx(_docx_bytes(['body'], header='{Docket Number}')) == ['{Docket Number}']
+
+    def test_distinct_tokens(self):
+        assert scan_docx(_docx_bytes(['{A} {A}'], ['{A}'])) == ['{A}']
+
+
+class TestReporting:
+    def test_header_value_is_ascii_json(self):
+        value = header_value({'a.docx': ['{Decedent’s Age}'], 'b.docx': ['{A}', '{Decedent’s Age}']})
+        value.encode('latin-1')
+        assert json.loads(value) == ['{A}', '{Decedent’s Age}']
+
+    def test_check_residuals_lenient_by_default(self):
+        check_residuals({'a.docx': ['{A}']})
+
+    def test_check_residuals_strict(self):
+        with pytest.raises(ResidualPlaceholderError) as excinfo:
+            check_residuals({'a.docx': ['{A}'], 'b.docx': []}, strict=True)
+        assert excinfo.value.residuals == {'a.docx': ['{A}']}
+        assert isinstance(excinfo.value, ValueError)
+
+    def test_check_residuals_strict_passes_when_clean(self):
+        check_residuals({}, strict=True)
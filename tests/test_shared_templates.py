@@ -0,0 +1,108 @@
+# tests/test_shared_templates.py
+import pytest
+import sys
+import os
+import subprocess
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api'))
+from docx import Document
+import shared_templates
+from shared_templates import (publish, unlink, segment_names, shared_probate_store,
+                              shared_drive_template, publish_templates, SharedTemplateStore,
+                              SharedCompiledTemplateStore)
+from template_cache import TemplateCache
+from template_store import DirectoryTemplateStore, CompiledTemplateStore
+from probate_utils import TEMPLATE_DIR
+
+API_DIR = os.path.join(os.path.dirname(__file__), '..', 'api')
+DRIVE_URL = 'https://drive.example/will.docx'
+
+
+@pytest.fixture
+def prefix(monkeypatch):
+    prefix = f'test-templates-{os.getpid()}'
+    monkeypatch.setattr(shared_templates, '_attached', {})
+    yield prefix
+    for name in segment_names(prefix):
+        unlink(name)
+
+
+@pytest.fixture
+def published(prefix):
+    probate_name, drive_name = segment_names(prefix)
+    store = DirectoryTemplateStore(TEMPLATE_DIR)
+    publish(probate_name, {name: store.read(name) for name in store.names()})
+    publish(drive_name, {DRIVE_URL: store.read(store.names()[0])})
+    return prefix
+
+
+class TestSharedTemplateStore:
+    def test_holds_every_template_byte_for_byte(self, published):
+        shared = SharedTemplateStore(segment_names(published)[0])
+        directory = DirectoryTemplateStore(TEMPLATE_DIR)
+        assert shared.names() == directory.names()
+        for name in directory.names():
+            assert shared.read(name) == directory.read(name)
+
+    def test_opens_as_document(self, published):
+        store = shared_probate_store(TEMPLATE_DIR, published)
+        name = store.names()[0]
+        assert Document(store.open(name)).paragraphs is not None
+
+    def test_stale_segment_is_ignored(self, published, tmp_path):
+        (tmp_path / 'Only.docx').write_bytes(b'x')
+        assert shared_probate_store(str(tmp_path), published) is None
+
+    def test_not_published(self, prefix):
+        assert shared_probate_store(TEMPLATE_DIR, prefix) is None
+        assert shared_drive_template(DRIVE_URL, prefix) is None
+
+    def test_unlink(self, published):
+        assert unlink(segment_names(published)[1]) is True
+        assert unlink(segment_names(published)[1]) is False
+
+
+class TestPublishTemplates:
+    def test_publishes_compiled_artifacts(self, prefix, tmp_path):
+        path = str(tmp_path / 'templates.compiled.pack')
+        count, _, _ = publish_templates(prefix, TEMPLATE_DIR, drive=False, compiled_path=path)
+        store = shared_probate_store(TEMPLATE_DIR, prefix)
+        assert isinstance(store, SharedCompiledTemplateStore) and store.healed
+        assert count == len(store) == len(DirectoryTemplateStore(TEMPLATE_DIR).names())
+        compiled = CompiledTemplateStore(path)
+        name = store.names()[0]
+        assert store.read(name) == compiled.read(name)
+        assert store.plan(name) == compiled.plan(name)
+
+    def test_falls_back_to_raw_templates(self, prefix, tmp_path):
+        path = str(tmp_path / 'missing' / 'templates.compiled.pack')
+        publish_templates(prefix, TEMPLATE_DIR, drive=False, compiled_path=path)
+        store = shared_probate_store(TEMPLATE_DIR, prefix)
+        assert type(store) is SharedTemplateStore and not store.healed
+
+
+class TestDriveTier:
+    def test_cache_uses_shared_bytes_without_copy_or_fetch(self, published):
+        cache = TemplateCache(lookup=lambda url: shared_drive_template(url, published))
+        fetch = lambda url: pytest.fail('should not download a published template')
+        content = cache.get(DRIVE_URL, fetch)
+        assert bytes(content)[:4] == b'PK\x03\x04'
+        assert DRIVE_URL not in cache
+
+    def test_unknown_url_still_fetches(self, published):
+        cache = TemplateCache(lookup=lambda url: shared_drive_template(url, published))
+        assert cache.get('https://drive.example/other', lambda url: b'fetched') == b'fetched'
+
+
+class TestWorkerProcess:
+    def test_worker_attaches_and_leaves_segment(self, published):
+        code = ('from probate_utils import get_template_store, load_template\n'
+                'store = get_template_store()\n'
+                'load_template(store.names()[0])\n'
+                'print(type(store).__name__)\n')
+        env = dict(os.environ, TEMPLATE_SHM_PREFIX=published)
+        result = subprocess.run([sys.executable, '-c', code], cwd=API_DIR, env=env,
+                                capture_output=True, text=True, timeout=60)
+        assert result.stdout.strip() == 'SharedTemplateStore'
+        assert result.stderr == ''
+        # Exiting workers must not unlink the published segment
+        assert SharedTemplateStore(segment_names(published)[0]).names()
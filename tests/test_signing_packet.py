@@ -0,0 +1,188 @@
+# tests/test_signing_packet.py
+import pytest
+import sys
+import os
+import io
+import zipfile
+from copy import deepcopy
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api'))
+from docx import Document
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from lxml import etree
+import probate_utils
+from probate_utils import render_plan, render_template, build_signing_packet, packet_definitions
+from signing_packet import (W, VAL, DefinitionTable, merge_documents, resolve_theme_fonts,
+                            theme_fonts)
+from tests.test_probate_closing import (SAMPLE_MULTI_HEIR_TESTATE, generate_probate_closing,
+                                        generate_closing_package)
+
+NS = f'xmlns:w="{W[1:-1]}"'
+ORDER = 'Order to Close Estate CURLY.docx'
+
+
+def _styles(*styles, defaults=''):
+    return (f'<w:styles {NS}><w:docDefaults>{defaults}</w:docDefaults>'
+            + ''.join(styles) + '</w:styles>').encode()
+
+
+NORMAL = ('<w:style w:type="paragraph" w:default="1" w:styleId="Normal">'
+          '<w:name w:val="Normal"/></w:style>')
+TITLE = ('<w:style w:type="paragraph" w:styleId="Title"><w:name w:val="Title"/>'
+         '<w:basedOn w:val="Normal"/><w:rPr><w:b/></w:rPr></w:style>')
+SIZE_12 = '<w:rPrDefault><w:rPr><w:sz w:val="24"/></w:rPr></w:rPrDefault>'
+SIZE_11 = '<w:rPrDefault><w:rPr><w:sz w:val="22"/></w:rPr></w:rPrDefault>'
+
+
+def _closing_documents():
+    return render_plan(generate_probate_closing.plan_closing_package(SAMPLE_MULTI_HEIR_TESTATE))
+
+
+def _texts(document):
+    return [''.join(t.text or '' for t in p.iter(f'{W}t'))
+            for p in document.element.body.iter(f'{W}p')]
+
+
+def _resolved(document):
+    """(font size, latin font, justification) each paragraph resolves to."""
+    styles = etree.fromstring(document.part.part_related_by(RT.STYLES).blob)
+    fonts = theme_fonts(document.part.part_related_by(RT.THEME).blob)
+    by_id = {s.get(f'{W}styleId'): s for s in styles.findall(f'{W}style')}
+    default = next(i for i, s in by_id.items()
+                   if s.get(f'{W}default') == '1' and s.get(f'{W}type') == 'paragraph')
+
+    def resolve(style_id, path):
+        chain = [styles.find(f'{W}docDefaults/{W}{path[0]}Default/{W}{path[0]}/{W}{path[1]}')]
+        while style_id in by_id:
+            chain.insert(1, by_id[style_id].find(f'{W}{path[0]}/{W}{path[1]}'))
+            based_on = by_id[style_id].find(f'{W}basedOn')
+            style_id = based_on.get(VAL) if based_on is not None else None
+        attributes = {}
+        for element in chain:
+            if element is not None:
+                element = deepcopy(element)
+                resolve_theme_fonts(element, fonts)
+                attributes.update(element.attrib)
+        return attributes.get(VAL, attributes.get(f'{W}ascii'))
+
+    resolved = []
+    for p in document.element.body.iter(f'{W}p'):
+        style = p.find(f'{W}pPr/{W}pStyle')
+        style_id = style.get(VAL) if style is not None else default
+        resolved.append(tuple(resolve(style_id, path)
+                              for path in (('rPr', 'sz'), ('rPr', 'rFonts'), ('pPr', 'jc'))))
+    return resolved
+
+
+class TestDefinitionTable:
+    def test_identical_definitions_share_an_id(self):
+        table = DefinitionTable()
+        first = table.source(_styles(NORMAL, TITLE, defaults=SIZE_12))
+        second = table.source(_styles(TITLE, NORMAL, defaults=SIZE_12))
+        assert first.ids == second.ids == {'Normal': 'Normal', 'Title': 'Title'}
+
+    def test_conflicting_definitions_renamed(self):
+        table = DefinitionTable()
+        table.source(_styles(NORMAL, TITLE, defaults=SIZE_12))
+        source = table.source(_styles(NORMAL, TITLE, defaults=SIZE_11))
+        assert source.ids == {'Normal': 'Normal_2', 'Title': 'Title_2'}
+        assert source.defaults['paragraph'] == 'Normal_2'
+        renamed = table.styles['Normal_2']
+        assert renamed.find(f'{W}name').get(VAL) == 'Normal (2)'
+        assert renamed.get(f'{W}default') is None
+        assert table.styles['Title_2'].find(f'{W}basedOn').get(VAL) == 'Normal_2'
+
+    def test_defaults_folded_into_root_paragraph_styles(self):
+        table = DefinitionTable()
+        table.source(_styles(NORMAL, TITLE, defaults=SIZE_12
+                             + '<w:pPrDefault><w:pPr><w:jc w:val="both"/></w:pPr></w:pPrDefault>'))
+        assert table.styles['Normal'].find(f'{W}rPr/{W}sz').get(VAL) == '24'
+        assert table.styles['Normal'].find(f'{W}pPr/{W}jc').get(VAL) == 'both'
+        assert table.styles['Title'].find(f'{W}rPr/{W}sz') is None
+
+    def test_style_properties_kept_over_defaults(self):
+        table = DefinitionTable()
+        normal = NORMAL.replace('</w:style>',
+                                '<w:rPr><w:rFonts w:ascii="Arial"/></w:rPr></w:style>')
+        table.source(_styles(normal, defaults='<w:rPrDefault><w:rPr><w:rFonts w:ascii="Times" '
+                             'w:hAnsi="Times" w:cs="Times"/></w:rPr></w:rPrDefault>'))
+        rfonts = table.styles['Normal'].find(f'{W}rPr/{W}rFonts')
+        assert rfonts.get(f'{W}ascii') == 'Arial' and rfonts.get(f'{W}cs') == 'Times'
+
+
+class TestMerge:
+    def test_one_section_per_document(self):
+        documents = _closing_documents()
+        texts = [_texts(document) for _, document in documents]
+        packet = Document(build_signing_packet(documents, '2026-04-10'))
+        assert len(packet.sections) == len(documents)
+        assert _texts(packet) == [text for document in texts for text in document]
+        for section in packet.sections[1:]:
+            sect_pr = section._sectPr
+            assert sect_pr.find(f'{W}type').get(VAL) == 'nextPage'
+            assert sect_pr.find(f'{W}pgNumType').get(f'{W}start') == '1'
+
+    def test_formatting_preserved(self):
+        documents = _closing_documents()
+        expected = [style for _, document in documents for style in _resolved(document)]
+        packet = merge_documents(documents, packet_definitions())
+        assert _resolved(packet) == expected
+
+    def test_every_section_names_its_footer(self):
+        packet = merge_documents(_closing_documents(), packet_definitions())
+        for section in packet.sections:
+            assert section._sectPr.find(f'{W}footerReference') is not None
+
+    def test_page_count_is_per_document(self):
+        packet = merge_documents(_closing_documents(), packet_definitions())
+        footer = packet.sections[0].footer._element
+        instructions = ''.join(t.text for t in footer.iter(f'{W}instrText'))
+        assert 'SECTIONPAGES' in instructions and 'NUMPAGES' not in instructions
+
+    def test_lists_restart_per_document(self):
+        replacements = generate_probate_closing.plan_closing_package(
+            SAMPLE_MULTI_HEIR_TESTATE)[1][2]
+        documents = [(f'Order {n}', render_template(ORDER, replacements)) for n in range(3)]
+        used = {p.get(VAL) for p in documents[0][1].element.body.iter(f'{W}numId')} - {'0'}
+        packet = merge_documents(documents, packet_definitions())
+        numbering = packet.part.part_related_by(RT.NUMBERING).element
+        nums = [n.get(f'{W}numId') for n in numbering.findall(f'{W}num')]
+        assert len(nums) == len(set(nums)) == 3 * len(used)
+        nsids = [n.get(VAL) for n in numbering.iter(f'{W}nsid')]
+        assert len(nsids) == len(set(nsids))
+
+    def test_styles_do_not_grow_with_documents(self):
+        replacements = generate_probate_closing.plan_closing_package(
+            SAMPLE_MULTI_HEIR_TESTATE)[1][2]
+
+        def style_count(copies):
+            documents = [(str(n), render_template(ORDER, replacements)) for n in range(copies)]
+            styles = merge_documents(documents, packet_definitions()).styles.element
+            return len(styles.findall(f'{W}style'))
+        assert style_count(1) == style_count(4)
+
+    def test_definitions_built_once_per_store(self):
+        assert packet_definitions() is packet_definitions()
+
+
+class TestSigningPacketOutput:
+    def _payload(self, **overrides):
+        return dict(SAMPLE_MULTI_HEIR_TESTATE, signing_packet=True, deterministic=True,
+                    generation_date='2026-04-10', **overrides)
+
+    def test_package_is_one_docx(self):
+        residuals = {}
+        content = generate_closing_package(self._payload(), residuals).getvalue()
+        assert not zipfile.ZipFile(io.BytesIO(content)).testzip()
+        assert 'word/document.xml' in zipfile.ZipFile(io.BytesIO(content)).namelist()
+        assert len(Document(io.BytesIO(content)).sections) == 5
+        assert all(name == '2026-04-10 Signing Packet.docx' for name in residuals)
+
+    def test_deterministic(self):
+        assert (generate_closing_package(self._payload()).getvalue()
+                == generate_closing_package(self._payload()).getvalue())
+
+    def test_filename_and_content_type(self):
+        data = self._payload()
+        assert generate_probate_closing.package_filename(data).endswith('_Signing_Packet.docx')
+        assert probate_utils.package_content_type(data).endswith('wordprocessingml.document')
+        assert probate_utils.package_content_type(SAMPLE_MULTI_HEIR_TESTATE) == 'application/zip'
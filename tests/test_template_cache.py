@@ -0,0 +1,93 @@
+# tests/test_template_cache.py
+import pytest
+import sys
+import os
+import threading
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api'))
+from template_cache import TemplateCache
+from template_store import DirectoryTemplateStore
+from probate_utils import TEMPLATE_DIR
+
+
+def _concurrently(n, target):
+    results, errors = [], []
+
+    def run():
+        try:
+            results.append(target())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+class TestTemplateCache:
+    def test_caches_value(self):
+        cache = TemplateCache()
+        calls = []
+        fetch = lambda key: calls.append(key) or b'content'
+        assert cache.get('a', fetch) == b'content'
+        assert cache.get('a', fetch) == b'content'
+        assert calls == ['a']
+        assert 'a' in cache and len(cache) == 1
+
+    def test_concurrent_misses_share_one_fetch(self):
+        cache = TemplateCache()
+        calls = []
+
+        def fetch(key):
+            calls.append(key)
+            time.sleep(0.1)
+            return b'content'
+
+        results, errors = _concurrently(8, lambda: cache.get('a', fetch))
+        assert calls == ['a']
+        assert results == [b'content'] * 8
+        assert errors == []
+
+    def test_failure_reaches_every_waiter_and_is_not_cached(self):
+        cache = TemplateCache()
+        calls = []
+
+        def fail(key):
+            calls.append(key)
+            time.sleep(0.1)
+            raise RuntimeError('drive down')
+
+        results, errors = _concurrently(5, lambda: cache.get('a', fail))
+        assert calls == ['a']
+        assert results == []
+        assert len(errors) == 5 and all(str(e) == 'drive down' for e in errors)
+        assert 'a' not in cache
+        assert cache.get('a', lambda key: b'retry') == b'retry'
+
+    def test_distinct_keys_fetch_independently(self):
+        cache = TemplateCache()
+        assert cache.get('a', lambda key: b'A') == b'A'
+        assert cache.get('b', lambda key: b'B') == b'B'
+        cache.discard('a')
+        assert 'a' not in cache and len(cache) == 1
+
+
+class TestDirectoryStoreUsesSingleFlight:
+    def test_concurrent_first_reads(self, monkeypatch):
+        store = DirectoryTemplateStore(TEMPLATE_DIR)
+        name = store.names()[0]
+        reads = []
+        read_file = store._read_file
+
+        def slow_read(key):
+            reads.append(key)
+            time.sleep(0.05)
+            return read_file(key)
+
+        monkeypatch.setattr(store, '_read_file', slow_read)
+        results, errors = _concurrently(4, lambda: store.read(name))
+        assert reads == [name]
+        assert len(set(results)) == 1 and errors == []
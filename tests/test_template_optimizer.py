@@ -0,0 +1,127 @@
+# tests/test_template_optimizer.py
+import pytest
+import sys
+import os
+import io
+import zipfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api'))
+from docx import Document
+from lxml import etree
+from probate_utils import TEMPLATE_DIR, iter_document_paragraphs
+from template_optimizer import (W, merge_runs, strip_bookmarks, strip_rsids, strip_unused_styles,
+                                slim_docx, equivalent, optimize_template, optimize_directory, main)
+
+OATH = 'Personal Representative Oath CURLY.docx'
+DECLINATION = 'Declination to Serve CURLY.docx'
+NS = f'xmlns:w="{W}"'
+
+
+def _xml(body):
+    return etree.fromstring(f'<w:body {NS}>{body}</w:body>')
+
+
+def _read(name=OATH):
+    with open(os.path.join(TEMPLATE_DIR, name), 'rb') as f:
+        return f.read()
+
+
+def _edited(source, part, edit):
+    """Copy of the source package with edit applied to one part's bytes."""
+    package = zipfile.ZipFile(io.BytesIO(source))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as edited:
+        for name in package.namelist():
+            content = package.read(name)
+            edited.writestr(name, edit(content) if name == part else content)
+    return buffer.getvalue()
+
+
+class TestPasses:
+    def test_strip_rsids(self):
+        root = _xml('<w:p w:rsidR="00AB" w:rsidRDefault="00CD"><w:r w:rsidRPr="01"/></w:p>')
+        assert strip_rsids(root) == 3
+        assert b'rsid' not in etree.tostring(root)
+
+    def test_merge_runs_with_identical_properties(self):
+        root = _xml('<w:p><w:r><w:rPr><w:b/></w:rPr><w:t>{DECEDENT</w:t></w:r>'
+                    '<w:r><w:rPr><w:b/></w:rPr><w:t>_NAME}</w:t></w:r>'
+                    '<w:r><w:t> of</w:t></w:r></w:p>')
+        assert merge_runs(root) == 1
+        runs = root.findall(f'.//{{{W}}}r')
+        assert [''.join(r.itertext()) for r in runs] == ['{DECEDENT_NAME}', ' of']
+
+    def test_runs_with_other_content_not_merged(self):
+        root = _xml('<w:p><w:r><w:t>a</w:t></w:r><w:r><w:tab/><w:t>b</w:t></w:r></w:p>')
+        assert merge_runs(root) == 0
+
+    def test_referenced_bookmarks_kept(self):
+        root = _xml('<w:p><w:bookmarkStart w:id="0" w:name="_GoBack"/><w:bookmarkEnd w:id="0"/>'
+                    '<w:bookmarkStart w:id="1" w:name="Total"/><w:bookmarkEnd w:id="1"/></w:p>')
+        assert strip_bookmarks(root, 'REF Total \\h') == 1
+        assert [b.get(f'{{{W}}}name') for b in root.iter(f'{{{W}}}bookmarkStart')] == ['Total']
+
+    def test_style_closure_kept(self):
+        styles = etree.fromstring(
+            f'<w:styles {NS}><w:style w:styleId="Normal" w:default="1"/>'
+            '<w:style w:styleId="Base"/><w:style w:styleId="Title"><w:basedOn w:val="Base"/></w:style>'
+            '<w:style w:styleId="Unused"/></w:styles>')
+        assert strip_unused_styles(styles, {'Title'}) == 1
+        assert [s.get(f'{{{W}}}styleId') for s in styles] == ['Normal', 'Base', 'Title']
+
+
+class TestSlimTemplate:
+    def test_smaller_and_text_kept(self):
+        source = _read()
+        slim, stats = slim_docx(source)
+        assert len(slim) < len(source)
+        assert stats['rsids'] > 0
+        before = [p.text for p in iter_document_paragraphs(Document(io.BytesIO(source)))]
+        after = [p.text for p in iter_document_paragraphs(Document(io.BytesIO(slim)))]
+        assert after == before
+
+    def test_render_equivalent(self):
+        slim, report = optimize_template(_read())
+        assert report['equivalent'] and slim is not None
+        assert report['nodes'][1] < report['nodes'][0]
+
+    def test_changed_text_detected(self):
+        source = _read()
+        edited = _edited(source, 'word/document.xml',
+                         lambda xml: xml.replace(b'Personal', b'Persona1', 1))
+        assert not equivalent(source, edited)
+
+    def test_headers_verified(self):
+        source = _read(DECLINATION)
+        slim, report = optimize_template(source)
+        assert report['equivalent'] and slim is not None
+        edited = _edited(source, 'word/header1.xml',
+                         lambda xml: xml.replace(b'<w:pStyle w:val="Header"/>', b'', 1))
+        assert not equivalent(source, edited)
+
+    def test_stripped_style_used_by_header_detected(self):
+        source = _read(DECLINATION)
+
+        def strip_header_style(xml):
+            styles = etree.fromstring(xml)
+            header = styles.find(f'{{{W}}}style[@{{{W}}}styleId="Header"]')
+            styles.remove(header)
+            return etree.tostring(styles, xml_declaration=True, encoding='UTF-8',
+                                  standalone=True)
+        assert not equivalent(source, _edited(source, 'word/styles.xml', strip_header_style))
+
+
+class TestOptimizeDirectory:
+    def test_writes_verified_copies_only_to_out(self, tmp_path):
+        src = tmp_path / 'src'
+        src.mkdir()
+        (src / OATH).write_bytes(_read())
+        reports = optimize_directory(str(src), out=str(tmp_path / 'slim'))
+        assert reports[OATH]['equivalent']
+        assert (src / OATH).read_bytes() == _read()
+        assert (tmp_path / 'slim' / OATH).stat().st_size == reports[OATH]['bytes'][1]
+
+    def test_cli_report(self, tmp_path, capsys):
+        (tmp_path / OATH).write_bytes(_read())
+        assert main([str(tmp_path)]) == 0
+        output = capsys.readouterr().out
+        assert OATH in output and 'total' in output
@@ -0,0 +1,122 @@
+# tests/test_template_store.py
+import pytest
+import sys
+import os
+import io
+import zipfile
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'api'))
+from docx import Document
+import template_store
+from template_store import (build_pack, ensure_pack, open_template_store, PackedTemplateStore,
+                            DirectoryTemplateStore, MemoryViewStream, source_digests)
+from probate_utils import TEMPLATE_DIR
+
+ORDER = 'Order to Probate LWT CURLY.docx'
+
+
+@pytest.fixture(scope='module')
+def pack_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('pack') / 'templates.pack')
+    build_pack(TEMPLATE_DIR, path)
+    return path
+
+
+class TestMemoryViewStream:
+    def test_read_seek_tell(self):
+        stream = MemoryViewStream(memoryview(b'0123456789'))
+        assert stream.read(3) == b'012'
+        assert stream.tell() == 3
+        stream.seek(-2, io.SEEK_END)
+        assert stream.read() == b'89'
+        stream.seek(1)
+        buffer = bytearray(4)
+        assert stream.readinto(buffer) == 4
+        assert bytes(buffer) == b'1234'
+
+    def test_zipfile_reads_through_stream(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as zf:
+            zf.writestr('a.txt', 'hello')
+        with zipfile.ZipFile(MemoryViewStream(memoryview(buffer.getvalue()))) as zf:
+            assert zf.read('a.txt') == b'hello'
+
+
+class TestPackedTemplateStore:
+    def test_pack_holds_every_template_byte_for_byte(self, pack_path):
+        store = PackedTemplateStore(pack_path)
+        directory = DirectoryTemplateStore(TEMPLATE_DIR)
+        assert store.names() == directory.names()
+        for name in store.names():
+            assert store.read(name) == directory.read(name)
+
+    def test_opens_as_document(self, pack_path):
+        doc = Document(PackedTemplateStore(pack_path).open(ORDER))
+        assert any(p.text for p in doc.paragraphs)
+
+    def test_unknown_template(self, pack_path):
+        with pytest.raises(FileNotFoundError):
+            PackedTemplateStore(pack_path).open('Missing.docx')
+
+    def test_rejects_non_pack_file(self, tmp_path):
+        path = tmp_path / 'bogus.pack'
+        path.write_bytes(b'NOPE' + b'\0' * 16)
+        with pytest.raises(ValueError):
+            PackedTemplateStore(str(path))
+
+
+class TestOpenTemplateStore:
+    def test_uses_current_pack(self, pack_path):
+        assert isinstance(open_template_store(TEMPLATE_DIR, pack_path), PackedTemplateStore)
+
+    def test_falls_back_without_pack(self, tmp_path):
+        store = open_template_store(TEMPLATE_DIR, str(tmp_path / 'missing.pack'))
+        assert isinstance(store, DirectoryTemplateStore)
+
+    def test_ignores_stale_pack(self, tmp_path):
+        directory = tmp_path / 'templates'
+        directory.mkdir()
+        (directory / 'A.docx').write_bytes(b'one')
+        path = str(tmp_path / 'templates.pack')
+        build_pack(str(directory), path)
+        assert isinstance(open_template_store(str(directory), path), PackedTemplateStore)
+        (directory / 'A.docx').write_bytes(b'edited')
+        assert isinstance(open_template_store(str(directory), path), DirectoryTemplateStore)
+
+    def test_same_size_edit_is_stale(self, tmp_path):
+        directory = tmp_path / 'templates'
+        directory.mkdir()
+        (directory / 'A.docx').write_bytes(b'one')
+        path = str(tmp_path / 'templates.pack')
+        build_pack(str(directory), path)
+        stat = os.stat(directory / 'A.docx')
+        (directory / 'A.docx').write_bytes(b'two')
+        os.utime(directory / 'A.docx', ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert isinstance(open_template_store(str(directory), path), DirectoryTemplateStore)
+
+    def test_pack_is_current(self, pack_path, tmp_path):
+        assert PackedTemplateStore(pack_path).is_current(TEMPLATE_DIR)
+        assert not PackedTemplateStore(pack_path).is_current(str(tmp_path))
+
+    def test_settled_digests_memoised(self, tmp_path, monkeypatch):
+        (tmp_path / 'A.docx').write_bytes(b'one')
+        monkeypatch.setattr(template_store, '_file_digests', {})
+        # Just written, so not settled: hashed on every call
+        source_digests(str(tmp_path))
+        assert template_store._file_digests == {}
+        monkeypatch.setattr(template_store, 'SETTLE_NS', -1)
+        digest = source_digests(str(tmp_path))['A.docx']
+        (key, _), = template_store._file_digests.items()
+        template_store._file_digests[key] = 'memoised'
+        assert source_digests(str(tmp_path)) == {'A.docx': 'memoised'}
+        (tmp_path / 'A.docx').write_bytes(b'edited')
+        assert source_digests(str(tmp_path))['A.docx'] not in ('memoised', digest)
+
+    def test_ensure_pack_rebuilds_stale_pack(self, tmp_path):
+        directory = tmp_path / 'templates'
+        directory.mkdir()
+        (directory / 'A.docx').write_bytes(b'one')
+        path = str(tmp_path / 'templates.pack')
+        assert ensure_pack(str(directory), path)
+        (directory / 'A.docx').write_bytes(b'two')
+        assert ensure_pack(str(directory), path)
+        assert PackedTemplateStore(path).read('A.docx') == b'two'